@@ -1,6 +1,9 @@
 import logging
+import threading
 import time
 
+import live_view
+
 
 
 
@@ -11,14 +14,75 @@ class UserAbortError(Exception):
     pass
 
 
+class UserCancelledError(UserAbortError):
+    """ Ctrl+C, the operator wants everything stopped (batch job queues and orders too), not just this operation """
+    pass
+
+
+
+# -----    NON-INTERACTIVE POLICY (batch / scripted runs)  -----
+FAILURE_ACTIONS = ("retry", "skip", "abort")
+
+class NonInteractivePolicy:
+    """ Answers the failure prompts automatically, for runs with nobody at the keyboard
+
+    Args:
+        on_cal_failure (str): 'retry', 'skip' or 'abort' when a sensor fails calibration
+        on_other_failure (str): 'retry', 'skip' or 'abort' for any other failure
+        max_retries (int): automatic retries before giving up, then calibration failures are skipped
+            and other failures abort (so a dead sensor / bus can't loop forever)
+    """
+    def __init__(self, on_cal_failure: str = "skip", on_other_failure: str = "retry", max_retries: int = 2):
+        for action in (on_cal_failure, on_other_failure):
+            if action not in FAILURE_ACTIONS:
+                raise ValueError(f"Invalid failure action '{action}', must be one of {FAILURE_ACTIONS}")
+        self.on_cal_failure = on_cal_failure
+        self.on_other_failure = on_other_failure
+        self.max_retries = max_retries
+        self._retries = {} # retries used so far, per uid for calibration, one shared count for other failures
+
+    def choose(self, key, action: str, exhausted_action: str) -> str:
+        if action != "retry":
+            return action
+        used = self._retries.get(key, 0)
+        if used >= self.max_retries:
+            logging.warning(f"Automatic retries used up ({self.max_retries}), choosing '{exhausted_action}'")
+            return exhausted_action
+        self._retries[key] = used + 1
+        return "retry"
+
+    def reset(self, key):
+        """ Operation succeeded, so the next failure gets the full number of retries again """
+        self._retries.pop(key, None)
+
+
+_policy_local = threading.local() # per thread, so jobs running on different ports (station daemon) keep their own policy
+
+def set_failure_policy(policy: NonInteractivePolicy | None):
+    """ Set a NonInteractivePolicy (for the calling thread) to stop the failure prompts from waiting for input,
+    None to prompt the user again """
+    _policy_local.policy = policy
+
+def get_failure_policy() -> NonInteractivePolicy | None:
+    return getattr(_policy_local, "policy", None)
+
+
 
 def prompt_user_on_cal_failure(uid:int, error_message: str = "") -> str:
     """
     Handles user input when a calibration failure occurs
     """
+    policy = get_failure_policy()
+    if policy is not None:
+        choice = policy.choose(("calibration", str(uid)), policy.on_cal_failure, exhausted_action="skip")
+        logging.warning(f"Calibration for UID {uid} failed: {error_message} (non-interactive, choosing '{choice}')")
+        if choice == "abort":
+            raise UserAbortError("Configuration aborted by failure policy during calibration failure.")
+        return choice
     while True:
         try:
-            choice = input(
+            with live_view.suspended(): # the live table stops redrawing while the prompt is up
+                choice = input(
                     f"\n CRITICAL: Calibration for UID {uid} failed: {error_message}\n"
                     "   Choose an option:\n"
                     "   [1] Retry calibration for this sensor\n"
@@ -34,15 +98,23 @@ def prompt_user_on_cal_failure(uid:int, error_message: str = "") -> str:
             print("Invalid choice. Please enter 1, 2, or 3.")
         except KeyboardInterrupt:
             logging.info("Calibration failure prompt cancelled by user.")
-            raise UserAbortError("User aborted configuration during calibration failure.")
+            raise UserCancelledError("User aborted configuration during calibration failure.")
 
 def prompt_user_on_other_failure(error_message:str = "") -> str:
     """
     Handles user input when a non-calibration failure occurs
     """
+    policy = get_failure_policy()
+    if policy is not None:
+        choice = policy.choose("other", policy.on_other_failure, exhausted_action="abort")
+        logging.warning(f"An error occurred: {error_message} (non-interactive, choosing '{choice}')")
+        if choice == "abort":
+            raise UserAbortError("Operation aborted by failure policy during error handling.")
+        return choice
     while True:
         try:
-            choice = input(
+            with live_view.suspended():
+                choice = input(
                     f"\n ERROR: An error occurred: {error_message}\n"
                     "   Choose an option:\n"
                     "   [1] Retry the operation\n"
@@ -58,7 +130,7 @@ def prompt_user_on_other_failure(error_message:str = "") -> str:
             print("Invalid choice. Please enter 1, 2, or 3.")
         except KeyboardInterrupt:
             logging.info("Error handling prompt cancelled by user.")
-            raise UserAbortError("User aborted operation during error handling.")
+            raise UserCancelledError("User aborted operation during error handling.")
 
 
 def retry_on_failure(operation_func, prompt_func, success_message: str = None, *args, **kwargs):
@@ -92,6 +164,8 @@ def retry_on_failure(operation_func, prompt_func, success_message: str = None, *
                 raise UserAbortError("Configuration aborted by user.")
         else:
             # Operation successful
+            if get_failure_policy() is not None: # success, so the next failure gets its retries back
+                get_failure_policy().reset("other")
             if success_message:
                 logging.info(success_message)
             return result
@@ -114,9 +188,12 @@ def retry_on_exception(operation_func, handled_exceptions=(Exception,),
     Returns:
         The result from operation_func if successful, or None if skipped.
     """
+    result = None # returned as is if the operation is skipped
     while True:
         try:
             result = operation_func(*args, **kwargs)
+            if get_failure_policy() is not None: # success, so the next failure gets its retries back
+                get_failure_policy().reset("other")
             if success_message:
                 logging.info(success_message)
             return result  # ✅ success
@@ -1,12 +1,15 @@
 import serial
 import logging
 import time
-from typing import Literal
+from collections import Counter
+from contextlib import contextmanager
+from typing import Literal, TYPE_CHECKING
 from IPX_Config import IPXCommands
+import live_view
 import numpy as np
 
-
-import pandas as pd
+if TYPE_CHECKING: # pandas is only imported when calibration data is parsed (slow import, keeps startup fast)
+    import pandas as pd
 
 import re # apparently good for handling text
 
@@ -106,6 +109,7 @@ class IPXSerialCommunicator:
         self.baudrate = baudrate
         self.timeout = timeout
         self.connection = None # used for initialising the serial connection in __enter__, holds serial.Serial()
+        self.last_latency_s = None # time from sending the last command to the first byte of its reply
     
 
     # This is called default timeouts but it is for adjusting the listen duration within the send_receive_listen method
@@ -139,10 +143,12 @@ class IPXSerialCommunicator:
         # Clear input buffer to ensure we only read the response to *this* command
         self.connection.reset_input_buffer()
         self.connection.write(command.encode("UTF-8"))
-        logging.debug(f"Sent command: {command.strip()}")
+        sent_time = time.perf_counter()
+        logging.debug("Sent command: %s", command.strip())
 
         # 1. block and wait for the first byte to arrive
         first_byte = self.connection.read(1)
+        self.last_latency_s = time.perf_counter() - sent_time if first_byte else None
         if not first_byte:
             logging.error("No response received from device.")
             raise IPXNoResponseError("No response received from device within the expected timeout.") # didnt recieve response within timeout
@@ -190,7 +196,7 @@ class IPXSerialCommunicator:
 
                         # adding stop on string logic
                         if stop_on_string and stop_on_string in line:
-                            logging.debug(f" Terminator string found. Finalising read")
+                            logging.debug(" Terminator string found. Finalising read")
                             stop_reading_now = True
             if stop_reading_now == True:
                 break
@@ -203,7 +209,7 @@ class IPXSerialCommunicator:
         
         response = all_responses
         if response:
-            logging.debug(f"Received response: {response}")
+            logging.debug("Received response: %s", response) # lazy, only formatted if DEBUG is on
         else:
             logging.error("No response received from device.")
             raise IPXNoResponseError("No response received from device within the expected timeout.") # add this exception for error catching
@@ -211,6 +217,18 @@ class IPXSerialCommunicator:
     
 
 
+    @contextmanager
+    def response_timeout(self, seconds: float):
+        """ Temporarily waits at most this long for a reply to start (quick sweeps of the bus), then puts the
+        normal timeout back """
+        previous = self.connection.timeout
+        self.connection.timeout = seconds
+        try:
+            yield
+        finally:
+            self.connection.timeout = previous
+
+
     def _decode_string_and_check(self, response: bytes, expected_response:str = "", command:str = "") -> str:
         """For ensuring random/corrupted data is not recieved by IPX, added verification within this function"""
         try:
@@ -220,7 +238,7 @@ class IPXSerialCommunicator:
             raise IPXCorruptedDataError("Corrupted data could not decode UTF-8 bytes | Please check connection and try again")
         
         if self.verify and expected_response: # this is for verifying the response matches expected response
-            logging.debug(f"Verifying response, expecting to find {expected_response}")
+            logging.debug("Verifying response, expecting to find %s", expected_response)
             if not response_str.lower().startswith(expected_response.lower()): # if the string doesnt start with expected response, raise an error
                 error_message = (
                     f"verification failed for command: {command}" # add command for debugging
@@ -229,7 +247,7 @@ class IPXSerialCommunicator:
                 logging.error(error_message)
                 raise IPXVerificationError(error_message) # raise verification error
             else:
-                logging.debug(f"response verified successfully for command: {command}")
+                logging.debug("response verified successfully for command: %s", command)
 
         
         return response_str
@@ -272,8 +290,9 @@ class IPXSerialCommunicator:
     
 
 
-    def get_status(self, uid: int, data_type: Literal['string', 'bytes', 'dict'] = 'dict'):
-        """ Gets status of IPX device with given UID """
+    def get_status(self, uid: int, data_type: Literal['string', 'bytes', 'dict'] = 'dict', listen_duration: float = 0.5):
+        """ Gets status of IPX device with given UID
+        listen_duration is the silence that ends the reply, the pre-flight check uses a shorter one """
         # allowed data types check
         allowed_types = ['string', 'bytes', 'dict']
         if data_type not in allowed_types:
@@ -283,7 +302,7 @@ class IPXSerialCommunicator:
             logging.warning("UID 0 is reserved for broadcasting to all devices, please provide a valid device UID.")
             return ""
         else:
-            response = self._send_and_receive_listen(IPXCommands.Commands.get_status.format(uid=str(uid)))
+            response = self._send_and_receive_listen(IPXCommands.Commands.get_status.format(uid=str(uid)), listen_duration=listen_duration)
             response_str = self._decode_string_and_check(response) # use function for decoding and checkign instead
             
             if data_type == 'string':
@@ -294,21 +313,22 @@ class IPXSerialCommunicator:
             
             elif data_type == 'dict':
                # start with decoding to string
-                logging.debug(f"parsing response string to dictionary: {response_str}")
+                logging.debug("parsing response string to dictionary: %s", response_str)
                 status_dict = {} # initialise empty dict
                 for line in response_str.splitlines()[1:]: # splits string into a list of lines, and iterates over them (skipping first line)
                     if ':' in line: # lines containing : are processed
-                        logging.debug(f"Processing line: {line}")
+                        logging.debug("Processing line: %s", line)
                         key, value = line.split(':', 1) # split only on first colon
-                        logging.debug(f"Key: {key.strip()}, Value: {value.strip()}")
+                        logging.debug("Key: %s, Value: %s", key.strip(), value.strip())
                         status_dict[key.strip()] = value.strip() # strip removes and remaining leading/trailing whitespace and adds to dictionary
-                        logging.debug(f"Added to dictionary: {key.strip()} : {value.strip()}")
+                        logging.debug("Added to dictionary: %s : %s", key.strip(), value.strip())
                 return(status_dict) # may want to manipulate further to convert the numeric values to int/float later
 
 
 
-    def get_raw(self, uid: int, data_type: Literal['string', 'bytes', 'list', 'array'] = 'string') -> str:
-        """ Gets raw data from IPX device with given UID """
+    def get_raw(self, uid: int, data_type: Literal['string', 'bytes', 'list', 'array'] = 'string', listen_duration: float = 0.5) -> str:
+        """ Gets raw data from IPX device with given UID
+        listen_duration is the silence that ends the reply, the pre-flight check uses a shorter one """
         #1. validation check
         allowed_types = ['string', 'bytes', 'list', 'array']
         if data_type not in allowed_types:
@@ -318,7 +338,7 @@ class IPXSerialCommunicator:
             return ""
         
         # get response
-        response = self._send_and_receive_listen(IPXCommands.Commands.get_raw.format(uid=str(uid)))
+        response = self._send_and_receive_listen(IPXCommands.Commands.get_raw.format(uid=str(uid)), listen_duration=listen_duration)
    
         logging.debug('recieved response within get_raw functions and converted to response_str and raw_list')
         
@@ -347,6 +367,8 @@ class IPXSerialCommunicator:
         Args:
         uid(int): UID of device to calibrate
         data_type (str) 'parsed to return structured data (default), or 'string'"""
+        import pandas as pd # deferred, only needed once we calibrate
+
         #1. validation check
         allowed_types = ['dataframe', 'string']
         if data_type not in allowed_types:
@@ -406,7 +428,9 @@ class IPXSerialCommunicator:
         """ Sets UID of IPX device with given current UID to new UID """
         command = IPXCommands.Commands.set_uid.format(current_uid=str(current_uid), new_uid=str(new_uid))
         expected_response = IPXCommands.Responses.set_uid
-        response = self._send_and_receive_listen(command, listen_duration=self.DEFAULT_TIMEOUTS['set_uid'])
+        # returns as soon as the confirmation line arrives, so bulk remaps don't need a fixed delay per sensor
+        response = self._send_and_receive_listen(command, listen_duration=self.DEFAULT_TIMEOUTS['set_uid'],
+                                                 stop_on_string=expected_response)
         response = self._decode_string_and_check(response, expected_response=expected_response, command=command)
         return(response)
     
@@ -589,12 +613,165 @@ class IPXConfigurator:
             return None # return false if failed to detect correct number of sensors after retries
 
 
-    def set_default_parameters(self, ipx:IPXSerialCommunicator, uids_list: list, baud: int ,set_aliases: bool = True) -> list:
+    def apply_uid_remaps(self, ipx: IPXSerialCommunicator, remaps: list) -> list:
+        """Sets each sensor's new UID, in the order given (uid_remap.resolve_mappings orders them so no two
+        sensors ever share a UID). Each set_uid returns once the sensor confirms it, no fixed delay.
+        Args:
+            ipx (IPXSerialCommunicator): An instance of the IPXSerialCommunicator class
+            remaps (list): [{'old': uid, 'new': uid}, ...]
+        Returns:
+            list: the remaps applied (all of them, set_uid raises on the first one that fails)"""
+        applied = []
+        start_time = time.perf_counter()
+        for remap in remaps:
+            ipx.set_uid(current_uid=remap['old'], new_uid=remap['new'])
+            logging.info(f"Set UID {remap['old']} -> {remap['new']}")
+            applied.append(remap)
+        logging.debug("Applied %d UID changes in %.2fs", len(applied), time.perf_counter() - start_time)
+        return applied
+
+
+    def confirm_uids(self, ipx: IPXSerialCommunicator, expected_uids: set) -> tuple[set, set]:
+        """Checks the whole string with a single list_uids
+        Returns:
+            (set, set): expected UIDs that didn't answer, UIDs that answered but weren't expected (both empty if all good)"""
+        found_uids = set(ipx.list_uids(data_type='list'))
+        return set(expected_uids) - found_uids, found_uids - set(expected_uids)
+
+
+    def preflight_bus_check(self, ipx: IPXSerialCommunicator, uids_list: list) -> dict:
+        """Quick health sweep of the whole string before any calibration (a few seconds instead of finding a
+        wiring / termination fault several 20 s calibrations in). Every sensor gets get_status + get_raw,
+        round robin, with a short reply timeout (IPXCommands.Preflight_settings)
+        Checks per sensor: reply latency, no response / corrupted replies (undecodable, unparsable, status
+        answering for another UID, raw channel count different to the rest of the string). Raw magnitudes are only
+        compared across the string and flagged, the sensors aren't calibrated yet so there's no absolute limit
+        Args:
+            ipx (IPXSerialCommunicator): An instance of the IPXSerialCommunicator class
+            uids_list (list): UIDs in string order (top to bottom)
+        Returns:
+            dict: passed, failed / flagged UIDs, per sensor results ('nodes'), duration_s and a wiring hint"""
+        settings = IPXCommands.Preflight_settings
+        start_time = time.perf_counter()
+        nodes = {uid: {"queries": 0, "no_response": 0, "corrupted": 0, "latencies_ms": [], "raw_max_abs": None,
+                       "channels": Counter(), "problems": [], "warnings": []} for uid in uids_list}
+
+        with ipx.response_timeout(settings.Response_timeout_s):
+            for _ in range(settings.Rounds):
+                for uid in uids_list:
+                    node = nodes[uid]
+                    for query in ("get_status", "get_raw"):
+                        if node["queries"] and node["no_response"] == node["queries"]:
+                            break # never answered, waiting out more timeouts won't tell us anything new
+                        node["queries"] += 1
+                        try:
+                            if query == "get_status":
+                                status = ipx.get_status(uid=uid, listen_duration=settings.Listen_duration_s)
+                                if str(status.get("UID", uid)) != str(uid): # another sensor answering, or garbled
+                                    raise IPXCorruptedDataError(f"status answered for UID {status.get('UID')}")
+                            else:
+                                raw = ipx.get_raw(uid=uid, data_type='array', listen_duration=settings.Listen_duration_s)
+                                node["channels"][len(raw)] += 1
+                                raw_max_abs = int(np.max(np.abs(raw))) if len(raw) else 0
+                                node["raw_max_abs"] = max(node["raw_max_abs"] or 0, raw_max_abs)
+                                if len(raw) and not np.any(raw):
+                                    node["problems"].append("raw data all zero")
+                        except IPXNoResponseError:
+                            node["no_response"] += 1
+                            continue
+                        except (IPXCorruptedDataError, IPXVerificationError, ValueError) as e:
+                            logging.debug("Pre-flight %s on UID %s corrupted: %s", query, uid, e)
+                            node["corrupted"] += 1
+                            continue
+                        node["latencies_ms"].append(ipx.last_latency_s * 1000)
+
+        # every sensor on a string returns the same number of raw channels, the odd ones out are corrupted
+        string_channels = Counter()
+        for node in nodes.values():
+            string_channels.update(node["channels"])
+        expected_channels = string_channels.most_common(1)[0][0] if string_channels else None
+
+        failed, flagged = [], []
+        for uid, node in nodes.items():
+            odd_channels = sum(count for channels, count in node["channels"].items() if channels != expected_channels)
+            node["corrupted"] += odd_channels
+            node["error_rate"] = round((node["no_response"] + node["corrupted"]) / node["queries"], 3)
+            latencies = node.pop("latencies_ms")
+            node["latency_ms_median"] = round(float(np.median(latencies)), 1) if latencies else None
+            node["latency_ms_max"] = round(max(latencies), 1) if latencies else None
+            node["channels"] = dict(node["channels"])
+
+            if node["no_response"] == node["queries"]:
+                node["problems"].append("no response")
+            elif node["error_rate"] > settings.Max_error_rate:
+                node["problems"].append(f"{node['error_rate']:.0%} of queries failed ({node['no_response']} no response, {node['corrupted']} corrupted)")
+            node["problems"] = list(dict.fromkeys(node["problems"])) # all zero is reported once, not per reading
+
+        # uncalibrated raw magnitudes vary a lot between sensors (calibration means from tens to a few thousand), so
+        # only a sensor far above the rest of the string is flagged: modified z-score of the log magnitudes, as in
+        # abnormal_high_magnitude_check, and at least twice the string median. Calibration's raw data check decides
+        magnitudes = {uid: node["raw_max_abs"] for uid, node in nodes.items() if node["raw_max_abs"]}
+        if len(magnitudes) >= 3:
+            log_magnitudes = np.log1p(np.array(list(magnitudes.values()), dtype=float))
+            median = np.median(log_magnitudes)
+            mad = np.median(np.abs(log_magnitudes - median))
+            string_median = float(np.median(list(magnitudes.values())))
+            for uid, log_magnitude in zip(magnitudes, log_magnitudes):
+                z_score = 0.6745 * (log_magnitude - median) / mad if mad > 0 else 0.0
+                if z_score > settings.Raw_outlier_z and magnitudes[uid] > 2 * string_median:
+                    nodes[uid]["warnings"].append(f"raw magnitude {magnitudes[uid]} far above the string (median {string_median:.0f})")
+
+        for uid, node in nodes.items():
+            if node["problems"]:
+                node["result"] = "fail"
+                failed.append(uid)
+            elif node["warnings"] or node["error_rate"] > 0 or (node["latency_ms_median"] or 0) > settings.Slow_response_ms:
+                node["result"] = "flag"
+                flagged.append(uid)
+            else:
+                node["result"] = "ok"
+
+        # where in the string the faults are says what to look at
+        hint = None
+        if failed and len(failed) == len(uids_list):
+            hint = "no sensor passed, check the cable to the string, the baud rate and the termination"
+        elif len(failed) > 1 and failed == uids_list[len(uids_list) - len(failed):]:
+            hint = f"every sensor from UID {failed[0]} down fails, check the joint above it"
+        elif len(failed) + len(flagged) > len(uids_list) / 2:
+            hint = "errors along most of the string, check the termination and for a damaged cable"
+
+        duration = round(time.perf_counter() - start_time, 2)
+        logging.debug("Pre-flight bus check of %d sensors took %.2fs", len(uids_list), duration)
+        return {"passed": not failed, "failed": failed, "flagged": flagged, "duration_s": duration, "hint": hint,
+                "expected_channels": expected_channels, "nodes": nodes}
+
+
+    def status_sweep(self, ipx: IPXSerialCommunicator, uids_list: list) -> dict:
+        """Quick get_status of every sensor (pre-flight reply timeout), e.g. to confirm the string before resuming a run
+        Returns:
+            dict: {uid: status dict, or None if it did not answer or answered for another UID}"""
+        settings = IPXCommands.Preflight_settings
+        statuses = {}
+        with ipx.response_timeout(settings.Response_timeout_s):
+            for uid in uids_list:
+                try:
+                    status = ipx.get_status(uid=uid, listen_duration=settings.Listen_duration_s)
+                except (IPXNoResponseError, IPXCorruptedDataError):
+                    statuses[uid] = None
+                    continue
+                statuses[uid] = status if str(status.get("UID", uid)) == str(uid) else None
+        return statuses
+
+
+    def set_default_parameters(self, ipx:IPXSerialCommunicator, uids_list: list, baud: int ,set_aliases: bool = True,
+                               done_uids: set = frozenset(), on_sensor_done=None) -> list:
         """Private helper to loop through all uids and apply standard configurations + aliases
         Args:
             ipx (IPXSerialCommunicator): An instance of the IPXSerialCommunicator class
             uids_list (list): List of UIDs to configure
             set_aliases (bool): Whether to set aliases for the sensors  
+            done_uids (set): UIDs already set (resumed run), skipped, their aliases still come from their place in uids_list
+            on_sensor_done (callable): called with each uid once its parameters are set (run checkpoint)
             Returns:
             list: A list of tuples containing (alias, uid) if aliases are set, else a list of uids (for referecne later on)"""
         logging.debug ("Appling deafualt parameters to all detected sensors...")
@@ -608,7 +785,10 @@ class IPXConfigurator:
 
                 alias = str(alias_uid_tuple[0]) # extract alias
                 uid = str(alias_uid_tuple[1]) # extract uid
+                if alias_uid_tuple[1] in done_uids:
+                    continue
                 logging.info(f"Beginning setting process for sensor uid :{uid}")
+                live_view.update(uid, alias=alias, stage="parameters", state="running")
                 # now need to set all the paramaters, use all default config parameters in the IPXCommands section:
                 
                 ipx.set_baud(uid, baud) # set baud first to prevent any errors
@@ -627,6 +807,9 @@ class IPXConfigurator:
                 ipx.set_term(uid=uid, termination=IPXCommands.Default_settings.Termination)
 
                 logging.info(f"Setting parameters complete for sensor with uid:{uid}")
+                live_view.update(uid, state="ok")
+                if on_sensor_done is not None:
+                    on_sensor_done(alias_uid_tuple[1])
             logging.info("All sensors have been set with default parameters")
             return aliases_and_uids_list # return this for reference later on (useful in main.py for generating a .txt file with uids and corresponding aliases)
             # alias and uid list is of format [(uid, alias), (uid, alias),.....] etc, with the last sensors uid being at the start of the list
@@ -634,7 +817,10 @@ class IPXConfigurator:
 
         else: # gxm inserts, so set all other paramaters except aliases:
             for uid in uids_list:
+                if uid in done_uids:
+                    continue
                 logging.info(f"Beginning setting process for sensor uid :{uid}")
+                live_view.update(uid, stage="parameters", state="running")
                 # now need to set all the paramaters, use all default config parameters in the IPXCommands section:
                 
                 ipx.set_baud(uid, baud) # set baud first to prevent any errors
@@ -650,6 +836,9 @@ class IPXConfigurator:
                 ipx.set_term(uid=uid, termination=IPXCommands.Default_settings.Termination)
 
                 logging.info(f"Setting parameters complete for sensor with uid:{uid}")
+                live_view.update(uid, state="ok")
+                if on_sensor_done is not None:
+                    on_sensor_done(uid)
             logging.info("All sensors have been set with default parameters")
             return uids_list # return this for reference later on
 
@@ -657,7 +846,7 @@ class IPXConfigurator:
 # VALIDATION FUNCTIONS SHOULD ALWAYS RETURN A CONSISTENT TUPLE (SUCCESS BOOLEAN, DATA)
 
 
-    def validate_calibration_results(self, cal_df: pd.DataFrame) -> tuple[bool, list| None]:
+    def validate_calibration_results(self, cal_df: "pd.DataFrame") -> tuple[bool, list| None]:
         """
         Checks calibration DataFrame for zero mean OR zero std dev across all axes.
         Args:
@@ -764,14 +953,14 @@ class IPXConfigurator:
         for pair in pairs:
             tuple_1, tuple_2 = pair # split data tuples into seperate tuples
             len_tuple = len(tuple_1)
-            logging.debug(f"comparing tuples : {tuple_1} and {tuple_2}")
+            logging.debug("comparing tuples : %s and %s", tuple_1, tuple_2)
 
             num_no_change = 0 # reset counter for each pair comparison
             for i in sensor_index: # iterate over the tuple values and compare them by index, if same value detected, increment counter by 1
                 if tuple_1[i] == tuple_2[i]:
                     num_no_change += 1
 
-                    logging.debug(f"No change detected at index {i} between readings: {tuple_1} and {tuple_2}. Value was {tuple_1[i]}")
+                    logging.debug("No change detected at index %s between readings: %s and %s. Value was %s", i, tuple_1, tuple_2, tuple_1[i])
             if num_no_change > num_no_changes_allowed:
                 logging.warning(f" Raw data check failed for UID:{uid}, {num_no_change} instances of no change detected between readings")
                 return False, raw_values
@@ -20,6 +20,82 @@ class IPXCommands:
         N_stds: int = 10
 
 
+    # Pre-flight bus check, a quick get_status / get_raw sweep of every sensor before calibration (IPXConfigurator.preflight_bus_check)
+    class Preflight_settings:
+        Enabled: bool = True
+        Rounds: int = 2 # get_status + get_raw of every sensor, per round
+        Response_timeout_s: float = 0.5 # a sensor that hasn't started replying by then counts as no response
+        Listen_duration_s: float = 0.05 # silence that ends a reply (normal commands wait 0.5 s)
+        Max_error_rate: float = 0.25 # sensors failing more of their queries than this fail the check
+        Slow_response_ms: float = 250 # sensors slower than this to start replying are flagged
+        Raw_outlier_z: float = 3.5 # raw magnitude modified z-score (vs the rest of the string) above which a sensor is flagged, never failed
+
+
+    # Geosense (ascii TR/SR) settings for inserts
+    class Geosense_settings:
+        Conversion_time_s: float = 0.4 # time the insert needs after a TR before the SR reading is ready
+        Read_deadline_s: float = 0.5 # max time for a complete TR/SR reply line to arrive
+
+        # acceptance
+        Acceptance_mode: str = "single" # 'single' (one sample, truncated AxisA must be exactly -0.099) or 'statistical' (opt in: K samples, mean + spread bands below)
+        Samples_per_insert: int = 5
+        Min_valid_samples: int = 3 # inserts with fewer good samples than this are re-measured individually
+        Target_axis_a_deg: float = -0.099
+        Axis_a_mean_tolerance_deg: float = 0.002
+        Axis_a_max_std_deg: float = 0.002
+        Temperature_min_c: float = 10
+        Temperature_max_c: float = 40
+
+
+    # Report settings
+    class Report_settings:
+        Plot_mode: str = "consolidated" # 'consolidated' (one calibration html per run), 'per_sensor' (2 html files per sensor) or 'none' (render later with render_plots.py)
+        Writer_queue_size: int = 32 # max report files waiting for the background writer before callers block
+        Journal_fsync_every: int = 10 # run journal is fsynced after this many events...
+        Journal_fsync_interval_s: float = 1.0 # ...or after this many seconds, whichever comes first
+        Catalogue_db_path: str = "production_runs/catalogue.sqlite" # run_catalogue.py index / query
+
+
+    # Logging settings (ipx_logging.py)
+    class Logging_settings:
+        Run_log_level: str = "INFO" # per-run json log level, independent of the console verbosity (DEBUG logs every serial line, only to chase a problem)
+        Run_log_max_bytes: int = 10 * 1024 * 1024 # per-run log rotates after this...
+        Run_log_backups: int = 5 # ...keeping this many old files
+
+
+    # Terminal display settings (live_view.py)
+    class Display_settings:
+        Live_view: str = "auto" # 'auto' (rich if installed, else in-place ansi, plain table when not a terminal), 'rich', 'ansi', 'plain' or 'off'
+        Refresh_fps: float = 4 # max redraws per second, however fast the bus updates come in
+
+
+    # Session time estimates from past runs (session_estimator.py)
+    class Estimator_settings:
+        History_runs: int = 200 # newest reports used for the model, so it follows the bench as it is now
+        Min_runs: int = 3 # fewer runs than this on the bench and the estimate uses every station's runs
+        Changeover_s: float = 300 # connecting / disconnecting a string between runs, not in the reports
+        Shift_hours: float = 7.5 # bench hours per day, for the capacity plan
+        Confidence: float = 0.9 # a day's plan should fit in the shift with this probability
+
+
+    # Station daemon settings (station_daemon.py)
+    class Daemon_settings:
+        Host: str = "127.0.0.1" # local only, the api has no authentication
+        Port: int = 8765
+        Max_events_per_job: int = 5000 # oldest progress events are dropped after this (the full log is in the run files)
+        Finished_jobs_kept: int = 200 # finished jobs forgotten after this, oldest first
+
+
+    # Modbus verification settings (IPXModbusTester)
+    class Modbus_settings:
+        Request_retries: int = 3 # re-sends after a timeout / CRC / framing error, done by the tester so each attempt is counted
+
+
+    # Modbus metrics settings
+    class Metrics_settings:
+        Prometheus_textfile_dir: str = "" # directory for prometheus .prom textfile export (e.g. node_exporter textfile dir), empty string disables export
+
+
     # # Serial communication settings
     # class Serial_settings:
     #     Baud_rates: list[int] = [9600, 115200]
@@ -1,17 +1,23 @@
 import time
 import struct
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 import logging
+import os
+import re
 
 from pymodbus.client import ModbusSerialClient
 from pymodbus import FramerType
-from pymodbus.exceptions import ModbusException
+from pymodbus.exceptions import ModbusException, ModbusIOException
+from pymodbus.pdu import ExceptionResponse
 
-from IPX import IPXSerialCommunicator
+from IPX import IPXSerialCommunicator, IPXSerialError, IPXNoResponseError, IPXCorruptedDataError, IPXVerificationError
 from IPX_Config import IPXCommands
 from typing import Literal
 import math
+import warnings
+
+import numpy as np
 
 
 # logging.basicConfig(
@@ -33,6 +39,166 @@ class IPXModbusWriteError(IPXModbusError):
 #-----------------------------------------------------------------------------------------------------------
 
 
+#--------------------------- Transaction metrics / bus-health counters -------------------------
+# Every modbus request goes through IPXModbusTester._timed_request, which records one of these outcomes
+MODBUS_OUTCOMES = ("ok", "timeout", "crc_framing_error", "exception_response", "other_error")
+
+
+@dataclass
+class ModbusAliasMetrics:
+    """ Counters and latencies for all modbus transactions sent to one alias (modbus address) """
+    alias: int
+    requests: int = 0
+    ok: int = 0
+    timeout: int = 0
+    crc_framing_error: int = 0 # bytes came back, but not a valid frame (bad CRC, truncated, garbled)
+    exception_response: int = 0
+    other_error: int = 0
+    retries: int = 0 # requests re-sent after a timeout / CRC / framing error (each attempt is counted above as well)
+    test_reruns: int = 0 # number of times a full test was re-run for this alias
+    latencies_s: List[float] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        """ Returns a json friendly summary of the counters, latencies in ms """
+        latencies = sorted(self.latencies_s)
+        summary = {"requests": self.requests, "retries": self.retries, "test_reruns": self.test_reruns}
+        for outcome in MODBUS_OUTCOMES:
+            summary[outcome] = getattr(self, outcome)
+        if latencies:
+            summary["latency_ms_mean"] = round(1000 * sum(latencies) / len(latencies), 2)
+            summary["latency_ms_p50"] = round(1000 * _percentile(latencies, 0.5), 2)
+            summary["latency_ms_p95"] = round(1000 * _percentile(latencies, 0.95), 2)
+            summary["latency_ms_max"] = round(1000 * latencies[-1], 2)
+        return summary
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    """ Nearest rank percentile of an already sorted list """
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ModbusBusMetrics:
+    """
+    Collects per-alias transaction metrics for one modbus session.
+    Exposed on IPXModbusTester as .metrics, summarised into the run report and
+    optionally exported as a prometheus textfile (so a bad adapter can be told apart from a bad sensor)
+    """
+    def __init__(self):
+        self.per_alias: Dict[int, ModbusAliasMetrics] = {}
+
+    def for_alias(self, alias: int) -> ModbusAliasMetrics:
+        """ Gets (or creates) the metrics object for an alias """
+        alias = int(alias)
+        if alias not in self.per_alias:
+            self.per_alias[alias] = ModbusAliasMetrics(alias=alias)
+        return self.per_alias[alias]
+
+    def record(self, alias: int, latency_s: float, outcome: str):
+        """ Records one modbus transaction """
+        if outcome not in MODBUS_OUTCOMES:
+            raise ValueError(f"Invalid outcome '{outcome}'. Allowed outcomes are: {MODBUS_OUTCOMES}")
+        alias_metrics = self.for_alias(alias)
+        alias_metrics.requests += 1
+        setattr(alias_metrics, outcome, getattr(alias_metrics, outcome) + 1)
+        alias_metrics.latencies_s.append(latency_s)
+
+    def record_retry(self, alias: int):
+        """ Records that a request to this alias is being sent again """
+        self.for_alias(alias).retries += 1
+
+    def record_test_rerun(self, alias: int):
+        """ Records that the full test for this alias had to be repeated """
+        self.for_alias(alias).test_reruns += 1
+
+    def totals(self) -> dict:
+        """ Bus wide totals across every alias """
+        totals = {"requests": 0, "retries": 0, "test_reruns": 0}
+        for outcome in MODBUS_OUTCOMES:
+            totals[outcome] = 0
+        all_latencies = []
+        for alias_metrics in self.per_alias.values():
+            totals["requests"] += alias_metrics.requests
+            totals["retries"] += alias_metrics.retries
+            totals["test_reruns"] += alias_metrics.test_reruns
+            for outcome in MODBUS_OUTCOMES:
+                totals[outcome] += getattr(alias_metrics, outcome)
+            all_latencies.extend(alias_metrics.latencies_s)
+        if all_latencies:
+            all_latencies.sort()
+            totals["latency_ms_mean"] = round(1000 * sum(all_latencies) / len(all_latencies), 2)
+            totals["latency_ms_p95"] = round(1000 * _percentile(all_latencies, 0.95), 2)
+            totals["latency_ms_max"] = round(1000 * all_latencies[-1], 2)
+        return totals
+
+    def summary(self) -> dict:
+        """ Full summary, of format {"totals": {...}, "per_alias": {alias: {...}}} """
+        return {
+            "totals": self.totals(),
+            "per_alias": {str(alias): m.summary() for alias, m in sorted(self.per_alias.items())},
+        }
+
+    def write_prometheus_textfile(self, filepath: str, labels: Optional[Dict[str, str]] = None):
+        """ Writes counters in the prometheus text exposition format (for node_exporter textfile collector)
+        File is written to a temp file and renamed, so a scraper never sees half a file
+        Args:
+            filepath (str): Path of the .prom file to write
+            labels (dict): Extra labels added to every sample (e.g. station, port)
+        """
+        base_labels = dict(labels or {})
+
+        def fmt_labels(**extra) -> str:
+            all_labels = {**base_labels, **{k: str(v) for k, v in extra.items()}}
+            escaped = []
+            for key, value in all_labels.items():
+                value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                escaped.append(f'{key}="{value}"')
+            return "{" + ",".join(escaped) + "}"
+
+        lines = [
+            "# HELP ipx_modbus_requests_total Modbus transactions sent to each alias, by outcome",
+            "# TYPE ipx_modbus_requests_total counter",
+        ]
+        for alias, m in sorted(self.per_alias.items()):
+            for outcome in MODBUS_OUTCOMES:
+                lines.append(f"ipx_modbus_requests_total{fmt_labels(alias=alias, outcome=outcome)} {getattr(m, outcome)}")
+        lines += [
+            "# HELP ipx_modbus_retries_total Requests re-sent to each alias after a timeout or CRC / framing error",
+            "# TYPE ipx_modbus_retries_total counter",
+        ]
+        for alias, m in sorted(self.per_alias.items()):
+            lines.append(f"ipx_modbus_retries_total{fmt_labels(alias=alias)} {m.retries}")
+        lines += [
+            "# HELP ipx_modbus_test_reruns_total Full test re-runs for each alias",
+            "# TYPE ipx_modbus_test_reruns_total counter",
+        ]
+        for alias, m in sorted(self.per_alias.items()):
+            lines.append(f"ipx_modbus_test_reruns_total{fmt_labels(alias=alias)} {m.test_reruns}")
+        lines += [
+            "# HELP ipx_modbus_request_latency_seconds Modbus request latency for each alias",
+            "# TYPE ipx_modbus_request_latency_seconds summary",
+        ]
+        for alias, m in sorted(self.per_alias.items()):
+            latencies = sorted(m.latencies_s)
+            if latencies:
+                for quantile in (0.5, 0.95):
+                    lines.append(f"ipx_modbus_request_latency_seconds{fmt_labels(alias=alias, quantile=quantile)} "
+                                 f"{_percentile(latencies, quantile):.6f}")
+            lines.append(f"ipx_modbus_request_latency_seconds_sum{fmt_labels(alias=alias)} {sum(latencies):.6f}")
+            lines.append(f"ipx_modbus_request_latency_seconds_count{fmt_labels(alias=alias)} {len(latencies)}")
+
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w", newline="\n") as prom_file:
+            prom_file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, filepath)
+        logging.debug(f"Wrote modbus metrics textfile to {filepath}")
+
+#-----------------------------------------------------------------------------------------------------------
+
+
 # ------------------------------ Class for production testing using modbus (instead of datalogger) -------------------------------
 class IPXModbusTester:
     """
@@ -70,6 +236,11 @@ class IPXModbusTester:
         self.DISTANCE_REG = 0X0136
         self.TEMP_REG = 0X0139
         self.VOLTAGE_REG = 0X013C
+
+        self.retries = IPXCommands.Modbus_settings.Request_retries
+        self.metrics = ModbusBusMetrics() # transaction timings + bus health counters for this session
+        self._tested_aliases = set() # aliases that have already had a full test, so re-runs are counted
+        self._received = bytearray() # raw bytes received during the current request attempt (_trace_packet)
         
     
 # Enter/exit for context manager -----------------------------------------------------
@@ -94,7 +265,9 @@ class IPXModbusTester:
                 stopbits=1,
                 bytesize=8,
                 timeout=self.timeout,
-                framer=FramerType.RTU
+                framer=FramerType.RTU,
+                retries=0, # retried in _timed_request instead, so every attempt is counted
+                trace_packet=self._trace_packet,
             )
             logging.debug(f"Attempting to connect to Modbus on {self.port}...")
             if not self.client.connect(): # if failed to connect raise error
@@ -114,6 +287,58 @@ class IPXModbusTester:
             self.client.close()
             logging.info(f"Disconnected from Modbus on {self.port}")
 
+    def _trace_packet(self, sending: bool, data: bytes) -> bytes:
+        """ pymodbus packet hook, keeps the bytes received so a failed attempt can be told apart (silence vs garbled frame) """
+        if not sending:
+            self._received += data
+        return data
+
+    def _timed_request(self, alias: int, request_func, **kwargs):
+        """ Sends one modbus request through request_func (e.g. self.client.read_holding_registers),
+        timing every attempt and recording its outcome in self.metrics.
+        The client itself does not retry, requests that time out or come back garbled are re-sent here
+        (up to self.retries times), so the counters see every fault on the bus.
+        Exceptions are re-raised and error responses are returned as normal, so callers handle them as before"""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.metrics.record_retry(alias)
+            self._received = bytearray()
+            start = time.perf_counter()
+            try:
+                response = request_func(**kwargs)
+            except ModbusIOException: # no valid response within the timeout
+                outcome = "crc_framing_error" if self._received else "timeout"
+                self.metrics.record(alias, time.perf_counter() - start, outcome)
+                logging.debug("Modbus request %s to alias %s: %s (attempt %s)", request_func.__name__, alias, outcome, attempt + 1)
+                if attempt < self.retries:
+                    continue
+                raise
+            except ModbusException as e: # pymodbus raises these for bad frames it could not recover from
+                outcome = "crc_framing_error" if any(word in str(e).lower() for word in ("crc", "frame", "invalid message")) else "other_error"
+                self.metrics.record(alias, time.perf_counter() - start, outcome)
+                if outcome == "crc_framing_error" and attempt < self.retries:
+                    continue
+                raise
+            except Exception:
+                self.metrics.record(alias, time.perf_counter() - start, "other_error")
+                raise
+
+            latency = time.perf_counter() - start
+            if isinstance(response, ModbusIOException): # older pymodbus versions return this instead of raising
+                outcome = "crc_framing_error" if self._received else "timeout"
+            elif isinstance(response, ExceptionResponse): # device replied with a modbus exception code
+                outcome = "exception_response"
+            elif response.isError():
+                outcome = "other_error"
+            else:
+                outcome = "ok"
+            self.metrics.record(alias, latency, outcome)
+            logging.debug("Modbus request %s to alias %s: %s in %.1f ms", request_func.__name__, alias, outcome, latency * 1000)
+            if outcome in ("timeout", "crc_framing_error") and attempt < self.retries:
+                continue
+            return response
+
+
     def _regs_to_float(self, msw: int, lsw: int) -> float:
         """ Convert two 16-bit registers (Big Endian) (MSW, LSW) to a float32 value """
         raw = (msw << 16) | lsw
@@ -136,7 +361,9 @@ class IPXModbusTester:
         try:
 
             #1. Trigger measurement (write to register 0x0063):
-            write_result = self.client.write_register(
+            write_result = self._timed_request(
+                alias,
+                self.client.write_register,
                 address=self.TRIGGER_REG,
                 value=0xFFFF,
                 device_id=alias,
@@ -155,7 +382,9 @@ class IPXModbusTester:
 
             #3. read status:
             logging.debug("Reading status...")
-            rr_status = self.client.read_holding_registers(
+            rr_status = self._timed_request(
+                alias,
+                self.client.read_holding_registers,
                 address=self.STATUS_REG,
                 count=1,
                 device_id=alias,)
@@ -165,11 +394,13 @@ class IPXModbusTester:
             else:
                 result["Status"] = rr_status.registers[0]
             
-            logging.debug(f"Status read successfully")   
+            logging.debug("Status read successfully")   
             
             #4. read distance:
             logging.debug("Reading distance...")
-            rr_distance = self.client.read_holding_registers(
+            rr_distance = self._timed_request(
+                alias,
+                self.client.read_holding_registers,
                 address=self.DISTANCE_REG,
                 count=2,
                 device_id=alias,)
@@ -180,11 +411,13 @@ class IPXModbusTester:
                 distance = self._regs_to_float(rr_distance.registers[0], rr_distance.registers[1]) # convert from bytes to python float
                 result["Distance_mm"] = distance
             
-            logging.debug(f"Distance read successfully")
+            logging.debug("Distance read successfully")
 
             #5. read temperature:
             logging.debug("Reading temperature...")
-            rr_temp = self.client.read_holding_registers(
+            rr_temp = self._timed_request(
+                alias,
+                self.client.read_holding_registers,
                 address=self.TEMP_REG,
                 count=2,
                 device_id=alias,)
@@ -194,11 +427,13 @@ class IPXModbusTester:
             else:
                 temperature = self._regs_to_float(rr_temp.registers[0], rr_temp.registers[1])
                 result["Temperature"] = temperature
-            logging.debug(f"Temperature read successfully")
+            logging.debug("Temperature read successfully")
 
             #6. read voltage:
             logging.debug("Reading voltage...")
-            rr_voltage = self.client.read_holding_registers(
+            rr_voltage = self._timed_request(
+                alias,
+                self.client.read_holding_registers,
                 address=self.VOLTAGE_REG,
                 count=2,
                 device_id=alias,)
@@ -208,7 +443,7 @@ class IPXModbusTester:
             else:
                 voltage = self._regs_to_float(rr_voltage.registers[0], rr_voltage.registers[1])
                 result["Voltage"] = voltage
-            logging.debug(f"Voltage read successfully")
+            logging.debug("Voltage read successfully")
 
             log_msg = (f" Datalogger test results for: \n"
                        "\n=============================== \n"
@@ -300,6 +535,11 @@ class IPXModbusTester:
         Returns:
             dict: Flattened dictionary with all results and pass/fail flags.
         """
+        # count re-runs of the same alias (e.g. through retry_on_exception)
+        if alias in self._tested_aliases:
+            self.metrics.record_test_rerun(alias)
+        self._tested_aliases.add(alias)
+
         # 1. Run the measurement
         measurements = self.datalogger_test(uid=uid, alias=alias)
         
@@ -329,7 +569,7 @@ class IPXModbusTester:
             # Combine all failure messages into one string
             "Errors": "; ".join(verification.get("failures", []))
         }
-        logging.debug(f"Flattened record created successfully: {flat_record}")
+        logging.debug("Flattened record created successfully: %s", flat_record)
         return flat_record# flat dictionary is for easy logging int pandas dataframe, so we can save the results as a csv file easily.
 
 
@@ -380,7 +620,102 @@ class IPXGeosenseTester:
         self.communicator.__exit__(exc_type, exc_value, traceback)
         return
     
-    # need to add the IPX geosense ascii command ( this should be an internal function):
+    # ------------------------------ Geosense transport (line framed) ------------------------------
+    def _read_gxm_line(self, deadline: float) -> bytes:
+        """ Reads one reply line from the insert, framed on \\r or \\n
+        Returns as soon as the line terminator arrives, so there is no silence window to wait out
+        Args:
+            deadline (float): time.monotonic() value by which the full line must have arrived
+        Returns:
+            bytes: the line without its terminator
+        """
+        connection = self.communicator.connection
+        line = bytearray()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.error(f"Geosense reply not complete within deadline, received so far: {bytes(line)}")
+                raise IPXNoResponseError("No complete Geosense reply received within the read deadline.")
+            waiting = connection.in_waiting
+            if not waiting:
+                connection.timeout = remaining # block for the next byte, but never past the deadline
+            chunk = connection.read(waiting or 1)
+            for byte in chunk:
+                if byte in (0x0D, 0x0A): # \r or \n
+                    if line: # ignore leftover terminators (e.g. the \n of a previous \r\n) before the line starts
+                        return bytes(line)
+                else:
+                    line.append(byte)
+
+    def _gxm_transaction(self, command: str, expected_prefix: str, geo_uid: int) -> tuple[bytes, str]:
+        """ Sends one Geosense ascii command and reads back its single line reply
+        Validates the reply starts with the expected prefix (TR/SR) and that the echoed UID is the one addressed
+        Args:
+            command (str): formatted command string (e.g. "@@40901186 SR\\r")
+            expected_prefix (str): reply prefix to expect
+            geo_uid (int): 8 digit geosense uid the command was sent to
+        Returns:
+            (bytes, str): the raw reply line and the decoded reply string
+        """
+        connection = self.communicator.connection
+        if not connection:
+            logging.error("ERROR: Not connected")
+            raise IPXSerialError("Not connected to any serial device.")
+
+        original_timeout = connection.timeout
+        try:
+            connection.reset_input_buffer() # only read the reply to *this* command
+            connection.write(command.encode("UTF-8"))
+            logging.debug("Sent command: %s", command.strip())
+            raw_line = self._read_gxm_line(deadline=time.monotonic() + IPXCommands.Geosense_settings.Read_deadline_s)
+        finally:
+            connection.timeout = original_timeout
+
+        try:
+            line = raw_line.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            logging.error(f"Corrupted data recieved: UTF-8 decode failed: {raw_line}")
+            raise IPXCorruptedDataError("Corrupted data could not decode UTF-8 bytes | Please check connection and try again")
+        logging.debug("Received response: %s", line)
+
+        if not line.upper().startswith(expected_prefix.upper()):
+            error_message = f"verification failed for command: {command.strip()} Expected reply to start with {expected_prefix}, but got {line}"
+            logging.error(error_message)
+            raise IPXVerificationError(error_message)
+
+        # echoed uid is the first field after the prefix, e.g. SR <UID>,<AxisA>,<temperature>
+        echoed_uid = re.split(r"[,\s]+", line[len(expected_prefix):].strip())[0]
+        if echoed_uid or expected_prefix == IPXCommands.Responses.get_GXM_measurement: # SR replies must always echo the uid
+            if not self._uid_matches(echoed_uid, geo_uid):
+                error_message = f"verification failed for command: {command.strip()} Expected reply from UID {geo_uid}, but got {line}"
+                logging.error(error_message)
+                raise IPXVerificationError(error_message)
+        return raw_line, line
+
+    @staticmethod
+    def _uid_matches(echoed_uid: str, geo_uid: int) -> bool:
+        """ Checks an echoed uid against the addressed 8 digit geosense uid (also accepts the full 10 digit uid) """
+        if not echoed_uid.isdigit():
+            return False
+        if int(echoed_uid) == geo_uid:
+            return True
+        return len(echoed_uid) == 10 and int(echoed_uid[2:]) == geo_uid
+
+    def _trigger_gxm(self, geo_uid: int) -> str:
+        """ Sends the TR command to one insert, which starts a measurement
+        Returns as soon as the TR reply line is received (the measurement is then converting on the insert)"""
+        logging.debug("Sending GXM measurement trigger command to %s...", geo_uid)
+        trigger_command = IPXCommands.Commands.GXM_measure_command.format(uid=str(geo_uid))
+        _, response_str = self._gxm_transaction(trigger_command, IPXCommands.Responses.GXM_measure_command, geo_uid)
+        return response_str
+
+    def _read_gxm(self, geo_uid: int) -> tuple[bytes, str]:
+        """ Sends the SR command to one insert, and returns the (bytes, string) of the SR reply
+        The insert must have been triggered at least one conversion time before"""
+        logging.debug("Sending GXM measurement get command to %s...", geo_uid)
+        command = IPXCommands.Commands.get_GXM_measurement.format(uid=str(geo_uid))
+        return self._gxm_transaction(command, IPXCommands.Responses.get_GXM_measurement, geo_uid)
+
     def _get_gxm_measurement(self, geo_uid:int, data_type: Literal['string', 'bytes'] = 'string'): 
         """UID IS 8 DIGIT (1 0 are missing)
           Gets measurement from IPX insert using geosense protocol
@@ -397,43 +732,27 @@ class IPXGeosenseTester:
             logging.warning("UID 0 is reserved for broadcasting to all devices, please provide a valid device UID.")
             return ""
         # First of all we need to do a TR command to trigger measurement
-        logging.debug("Sending GXM measurement trigger command...")
-        trigger_command = IPXCommands.Commands.GXM_measure_command.format(uid=str(geo_uid))
-        response = self.communicator._send_and_receive_listen(trigger_command, listen_duration=0.5) # The listen duration of 0.5 should give enough time for the insert to take measurement, and measurement to be ready
-        response_str = self.communicator._decode_string_and_check(response, expected_response=IPXCommands.Responses.GXM_measure_command)
+        self._trigger_gxm(geo_uid)
+        # give the insert time to take the measurement, and measurement to be ready
+        time.sleep(IPXCommands.Geosense_settings.Conversion_time_s)
         # Now we can send the SR command to get the measurement
-
-        logging.debug("Sending GXM measurement get command...")
-        command = IPXCommands.Commands.get_GXM_measurement.format(uid=str(geo_uid))
-        response = self.communicator._send_and_receive_listen(command, listen_duration=0.5)
-        response_str = self.communicator._decode_string_and_check(response, expected_response=IPXCommands.Responses.get_GXM_measurement)
+        response, response_str = self._read_gxm(geo_uid)
 
         if data_type == 'bytes':
             return(response)
         elif data_type == 'string':
             return(response_str)
 
-        
-    def gxm_measure_test(self, uid:int) -> dict:
-        """ Performs GXM measurement sample for one insert, and verifies whether the response is ok
-        Args:
-            geo_uid (int): UID of the IPX insert
-        Returns:
-            dict: dictionary with relevant data:
-            {
-                "uid": uid,
-                "axis_a": float,
-                "temperature": float,
-                "pass": bool
-            }
-        """
 
-        logging.debug(f"Starting GXM measurement test for IPX insert with UID {uid}")
-        # remove first two digits from uid for geosense command
-        geo_uid = int(str(uid)[2:])
+    @staticmethod
+    def _to_geo_uid(uid: int) -> int:
+        """ remove first two digits from uid for geosense command (geosense uids are 8 digits) """
+        return int(str(uid)[2:])
 
-        response_str = self._get_gxm_measurement(geo_uid=geo_uid, data_type='string')
-        logging.debug(f"Received response: {response_str}")
+
+    @staticmethod
+    def _split_gxm_reply(response_str: str) -> tuple[float, float]:
+        """ Splits an SR reply into its raw (AxisA, temperature) values """
         # slpit up the response string
         # expected format: SR <UID>,<AxisA>,<temperature>\r\n
         # should also remove "SR "
@@ -443,16 +762,25 @@ class IPXGeosenseTester:
         # part[0] = UID
         # part[1] = AxisA, should also be to 3 decimal places
         # part[2] = temperature
+        return float(parts[1]), float(parts[2])
+
+
+    def _parse_gxm_response(self, uid: int, response_str: str) -> dict:
+        """ Parses an SR reply and checks the values are within the expected ranges
+        Args:
+            uid (int): Full UID of the IPX insert
+            response_str (str): SR reply string
+        Returns:
+            dict: {"uid": uid, "axis_a": float, "temperature": float, "pass": bool}
+        """
+        AxisA_raw, temperature = self._split_gxm_reply(response_str)
         # Axis A need arcsin on it
-        AxisA_raw = float(parts[1])
         # add check for value being in range -1 to 1
         AxisA_clamped = max(-1.0, min(1.0, AxisA_raw))
         if AxisA_raw != AxisA_clamped:
             logging.warning(f"AxisA raw value {AxisA_raw} was out of domain for asin, clamped to {AxisA_clamped}")
 
-        AxisA = math.trunc(math.degrees(math.asin(AxisA_raw)) * 1000) / 1000 # trunc apparently only works on integer part, so multiply first then truncate then divide again ( by 1000 for 3 decimal places)
-
-        temperature = float(parts[2])
+        AxisA = math.trunc(math.degrees(math.asin(AxisA_clamped)) * 1000) / 1000 # trunc apparently only works on integer part, so multiply first then truncate then divide again ( by 1000 for 3 decimal places)
 
 
         # ---------------- Checks ----------------
@@ -464,11 +792,11 @@ class IPXGeosenseTester:
         }
 
         if not checks["axis_a"]:
-            logging.warning(f"Axis A check failed: {AxisA}° (expected -0.099°)")
+            logging.warning(f"Axis A check failed for UID {uid}: {AxisA}° (expected -0.099°)")
 
 
         if not checks["temperature"]:
-            logging.warning(f"Temperature check failed: {temperature} °C (expected 10–40 °C)")
+            logging.warning(f"Temperature check failed for UID {uid}: {temperature} °C (expected 10–40 °C)")
         
 
         pass_flag = all(checks.values()) # should be true if all checks passed
@@ -478,4 +806,202 @@ class IPXGeosenseTester:
                     "axis_a": AxisA,
                     "temperature": temperature,
                     "pass": pass_flag}
-        return result
\ No newline at end of file
+        return result
+
+        
+    def gxm_measure_test(self, uid:int) -> dict:
+        """ Performs GXM measurement sample for one insert, and verifies whether the response is ok
+        Args:
+            geo_uid (int): UID of the IPX insert
+        Returns:
+            dict: dictionary with relevant data:
+            {
+                "uid": uid,
+                "axis_a": float,
+                "temperature": float,
+                "pass": bool
+            }
+        """
+
+        logging.debug(f"Starting GXM measurement test for IPX insert with UID {uid}")
+        geo_uid = self._to_geo_uid(uid)
+
+        response_str = self._get_gxm_measurement(geo_uid=geo_uid, data_type='string')
+        logging.debug("Received response: %s", response_str)
+        return self._parse_gxm_response(uid, response_str)
+
+
+    def _gxm_cycle(self, uids: list) -> tuple[dict, dict]:
+        """ One batched trigger-then-collect cycle across the string:
+            - TR sent to every insert back to back (each insert replies straight away and starts converting)
+            - wait once for the conversion time (counted from the last trigger)
+            - SR sent to every insert to collect the readings
+        (the geosense protocol needs a TR reply per insert, so triggers are addressed rather than broadcast on uid 0)
+
+        Args:
+            uids (list): Full UIDs of the IPX inserts
+        Returns:
+            (dict, dict): {uid: SR reply string} for inserts that replied, and {uid: error message} for those that did not
+        """
+        failed = {}
+        triggered = []
+        last_trigger_time = None
+
+        #1. trigger every insert
+        for uid in uids:
+            try:
+                self._trigger_gxm(self._to_geo_uid(uid))
+                last_trigger_time = time.monotonic()
+                triggered.append(uid)
+            except IPXSerialError as e:
+                logging.warning(f"GXM trigger failed for UID {uid}: {e}")
+                failed[uid] = str(e)
+
+        #2. one wait for the last insert's conversion (all the earlier ones have had longer)
+        if last_trigger_time is not None:
+            remaining = IPXCommands.Geosense_settings.Conversion_time_s - (time.monotonic() - last_trigger_time)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        #3. collect the readings
+        responses = {}
+        for uid in triggered:
+            try:
+                _, responses[uid] = self._read_gxm(self._to_geo_uid(uid))
+            except IPXSerialError as e:
+                logging.warning(f"GXM reading failed for UID {uid}: {e}")
+                failed[uid] = str(e)
+        return responses, failed
+
+
+    def gxm_measure_string(self, uids: list) -> tuple[list[dict], dict]:
+        """ Measures every insert on the string in one batched cycle (see _gxm_cycle)
+        Total time is about one conversion time plus N short reads, instead of ~1 s per insert.
+
+        Args:
+            uids (list): Full UIDs of the IPX inserts
+        Returns:
+            (list, dict): list of result dicts in the same format as gxm_measure_test (in uid order),
+                          and a dict of {uid: error message} for inserts that could not be measured
+        """
+        logging.debug(f"Starting batched GXM measurement cycle for {len(uids)} inserts")
+        responses, failed = self._gxm_cycle(uids)
+
+        results = []
+        for uid, response_str in responses.items():
+            try:
+                results.append(self._parse_gxm_response(uid, response_str))
+            except (ValueError, IndexError) as e: # unparseable replies
+                logging.warning(f"GXM reading could not be parsed for UID {uid}: {e}")
+                failed[uid] = str(e)
+
+        logging.debug(f"Batched GXM cycle complete, {len(results)} measured, {len(failed)} failed")
+        return results, failed
+
+
+    # ------------------------------ Multi-sample statistical acceptance ------------------------------
+    @staticmethod
+    def gxm_axis_a_degrees(axis_a_raw: np.ndarray) -> np.ndarray:
+        """ Vectorised AxisA conversion (asin, then degrees) for any shaped array of raw AxisA values
+        Values outside the asin domain are clamped to -1..1, NaNs (missing samples) stay NaN"""
+        return np.degrees(np.arcsin(np.clip(axis_a_raw, -1.0, 1.0)))
+
+
+    def gxm_measure_string_statistical(self, uids: list, samples: int = None) -> tuple[list[dict], dict]:
+        """ Collects several samples per insert in one batched session (one _gxm_cycle per sample),
+        then accepts each insert on the mean and spread of AxisA rather than one exact reading.
+
+        All AxisA values are converted at once with numpy, acceptance is:
+            - |mean AxisA - target| <= Axis_a_mean_tolerance_deg
+            - std of AxisA <= Axis_a_max_std_deg
+            - mean temperature within Temperature_min_c - Temperature_max_c
+            - at least Min_valid_samples good samples
+
+        Args:
+            uids (list): Full UIDs of the IPX inserts
+            samples (int): Samples per insert, defaults to Geosense_settings.Samples_per_insert
+        Returns:
+            (list, dict): list of result dicts (gxm_measure_test format plus per-insert statistics),
+                          and a dict of {uid: error message} for inserts without enough valid samples
+        """
+        settings = IPXCommands.Geosense_settings
+        samples = samples or settings.Samples_per_insert
+        logging.debug(f"Starting statistical GXM measurement, {samples} samples for {len(uids)} inserts")
+
+        # rows are inserts, columns are samples, NaN where a sample was missed
+        axis_a_raw = np.full((len(uids), samples), np.nan)
+        temperatures = np.full((len(uids), samples), np.nan)
+        last_errors = {}
+        for sample in range(samples):
+            responses, failed = self._gxm_cycle(uids)
+            last_errors.update(failed)
+            for row, uid in enumerate(uids):
+                if uid in responses:
+                    try:
+                        axis_a_raw[row, sample], temperatures[row, sample] = self._split_gxm_reply(responses[uid])
+                    except (ValueError, IndexError) as e:
+                        logging.warning(f"GXM reading could not be parsed for UID {uid}: {e}")
+                        last_errors[uid] = str(e)
+
+        # ---------------- vectorised conversion + statistics ----------------
+        axis_a_deg = self.gxm_axis_a_degrees(axis_a_raw)
+        valid_counts = np.sum(~np.isnan(axis_a_deg), axis=1)
+        with np.errstate(invalid="ignore"), warnings.catch_warnings(): # all-NaN rows are reported as failed below
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            axis_a_mean = np.nanmean(axis_a_deg, axis=1)
+            axis_a_std = np.nanstd(axis_a_deg, axis=1)
+            axis_a_min = np.nanmin(axis_a_deg, axis=1)
+            axis_a_max = np.nanmax(axis_a_deg, axis=1)
+            temperature_mean = np.nanmean(temperatures, axis=1)
+            temperature_std = np.nanstd(temperatures, axis=1)
+
+        enough_samples = valid_counts >= min(settings.Min_valid_samples, samples)
+        mean_pass = np.abs(axis_a_mean - settings.Target_axis_a_deg) <= settings.Axis_a_mean_tolerance_deg
+        spread_pass = axis_a_std <= settings.Axis_a_max_std_deg
+        temperature_pass = (temperature_mean >= settings.Temperature_min_c) & (temperature_mean <= settings.Temperature_max_c)
+        overall_pass = enough_samples & mean_pass & spread_pass & temperature_pass
+
+        results = []
+        failed = {}
+        for row, uid in enumerate(uids):
+            if not enough_samples[row]:
+                failed[uid] = (f"Only {valid_counts[row]} of {samples} samples received"
+                               + (f", last error: {last_errors[uid]}" if uid in last_errors else ""))
+                logging.warning(f"Statistical GXM measurement failed for UID {uid}: {failed[uid]}")
+                continue
+            if not mean_pass[row]:
+                logging.warning(f"Axis A mean check failed for UID {uid}: {axis_a_mean[row]:.4f}° "
+                                f"(expected {settings.Target_axis_a_deg} ± {settings.Axis_a_mean_tolerance_deg}°)")
+            if not spread_pass[row]:
+                logging.warning(f"Axis A spread check failed for UID {uid}: std {axis_a_std[row]:.4f}° "
+                                f"(max {settings.Axis_a_max_std_deg}°)")
+            if not temperature_pass[row]:
+                logging.warning(f"Temperature check failed for UID {uid}: {temperature_mean[row]:.2f} °C "
+                                f"(expected {settings.Temperature_min_c}–{settings.Temperature_max_c} °C)")
+            results.append({
+                "uid": uid,
+                "axis_a": math.trunc(axis_a_mean[row] * 1000) / 1000, # same 3dp truncation as the single sample test
+                "temperature": round(float(temperature_mean[row]), 3),
+                "pass": bool(overall_pass[row]),
+                # per-insert statistics
+                "samples": int(valid_counts[row]),
+                "axis_a_mean": float(axis_a_mean[row]),
+                "axis_a_std": float(axis_a_std[row]),
+                "axis_a_min": float(axis_a_min[row]),
+                "axis_a_max": float(axis_a_max[row]),
+                "temperature_std": float(temperature_std[row]),
+                "axis_a_mean_pass": bool(mean_pass[row]),
+                "axis_a_spread_pass": bool(spread_pass[row]),
+            })
+
+        logging.debug(f"Statistical GXM measurement complete, {len(results)} measured, {len(failed)} failed")
+        return results, failed
+
+
+    def gxm_measure_test_statistical(self, uid: int, samples: int = None) -> dict:
+        """ Statistical acceptance for a single insert (used when retrying one insert)
+        Raises IPXNoResponseError if not enough samples could be collected, so it can be used with retry_on_exception"""
+        results, failed = self.gxm_measure_string_statistical([uid], samples=samples)
+        if failed:
+            raise IPXNoResponseError(f"Statistical GXM measurement failed for UID {uid}: {failed[uid]}")
+        return results[0]
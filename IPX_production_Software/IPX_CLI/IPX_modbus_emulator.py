@@ -0,0 +1,386 @@
+""" Local Modbus RTU emulator of IPX sensors (for testing IPXModbusTester without hardware)
+
+Emulates a bus of multiple IPX modbus slaves, each with its own alias (modbus address), implementing the same
+register map as the real sensors:
+    - TRIGGER_REG (0x0063): write 0xFFFF to start a measurement
+    - STATUS_REG (0x0135): 0 while measuring, then 1 once the measurement is ready
+    - DISTANCE_REG / TEMP_REG / VOLTAGE_REG: float32, MSW/LSW big endian (2 registers each)
+
+Measurement delay, the value distributions and injected faults (no response, bad CRC, exception responses,
+bad status) are all configurable, so the verification stage can be benchmarked and regression tested.
+
+On linux the emulator creates a pty pair and the tester connects to the slave end (e.g. /dev/pts/4),
+on windows pass in one end of a virtual null modem pair (e.g. com0com COM10 <-> COM11) instead.
+
+Usage Example:
+    with IPXModbusEmulator(aliases=range(1, 9)) as emulator:
+        with IPXModbusTester(port=emulator.port, baudrate=9600) as modbus_tester:
+            print(modbus_tester.run_full_test(uid=1, alias=1))
+
+    # or from the command line:
+    python IPX_modbus_emulator.py serve --sensors 8
+    python IPX_modbus_emulator.py benchmark --sensors 8 --delay 0.4
+"""
+import argparse
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+
+# register map, kept the same as IPXModbusTester
+TRIGGER_REG = 0x0063
+STATUS_REG = 0x0135
+DISTANCE_REG = 0x0136
+TEMP_REG = 0x0139
+VOLTAGE_REG = 0x013C
+
+# modbus exception codes used by the emulator
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+SLAVE_DEVICE_FAILURE = 0x04
+
+
+def modbus_crc16(frame: bytes) -> bytes:
+    """ Calculates the modbus RTU CRC16 of a frame, returned as the 2 bytes to append (low byte first) """
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return struct.pack("<H", crc)
+
+
+def _float_to_regs(value: float) -> tuple[int, int]:
+    """ Converts a float to 2 16-bit registers (MSW, LSW), the reverse of IPXModbusTester._regs_to_float """
+    raw = struct.unpack(">I", struct.pack(">f", value))[0]
+    return (raw >> 16) & 0xFFFF, raw & 0xFFFF
+
+
+#--------------------------- Emulator settings -------------------------
+@dataclass
+class EmulatedSensorProfile:
+    """ Value distributions and timing for an emulated IPX sensor (normal distributions, std of 0 gives a fixed value) """
+    measurement_delay_s: float = 0.4 # time from trigger until status goes to 1
+    distance_mm: float = -99.0 # -99 is what a configured sensor reports on the bench
+    distance_std: float = 0.0
+    temperature_c: float = 20.0
+    temperature_std: float = 0.5
+    voltage_v: float = 12.0
+    voltage_std: float = 0.05
+    status: int = 1 # status reported once the measurement is complete
+
+
+@dataclass
+class EmulatedFaults:
+    """ Probabilities (0 - 1) of faults injected on each request """
+    no_response: float = 0.0 # request is silently ignored (tester sees a timeout)
+    bad_crc: float = 0.0 # response is sent with a corrupted CRC
+    exception_response: float = 0.0 # device replies with a SLAVE_DEVICE_FAILURE exception
+    bad_status: float = 0.0 # measurement completes with status 0 instead of the profile status
+    response_delay_s: float = 0.0 # extra processing delay before every response
+
+
+@dataclass
+class EmulatedIPXSlave:
+    """ A single emulated IPX modbus slave """
+    alias: int
+    profile: EmulatedSensorProfile = field(default_factory=EmulatedSensorProfile)
+    faults: EmulatedFaults = field(default_factory=EmulatedFaults)
+    triggered_at: Optional[float] = None
+    measurement: Dict[str, float] = field(default_factory=dict)
+    measurement_status: int = 0
+    trigger_count: int = 0
+
+    def trigger(self, rng: random.Random):
+        """ Starts a new measurement, values are drawn now and become readable after the measurement delay """
+        profile = self.profile
+        self.triggered_at = time.monotonic()
+        self.trigger_count += 1
+        self.measurement = {
+            "distance": rng.gauss(profile.distance_mm, profile.distance_std) if profile.distance_std else profile.distance_mm,
+            "temperature": rng.gauss(profile.temperature_c, profile.temperature_std) if profile.temperature_std else profile.temperature_c,
+            "voltage": rng.gauss(profile.voltage_v, profile.voltage_std) if profile.voltage_std else profile.voltage_v,
+        }
+        self.measurement_status = 0 if rng.random() < self.faults.bad_status else profile.status
+
+    def registers(self) -> Dict[int, int]:
+        """ Current holding register values, only registers in the IPX map exist """
+        ready = self.triggered_at is not None and time.monotonic() - self.triggered_at >= self.profile.measurement_delay_s
+        regs = {TRIGGER_REG: 0, STATUS_REG: self.measurement_status if ready else 0}
+        for base_reg, key in ((DISTANCE_REG, "distance"), (TEMP_REG, "temperature"), (VOLTAGE_REG, "voltage")):
+            msw, lsw = _float_to_regs(self.measurement.get(key, 0.0) if ready else 0.0)
+            regs[base_reg] = msw
+            regs[base_reg + 1] = lsw
+        return regs
+
+
+#--------------------------- Emulator -------------------------
+class IPXModbusEmulator:
+    """
+    Emulates a bus of IPX modbus RTU slaves, served from a background thread.
+    Supports read holding registers (0x03), write single register (0x06) and write multiple registers (0x10),
+    all other functions get an ILLEGAL_FUNCTION exception, the same as the sensors.
+    """
+    def __init__(self,
+                 aliases: Iterable[int] = range(1, 9),
+                 profile: EmulatedSensorProfile = None,
+                 faults: EmulatedFaults = None,
+                 port: str = None,
+                 baudrate: int = 9600,
+                 seed: int = None):
+        """ Args:
+            aliases: Modbus addresses of the emulated sensors
+            profile: Value distributions/timing used for every sensor (change emulator.slaves[alias].profile for one sensor)
+            faults: Injected faults used for every sensor
+            port: Serial port to serve on (one end of a null modem pair), None creates a pty pair (linux only)
+            baudrate: Baudrate of the serial port if a port is given
+            seed: Random seed, for repeatable value and fault sequences
+        """
+        self.slaves: Dict[int, EmulatedIPXSlave] = {
+            int(alias): EmulatedIPXSlave(alias=int(alias),
+                                         profile=profile or EmulatedSensorProfile(),
+                                         faults=faults or EmulatedFaults())
+            for alias in aliases
+        }
+        self.serial_port = port
+        self.baudrate = baudrate
+        self.rng = random.Random(seed)
+        self.port = None # port name for the tester to connect to
+        self.request_count = 0
+        self._master_fd = None
+        self._slave_fd = None
+        self._serial = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    # Enter/exit for context manager -----------------------------------------------------
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """ Opens the pty pair (or serial port) and starts serving requests in a background thread """
+        if self.serial_port:
+            import serial # only needed when serving on a real/virtual serial port
+            self._serial = serial.Serial(self.serial_port, self.baudrate, timeout=0.01)
+            self.port = self.serial_port
+        else:
+            import tty # pty pairs are linux/mac only
+            self._master_fd, self._slave_fd = os.openpty()
+            tty.setraw(self._master_fd)
+            self.port = os.ttyname(self._slave_fd) # keep slave fd open, otherwise the master sees EIO between clients
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._serve_forever, name="ipx-modbus-emulator", daemon=True)
+        self._thread.start()
+        logging.info(f"IPX modbus emulator serving aliases {sorted(self.slaves)} on {self.port}")
+
+    def stop(self):
+        """ Stops the server thread and closes the port """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._serial:
+            self._serial.close()
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self._master_fd = self._slave_fd = self._serial = None
+        logging.info("IPX modbus emulator stopped")
+
+    def _read(self, timeout: float) -> bytes:
+        """ Reads whatever is available within the timeout """
+        if self._serial:
+            return self._serial.read(self._serial.in_waiting or 1)
+        ready, _, _ = select.select([self._master_fd], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            return os.read(self._master_fd, 256)
+        except OSError: # no client connected to the slave end
+            time.sleep(timeout)
+            return b""
+
+    def _write(self, data: bytes):
+        if self._serial:
+            self._serial.write(data)
+        else:
+            os.write(self._master_fd, data)
+
+    def _serve_forever(self):
+        """ Server loop, frames are split using the expected length of each function code """
+        buffer = bytearray()
+        while not self._stop_event.is_set():
+            chunk = self._read(timeout=0.05)
+            if not chunk:
+                buffer.clear() # silence on the line ends any partial frame (like the 3.5 char gap in RTU)
+                continue
+            buffer.extend(chunk)
+            while True:
+                frame_length = self._expected_request_length(buffer)
+                if frame_length is None or len(buffer) < frame_length:
+                    break # wait for more bytes
+                frame = bytes(buffer[:frame_length])
+                del buffer[:frame_length]
+                self._handle_frame(frame)
+
+    @staticmethod
+    def _expected_request_length(buffer: bytearray) -> Optional[int]:
+        """ Length of the request frame at the start of the buffer, None if not known yet """
+        if len(buffer) < 2:
+            return None
+        function = buffer[1]
+        if function == 0x10:
+            if len(buffer) < 7:
+                return None
+            return 9 + buffer[6] # addr, func, start(2), count(2), byte count, data, crc(2)
+        return 8 # addr, func, 2 x 16 bit fields, crc(2) (covers 0x03, 0x04, 0x06 and anything unknown)
+
+    def _handle_frame(self, frame: bytes):
+        """ Validates and dispatches one request frame, then sends the response (if any) """
+        if modbus_crc16(frame[:-2]) != frame[-2:]:
+            logging.debug(f"Emulator dropped frame with bad CRC: {frame.hex()}")
+            return # real devices ignore frames with bad CRC
+        alias, function = frame[0], frame[1]
+        slave = self.slaves.get(alias)
+        if slave is None:
+            return # nobody on the bus with this address
+        self.request_count += 1
+        faults = slave.faults
+
+        if self.rng.random() < faults.no_response:
+            logging.debug(f"Emulator injected no response for alias {alias}")
+            return
+        if self.rng.random() < faults.exception_response:
+            pdu = bytes([function | 0x80, SLAVE_DEVICE_FAILURE])
+        else:
+            pdu = self._handle_pdu(slave, function, frame[2:-2])
+
+        response = bytes([alias]) + pdu
+        crc = modbus_crc16(response)
+        if self.rng.random() < faults.bad_crc:
+            crc = bytes([crc[0] ^ 0xFF, crc[1]])
+            logging.debug(f"Emulator injected bad CRC for alias {alias}")
+        if faults.response_delay_s:
+            time.sleep(faults.response_delay_s)
+        self._write(response + crc)
+
+    def _handle_pdu(self, slave: EmulatedIPXSlave, function: int, data: bytes) -> bytes:
+        """ Executes a request pdu against a slave and returns the response pdu """
+        if function in (0x03, 0x04): # read holding/input registers
+            start, count = struct.unpack(">HH", data[:4])
+            regs = slave.registers()
+            addresses = range(start, start + count)
+            if count < 1 or any(address not in regs for address in addresses):
+                return bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+            values = [regs[address] for address in addresses]
+            return bytes([function, 2 * count]) + struct.pack(f">{count}H", *values)
+
+        if function == 0x06: # write single register
+            address, value = struct.unpack(">HH", data[:4])
+            if address != TRIGGER_REG:
+                return bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+            if value == 0xFFFF:
+                slave.trigger(self.rng)
+            return bytes([function]) + data[:4] # echo of the request
+
+        if function == 0x10: # write multiple registers
+            start, count = struct.unpack(">HH", data[:4])
+            if start != TRIGGER_REG or count != 1:
+                return bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+            if struct.unpack(">H", data[5:7])[0] == 0xFFFF:
+                slave.trigger(self.rng)
+            return bytes([function]) + data[:4]
+
+        return bytes([function | 0x80, ILLEGAL_FUNCTION])
+
+
+#--------------------------- Benchmark / regression run -------------------------
+def benchmark_verification(num_sensors: int = 8,
+                           profile: EmulatedSensorProfile = None,
+                           faults: EmulatedFaults = None,
+                           seed: int = 0) -> dict:
+    """ Runs the modbus verification stage (IPXModbusTester.run_full_test for every alias) against the emulator
+    Returns:
+        dict: timings, pass count and the tester's bus metrics summary
+    """
+    from IPX_datalogger_tester import IPXModbusTester # imported here so the emulator can run standalone
+
+    results = []
+    errors = 0
+    with IPXModbusEmulator(aliases=range(1, num_sensors + 1), profile=profile, faults=faults, seed=seed) as emulator:
+        start = time.perf_counter()
+        with IPXModbusTester(port=emulator.port, baudrate=9600) as modbus_tester:
+            for alias in range(1, num_sensors + 1):
+                try:
+                    results.append(modbus_tester.run_full_test(uid=alias, alias=alias))
+                except Exception as e:
+                    errors += 1
+                    logging.warning(f"Verification of alias {alias} raised: {e}")
+        duration = time.perf_counter() - start
+
+    passed = sum(1 for result in results if result["Overall_Pass"])
+    return {
+        "sensors": num_sensors,
+        "passed": passed,
+        "failed": len(results) - passed,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "seconds_per_sensor": round(duration / num_sensors, 3) if num_sensors else 0.0,
+        "bus_metrics": modbus_tester.metrics.totals(),
+    }
+
+
+def _build_settings(args) -> tuple[EmulatedSensorProfile, EmulatedFaults]:
+    profile = EmulatedSensorProfile(measurement_delay_s=args.delay,
+                                    temperature_c=args.temperature,
+                                    voltage_v=args.voltage)
+    faults = EmulatedFaults(no_response=args.no_response,
+                            bad_crc=args.bad_crc,
+                            exception_response=args.exception_rate,
+                            bad_status=args.bad_status)
+    return profile, faults
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Local Modbus RTU emulator of IPX sensors")
+    parser.add_argument("mode", choices=["serve", "benchmark"], help="serve until Ctrl+C, or benchmark the verification stage")
+    parser.add_argument("--sensors", type=int, default=8, help="number of emulated sensors (aliases 1..N)")
+    parser.add_argument("--port", default=None, help="serial port to serve on (default: create a pty pair)")
+    parser.add_argument("--delay", type=float, default=0.4, help="measurement delay in seconds")
+    parser.add_argument("--temperature", type=float, default=20.0, help="mean temperature in C")
+    parser.add_argument("--voltage", type=float, default=12.0, help="mean voltage in V")
+    parser.add_argument("--no-response", type=float, default=0.0, help="probability of ignoring a request")
+    parser.add_argument("--bad-crc", type=float, default=0.0, help="probability of a corrupted response CRC")
+    parser.add_argument("--exception-rate", type=float, default=0.0, help="probability of an exception response")
+    parser.add_argument("--bad-status", type=float, default=0.0, help="probability of a measurement finishing with status 0")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args()
+
+    profile, faults = _build_settings(args)
+    if args.mode == "serve":
+        with IPXModbusEmulator(aliases=range(1, args.sensors + 1), profile=profile, faults=faults,
+                               port=args.port, seed=args.seed) as emulator:
+            print(f"Emulating {args.sensors} IPX sensors on {emulator.port} (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+    else:
+        summary = benchmark_verification(num_sensors=args.sensors, profile=profile, faults=faults, seed=args.seed or 0)
+        for key, value in summary.items():
+            print(f"{key}: {value}")
@@ -3,27 +3,27 @@
 
 import logging
 import sys
+from typing import TYPE_CHECKING
 from IPX import IPXSerialCommunicator, IPXConfigurator, IPXSerialError
 
+# The heavy imports (pandas, plotly via report_generator, pymodbus via IPX_datalogger_tester) are done inside the
+# functions that need them, so the menu comes up fast. These are only for the type hints.
+if TYPE_CHECKING:
+    from IPX_datalogger_tester import IPXModbusTester
+    from report_generator import ReportGenerator
 
 
-
-from IPX_datalogger_tester import IPXModbusTester, IPXGeosenseTester
-
-
-import numpy as np
-import pandas as pd
 from IPX_Config import IPXCommands
 import os
-import time
 
 import Failure_handlers as fh
+import ipx_logging
+import live_view
+import session_checkpoint
+import uid_remap
 
-import os
 import platform
 
-# import files for JSON report generation
-from report_generator import ReportGenerator
 
 
 def get_baudrate():
@@ -139,7 +139,7 @@ def initial_uid_update(com_port, baudrate):
                     confirm = input(f"Press Enter to set UID of sensor with current UID {last_uid} to new UID {new_uid}... or abort (type 'abort'): or type 'retry' retry uid update ").strip().lower()
                 except KeyboardInterrupt:
                     logging.info("UID update cancelled by user.")
-                    raise fh.UserAbortError("UID update cancelled by user.")
+                    raise fh.UserCancelledError("UID update cancelled by user.")
                     
                 if confirm == "": # proceed to next, and rename uid
                     ipx.set_uid(current_uid=last_uid, new_uid=new_uid) # set uid to new uid
@@ -162,7 +162,7 @@ def initial_uid_update(com_port, baudrate):
                     confirm = input("Press Enter to continue updating the next sensor UID, or type 'exit' to finish: ").strip().lower()
                 except KeyboardInterrupt:
                     logging.info("UID update cancelled by user.")
-                    raise fh.UserAbortError("UID update cancelled by user.")
+                    raise fh.UserCancelledError("UID update cancelled by user.")
                     
                 if confirm == "":
                     continue
@@ -174,24 +174,31 @@ def initial_uid_update(com_port, baudrate):
         
     except KeyboardInterrupt:
         logging.info("UID update session interrupted by user (Ctrl+C). Returning to main menu.")
-        raise fh.UserAbortError("UID update session cancelled by user.")
+        raise fh.UserCancelledError("UID update session cancelled by user.")
     
 
 
 
-def switch_all_to_115200(com_port):    
-    """ Function to switch all connected sensors to 115200 baud rate."""
+def switch_all_to_115200(com_port, confirm: bool = True):    
+    """ Function to switch all connected sensors to 115200 baud rate.
+
+    Args:
+        confirm (bool): ask the user to confirm first, False for batch runs
+    Returns:
+        True if every sensor answered at 115200 afterwards, else False
+    """
     # Firstly detect sensors on the given com port
     # instantiate configurato
     try:
-        confirmation = input("Confirm swithcing to 115200? (Press enter to confirm, type 'abort' to cancel): ").strip().lower()
-        if confirmation != "":
-            logging.warning("Baud rate switching cancelled by user.")
-            raise fh.UserAbortError("Baud rate switching cancelled by user.")
+        if confirm:
+            confirmation = input("Confirm swithcing to 115200? (Press enter to confirm, type 'abort' to cancel): ").strip().lower()
+            if confirmation != "":
+                logging.warning("Baud rate switching cancelled by user.")
+                raise fh.UserAbortError("Baud rate switching cancelled by user.")
         
         if not com_port:
             logging.error("Invalid COM port")
-            return
+            return False
         try:
             with IPXSerialCommunicator(port=com_port, baudrate=9600, verify=True) as ipx:
                 # Step 1: Verify sensor count with automatic retry handling
@@ -199,7 +206,7 @@ def switch_all_to_115200(com_port):
                 initial_uids_list = ipx.list_uids(data_type='list')
                 if initial_uids_list is None:
                     logging.error("No sensors detected")
-                    return
+                    return False
                 logging.info(f"Detected {len(initial_uids_list)} sensors: {initial_uids_list}")
                 logging.info("Switching all sensors to 115200 baud rate...")
 
@@ -219,22 +226,26 @@ def switch_all_to_115200(com_port):
                 # Step 1: Verify sensor count with automatic retry handling
                 # might as well use verify sensor count function
                 new_uids_list = ipx.list_uids(data_type='list')
-                
-                logging.info(f"Verifying baud rate change, detected {len(new_uids_list)} sensors: {new_uids_list}")
 
                 if new_uids_list is None:
                     logging.error("Sensor detection failed or was skipped after baud rate change.")
-                    return # this code is redundant due to retry on failure function, but just in case who knows
+                    return False # this code is redundant due to retry on failure function, but just in case who knows
 
+                logging.info(f"Verifying baud rate change, detected {len(new_uids_list)} sensors: {new_uids_list}")
+                missing_uids = [uid for uid in initial_uids_list if uid not in new_uids_list]
+                if missing_uids:
+                    logging.error(f"❌ FAILURE: UIDs not responding at 115200 baud: {missing_uids}")
+                    return False
                 
                 logging.info("✅ SUCCESS: All sensors switched to 115200 baud rate successfully.")
+                return True
         except Exception as e:
             logging.critical(f"An error occurred while verifying baud rate change: {e}", exc_info=True)
-        return
+        return False
     
     except KeyboardInterrupt:
         logging.info("Baud rate switching session interrupted by user (Ctrl+C). Returning to main menu.")
-        raise fh.UserAbortError("Baud rate switching session cancelled by user.")
+        raise fh.UserCancelledError("Baud rate switching session cancelled by user.")
     
 
 
@@ -246,9 +257,12 @@ def get_initial_settings():
         # COM port is now global, only need number of sensors
         num_sensors_int = int(input("Enter number of input sensors: "))
         return num_sensors_int
-    except (ValueError, KeyboardInterrupt):
-        logging.error("Invalid input or operation cancelled.")
-        raise fh.UserAbortError("Initial settings input cancelled by user.")
+    except ValueError:
+        logging.error("Invalid input.")
+        raise fh.UserAbortError("Initial settings input was not a number.")
+    except KeyboardInterrupt:
+        logging.error("Operation cancelled.")
+        raise fh.UserCancelledError("Initial settings input cancelled by user.")
 
 
 
@@ -264,8 +278,7 @@ def list_uids(com_port, baudrate):
 #Helper function for displaying UIDs:
 def display_uid_table(mappings, all_uids):
     """Clears the terminal and displays the current UID mapping table."""
-    # Clear the terminal screen ('cls' for Windows, 'clear' for macOS/Linux)
-    os.system('cls' if os.name == 'nt' else 'clear') 
+    live_view.clear_screen() # escape codes, not a cls / clear subprocess per scan
     
     print("--- UID Update In Progress ---")
     print(f"{'Old UID':<15} -> {'New UID':<10}")
@@ -286,21 +299,29 @@ def display_uid_table(mappings, all_uids):
 
 
 # function for updating sensor UIDs via barcode scanner
-def run_uid_update_flow(com_port, baudrate):
-    """Handles UID updating via barcode scanner input."""
+def run_uid_update_flow(com_port, baudrate, num_sensors: int = None, new_uids: list = None, confirm: bool = True):
+    """Handles UID updating via barcode scanner input.
+
+    Args:
+        num_sensors (int): expected number of sensors, prompted for if None
+        new_uids (list): new UIDs in string order (top to bottom) instead of scanning them, for batch runs
+        confirm (bool): ask the user to confirm the changes before applying them
+    Returns:
+        True if all UIDs were updated, False otherwise
+    """
     try:
         logging.info("--- Starting UID update session via barcode scanner ---")
-        num_sensors_int = get_initial_settings() # _ as we only need com_port here, need verify sensor count as well
+        num_sensors_int = num_sensors if num_sensors is not None else get_initial_settings() # need verify sensor count as well
         if not com_port or not num_sensors_int:
             logging.error("Invalid COM port or number of sensors.")
-            return
+            return False
         configurator = IPXConfigurator()
         try:
             with IPXSerialCommunicator(port=com_port, baudrate=baudrate, verify=True) as ipx:
                 # UID updating logic here
                 logging.info("Discovering connected sensors...")
                 # Step 1: Verify sensor count with automatic retry handling
-                uids_list, _ = fh.retry_on_failure(# _ as we dont need the check_sensor_present value here
+                uids_list, check_sensor_found = fh.retry_on_failure(
                     operation_func=configurator.verify_sensor_count,
                     prompt_func=fh.prompt_user_on_other_failure,
                     success_message=f"Successfully detected {num_sensors_int} sensors",
@@ -312,63 +333,144 @@ def run_uid_update_flow(com_port, baudrate):
 
                 if uids_list is None: # small check to ensure we have uids
                     logging.error("Sensor detection failed or was skipped. Exiting UID update.")
-                    return
-                
-                for old_uids in uids_list:
-                    display_uid_table(uid_mappings, uids_list) # display the uid table before each scan
+                    return False
+
+                if new_uids is not None: # given up front (job file), no scanning
+                    if len(new_uids) != len(uids_list):
+                        logging.error(f"Got {len(new_uids)} new UIDs for {len(uids_list)} detected sensors. Exiting UID update.")
+                        return False
+                    uid_mappings = [{'old': old_uid, 'new': int(new_uid)} for old_uid, new_uid in zip(uids_list, new_uids)]
+                    for mapping in uid_mappings:
+                        logging.info(f"Mapped Old UID {mapping['old']} to New UID {mapping['new']}")
+                else: # scan them one at a time
+                    for old_uids in uids_list:
+                        display_uid_table(uid_mappings, uids_list) # display the uid table before each scan
+
+                        try:
+                            new_uid_str = input(f"Scan new UID for sensor with Old UID (Top to bottom): {old_uids}: ")
+                        except KeyboardInterrupt:
+                            logging.info("UID scanning cancelled by user.")
+                            raise fh.UserCancelledError("UID update cancelled by user.")
+                    
+                        try:
+                            new_uid = int(new_uid_str) # convert to int to
+                            # add to mapping list
+                            uid_mappings.append({'old': old_uids, 'new': new_uid})
+                            logging.info(f"Mapped Old UID {old_uids} to New UID {new_uid}")
+                        except ValueError:
+                            logging.error(f"Invalid UID scanned: {new_uid_str}. Please try again.")
+                            continue
+                # check the whole mapping before anything is written (duplicates, clashes with UIDs already on the bus)
+                bus_uids = uids_list + ([int(IPXCommands.Default_settings.Check_sensor_uid)] if check_sensor_found else [])
+                try:
+                    remaps = uid_remap.resolve_mappings(uid_mappings, bus_uids)
+                except uid_remap.UIDMappingError as e:
+                    logging.error(f"{e}")
+                    return False
 
+                # After collecting all mappings, apply them, show the final table
+                if confirm:
+                    display_uid_table(uid_mappings, uids_list) # final display
                     try:
-                        new_uid_str = input(f"Scan new UID for sensor with Old UID (Top to bottom): {old_uids}: ")
+                        confirmation = input("Confirm applying these UID changes? (y/n): ").strip().lower()
                     except KeyboardInterrupt:
-                        logging.info("UID scanning cancelled by user.")
-                        raise fh.UserAbortError("UID update cancelled by user.")
-                    
-                    try:
-                        new_uid = int(new_uid_str) # convert to int to
-                        # add to mapping list
-                        uid_mappings.append({'old': old_uids, 'new': new_uid})
-                        logging.info(f"Mapped Old UID {old_uids} to New UID {new_uid}")
-                    except ValueError:
-                        logging.error(f"Invalid UID scanned: {new_uid_str}. Please try again.")
-                        continue
-                # After collecting all mappings, apply them, show the final table
-
-                display_uid_table(uid_mappings, uids_list) # final display
-
-                try:
-                    confirm = input("Confirm applying these UID changes? (y/n): ").strip().lower()
-                except KeyboardInterrupt:
-                    logging.info("UID update confirmation cancelled by user.")
-                    raise fh.UserAbortError("UID update cancelled by user.")
-                    
-                if confirm != 'y':
-                    logging.warning("UID update cancelled by user.")
-                    return
+                        logging.info("UID update confirmation cancelled by user.")
+                        raise fh.UserCancelledError("UID update cancelled by user.")
+                        
+                    if confirmation != 'y':
+                        logging.warning("UID update cancelled by user.")
+                        return False
                 
                 logging.info("Applying UID changes to sensors...")
-                for mapping in uid_mappings:
-                    ipx.set_uid(current_uid=mapping['old'], new_uid=mapping['new'])
-                    
-                    logging.debug(f"Set UID from {mapping['old']} to {mapping['new']}")
-                    time.sleep(0.5)  # small delay to ensure command is processed
-                    
-                # Final verification ( should this just not use verify_sensor_count again? )
-                logging.info("Verifying updated UIDs...")
-                # reverify after uid update
-                final_uids, _ = configurator.verify_sensor_count(ipx=ipx, num_sensors=num_sensors_int)
+                configurator.apply_uid_remaps(ipx, remaps)
 
-                expected_uids = [m['new'] for m in uid_mappings]
-                if all(uid in final_uids for uid in expected_uids):
-                    logging.info("✅ SUCCESS: All UIDs were updated successfully.")
-                else:
-                    logging.error("❌ FAILURE: Some UIDs were not updated. Please check the device.")
+                # Final verification, one list_uids for the whole string
+                logging.info("Verifying updated UIDs...")
+                return _confirm_uid_remap(ipx, configurator, uid_remap.expected_uids_after(bus_uids, remaps))
 
         except (IPXSerialError, SystemExit) as e:
             logging.critical(f"An error occurred during the UID update process: {e}")
+            return False
 
     except KeyboardInterrupt:
         logging.info("UID update process cancelled by user. (Ctrl+C), returning to main menu")
-        raise fh.UserAbortError("UID update process cancelled by user.")
+        raise fh.UserCancelledError("UID update process cancelled by user.")
+
+
+
+
+def _confirm_uid_remap(ipx: IPXSerialCommunicator, configurator: IPXConfigurator, expected_uids: set) -> bool:
+    """ Single list_uids check after a UID update, logs what's missing / unexpected """
+    missing, unexpected = configurator.confirm_uids(ipx, expected_uids)
+    if not missing and not unexpected:
+        logging.info("✅ SUCCESS: All UIDs were updated successfully.")
+        return True
+    if missing:
+        logging.error(f"UIDs not answering after the update: {sorted(missing)}")
+    if unexpected:
+        logging.error(f"Unexpected UIDs on the bus after the update: {sorted(unexpected)}")
+    logging.error("❌ FAILURE: Some UIDs were not updated. Please check the device.")
+    return False
+
+
+def run_bulk_uid_remap_flow(com_port, baudrate, mapping_file: str, string_name: str = None, confirm: bool = True):
+    """Remaps a whole string's UIDs from a mapping file (CSV or build sheet order JSON, see uid_remap.py)
+    instead of scanning each sensor. The mapping is checked against the bus before any UID is changed.
+
+    Args:
+        mapping_file (str): old_uid,new_uid CSV, new_uid CSV (top to bottom) or order JSON with UIDs in the segments
+        string_name (str): which string of a multi string order JSON
+        confirm (bool): ask the user to confirm the changes before applying them
+    Returns:
+        True if all UIDs were updated, False otherwise
+    """
+    try:
+        logging.info(f"--- Starting bulk UID remap from {mapping_file} ---")
+        try:
+            entries = uid_remap.load_mapping_file(mapping_file, string_name)
+        except uid_remap.UIDMappingError as e:
+            logging.error(f"{e}")
+            return False
+        configurator = IPXConfigurator()
+        try:
+            with IPXSerialCommunicator(port=com_port, baudrate=baudrate, verify=True) as ipx:
+                bus_uids = fh.retry_on_exception(operation_func=ipx.list_uids, data_type='list')
+                if not bus_uids:
+                    logging.error("No sensors detected. Exiting UID remap.")
+                    return False
+                try:
+                    remaps = uid_remap.resolve_mappings(entries, bus_uids)
+                except uid_remap.UIDMappingError as e:
+                    logging.error(f"{e}")
+                    return False
+                if not remaps:
+                    logging.info("All sensors already have their new UIDs, nothing to do.")
+                    return True
+
+                for remap in remaps: # logged rather than printed, stdout is for the batch result lines
+                    logging.info(f"Planned: {remap['old']:<12} -> {remap['new']:<12} {remap.get('label') or ''}")
+                if confirm:
+                    try:
+                        confirmation = input(f"Confirm applying these {len(remaps)} UID changes? (y/n): ").strip().lower()
+                    except KeyboardInterrupt:
+                        logging.info("UID remap confirmation cancelled by user.")
+                        raise fh.UserCancelledError("UID remap cancelled by user.")
+                    if confirmation != 'y':
+                        logging.warning("UID remap cancelled by user.")
+                        return False
+
+                logging.info(f"Applying {len(remaps)} UID changes...")
+                configurator.apply_uid_remaps(ipx, remaps)
+                logging.info("Verifying updated UIDs...")
+                return _confirm_uid_remap(ipx, configurator, uid_remap.expected_uids_after(bus_uids, remaps))
+
+        except (IPXSerialError, SystemExit) as e:
+            logging.critical(f"An error occurred during the UID remap: {e}")
+            return False
+
+    except KeyboardInterrupt:
+        logging.info("UID remap cancelled by user. (Ctrl+C), returning to main menu")
+        raise fh.UserCancelledError("UID remap cancelled by user.")
 
 
 
@@ -377,7 +479,38 @@ def run_uid_update_flow(com_port, baudrate):
 # functions for breaking up the run configuration flow, as the function is getting too long ( approx 400 lines rn)
 
 # change calibration loop into a function:
-def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: IPXConfigurator, report: ReportGenerator):
+def _run_preflight_check(ipx: IPXSerialCommunicator, configurator: IPXConfigurator, uids_list: list, report: "ReportGenerator"):
+    """ Pre-flight bus check before calibration, results go to the report and live view
+    Returns:
+        the check result if every sensor passed, False otherwise (retry_on_failure then asks to retry / skip / abort)
+    """
+    live_view.update_all(stage="preflight", state="running")
+    result = configurator.preflight_bus_check(ipx, uids_list)
+    for uid, node in result["nodes"].items():
+        report.add_sensor_data(uid=uid, data_key='preflight', data_value=node)
+        detail = "; ".join(node["problems"] or node["warnings"]) or (f"{node['latency_ms_median']:.0f} ms" if node["latency_ms_median"] is not None else "")
+        live_view.update(uid, state="fail" if node["result"] == "fail" else "ok",
+                         detail=f"flagged {detail}" if node["result"] == "flag" else detail)
+        if node["result"] == "fail":
+            logging.error(f"Pre-flight: UID {uid} failed: {'; '.join(node['problems'])}")
+        elif node["result"] == "flag":
+            logging.warning(f"Pre-flight: UID {uid} flagged: {node['error_rate']:.0%} errors, {node['latency_ms_median']} ms median reply"
+                            + "".join(f", {warning}" for warning in node["warnings"]))
+    report.add_metadata("Preflight", {key: value for key, value in result.items() if key != "nodes"})
+
+    summary = (f"Pre-flight bus check: {len(uids_list) - len(result['failed'])}/{len(uids_list)} sensors passed, "
+               f"{len(result['flagged'])} flagged ({result['duration_s']:.1f} s)")
+    if result["hint"]:
+        summary += f" | {result['hint']}"
+    if not result["passed"]:
+        logging.error(summary)
+        return False
+    logging.info(summary)
+    return result
+
+
+def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: IPXConfigurator, report: "ReportGenerator",
+                          checkpoint: "session_checkpoint.SessionCheckpoint" = None):
     """Iterates through all uids, and attempts to calibrate all ipxs.
     
     Handles retries, failures and any raw data checks.
@@ -387,20 +520,27 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
         ipx: IPXSerialCommunicator instance
         configurator: IPXConfigurator instance
         report: ReportGenerator instance for logging results
+        checkpoint: run checkpoint, each sensor's outcome is recorded as soon as it is known
     
     Returns:
         True if all calibrations completed, False if critical error occurred
     """
+    timer = report.stage_timer
     for uid in uids_list:
+        uid_stage = timer.begin("uid", uid=str(uid)) # ended at the bottom of the loop, covers every attempt + prompts
+        live_view.update(uid, stage="calibration", state="running")
                     
         counter = 0 # initialize a counter for calibration attempts, once we get to 3 cal attempts we can prompt user to skip/abort/retry the configuration for that specific sensor
+        cal_outcome = "calibrated" # changed to skipped if the user skips this sensor
         logging.info(f"Starting calibration for UID {uid}...")
         while True:
             # use try loop to handle unexpected errors during calibration
             
             counter += 1
+            live_view.update(uid, detail=f"attempt {counter}")
             try:
-                cal_df = ipx.calibrate(uid)
+                with timer.stage("calibrate", attempt=counter):
+                    cal_df = ipx.calibrate(uid)
                 # validate cal_result
                 # after getting calibration data, save it straight away?
 
@@ -416,10 +556,10 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
 
                     # this is all due to abnormal magnitude
                     #1. if we've failed < 3 times, auto retry
-                    raw_data = ipx.get_raw(uid=uid, data_type='array')
-                    raw_log = str(raw_data.tolist()) # convert to string for json serialization
-                    # save raw data value to report
-                    report.add_sensor_data(uid=uid, data_key='raw_data_sample', data_value=raw_log)
+                    with timer.stage("get_raw"):
+                        raw_data = ipx.get_raw(uid=uid, data_type='array')
+                    # save raw data to the run's binary raw samples file, report keeps a reference to it
+                    report.add_raw_sample(uid=uid, raw_values=raw_data)
                     if not configurator.abnormal_high_magnitude_check(uid, raw_values=raw_data): # if result is false run this loop
                         if counter < 3:
                             logging.warning(f"Calibration for UID {uid} has failed abnormal high magnitude check {counter} times, retrying automatically.")
@@ -436,6 +576,7 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
                                 continue
                             elif choice == "skip":
                                 logging.warning(f"User chose to skip retrying calibration for UID {uid}.")
+                                cal_outcome = "skipped"
                                 break  # exit while loop to skip
                             elif choice == "abort":
                                 logging.warning("User aborted configuration.")
@@ -450,10 +591,10 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
                 # no need for raw data check if it didnt fail
                 # ------ INITIAL CALIBRATION CHECK FAILED (DUE TO ZERO MEAN/STD DEV) ------
                 else:
-                    result2, raw_values = configurator.raw_data_check(ipx=ipx, uid=uid, sensor_index=failed_sensor_nums)
-                    raw_log = str(raw_values.tolist()) # convert to string for json serialization
-                    # save sensor data
-                    report.add_sensor_data(uid=uid, data_key='raw_data_sample', data_value=raw_log)
+                    with timer.stage("raw_data_check"):
+                        result2, raw_values = configurator.raw_data_check(ipx=ipx, uid=uid, sensor_index=failed_sensor_nums)
+                    # save sensor data (binary raw samples file + reference in the report)
+                    report.add_raw_sample(uid=uid, raw_values=raw_values)
                     if result2 == True:
                         logging.info(f"Calibration successful for UID {uid} after raw data check")
                         break  # exit while loop on success
@@ -472,6 +613,7 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
                                 continue
                             elif choice == "skip":
                                 logging.warning(f"User chose to skip retrying calibration for UID {uid}.")
+                                cal_outcome = "skipped"
                                 break  # exit while loop to skip
                             elif choice == "abort":
                                 logging.warning("User aborted configuration.")
@@ -492,11 +634,21 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
             
                 elif choice == "skip":
                     logging.warning(f"User chose to skip retrying calibration for UID {uid}, moving on to next sensor")
+                    cal_outcome = "skipped"
                     break  # exit while loop to skip
 
                 elif choice == "abort":
                     logging.warning("User aborted configuration.")
                     raise fh.UserAbortError("Configuration aborted by user.")
+
+        uid_stage["attempts"] = counter
+        uid_stage["outcome"] = cal_outcome
+        timer.end(uid_stage)
+        live_view.update(uid, state="ok" if cal_outcome == "calibrated" else "skipped", calibration=f"{cal_outcome} ({counter})")
+        # attempts + outcome per sensor, used for retry / skip rates across runs
+        report.add_sensor_data(uid=uid, data_key='calibration_outcome', data_value={"result": cal_outcome, "attempts": counter, "duration_s": uid_stage["duration_s"]})
+        if checkpoint is not None:
+            checkpoint.mark(uid, "calibration", cal_outcome)
     
     #4. now check for abnormal high magnitude raw data across all sensors (after configuration):
     # the only thing is that we are already doing a raw data check and then doing the abnomalous high magnitude check, we should integrate this into the raw data check function?
@@ -505,13 +657,46 @@ def _run_calibration_loop(uids_list, ipx: IPXSerialCommunicator, configurator: I
 
 
 
-def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port):
+def _record_modbus_metrics(modbus_tester: "IPXModbusTester", alias_and_uids_list, report: "ReportGenerator", com_port):
+    """ Summarises the modbus transaction metrics into the report (per sensor + bus totals),
+    and writes the optional prometheus textfile export.
+
+    Args:
+        modbus_tester: IPXModbusTester instance used for the verification
+        alias_and_uids_list: List of tuples of (alias, uid) for all configured sensors
+        report: ReportGenerator instance for logging results
+        com_port: COM port used, added as a label to the prometheus export
+    """
+    metrics = modbus_tester.metrics
+    for alias, uid in alias_and_uids_list:
+        if int(alias) in metrics.per_alias:
+            report.add_sensor_data(uid=uid, data_key='modbus_bus_metrics', data_value=metrics.for_alias(alias).summary())
+    totals = metrics.totals()
+    report.add_metadata("Modbus Bus Metrics", totals)
+    logging.info(f"Modbus bus metrics: {totals['requests']} requests, {totals['timeout']} timeouts, "
+                 f"{totals['crc_framing_error']} CRC/framing errors, {totals['exception_response']} exception responses, "
+                 f"{totals['retries']} request retries, {totals['test_reruns']} test re-runs")
+
+    textfile_dir = IPXCommands.Metrics_settings.Prometheus_textfile_dir
+    if textfile_dir:
+        station = platform.node() or "unknown"
+        filepath = os.path.join(textfile_dir, f"ipx_modbus_{station}_{com_port}.prom".lower())
+        try:
+            metrics.write_prometheus_textfile(filepath, labels={"station": station, "port": str(com_port).upper()})
+            logging.info(f"Modbus metrics exported to {filepath}")
+        except OSError as e:
+            logging.error(f"Failed to export modbus metrics to {filepath}: {e}")
+
+
+
+def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port, acknowledge: bool = True):
     """ Runs modbus verification tests on configured sensors. (mimics datalogger)
 
     Args:
         alias_and_uids_list: List of tuples of (alias, uid) for all configured sensors
         report: ReportGenerator instance for logging results
         com_port: COM port to use for Modbus communication
+        acknowledge: wait for the user to press Enter after the summary
     
     Returns:
         True: if all tests completed
@@ -521,14 +706,20 @@ def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port)
     modbus_record = [] # list to store all modbus test results:
     # i should mimic how the datalogger would test, it would get all of the results and then we would manually check them after
     # so mimic that process, but instead of manually checking them, we automate the checking process
+    import pandas as pd
+    from IPX_datalogger_tester import IPXModbusTester # pymodbus only loaded for modbus verification
+
+    modbus_tester = IPXModbusTester(port=com_port, baudrate=9600)
     try:
-        with IPXModbusTester(port=com_port, baudrate=9600) as modbus_tester:
+        with modbus_tester:
             for tuple in alias_and_uids_list:
                 alias = tuple[0]
                 uid = tuple[1]
                 
                 logging.debug(f"Starting Modbus test for UID {uid} (Alias: {alias})")
-                test_result = fh.retry_on_exception(lambda: modbus_tester.run_full_test(uid=uid, alias=alias))
+                live_view.update(uid, alias=alias, stage="modbus test", state="running")
+                with report.stage_timer.stage("uid", uid=str(uid), alias=alias):
+                    test_result = fh.retry_on_exception(lambda: modbus_tester.run_full_test(uid=uid, alias=alias))
                 # retry incase a modbus read fails due to timeout or other comms error
 
 
@@ -537,6 +728,8 @@ def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port)
                 test_result_for_report = {key: test_result[key] for key in test_results_to_keep}
                 report.add_sensor_data(uid=uid, data_key='modbus_test_result', data_value=test_result_for_report) # log modbus test result to report
                 
+                live_view.update(uid, state="pass" if test_result["Overall_Pass"] else "fail",
+                                 verification=f"{test_result['Dist_mm']} mm {test_result['Temp_C']:.3g} C {test_result['Volt_V']:.3g} V")
                 # log immediate status just for info:
                 if test_result["Overall_Pass"]:
                     logging.info(f"Modbus test PASSED for UID {uid} (Alias: {alias})")
@@ -547,13 +740,16 @@ def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port)
     
     except Exception as e:
         logging.critical(f"An error occurred during Modbus testing: {e}", exc_info=True)
-        report.save_report(final_status="Modbus Test Failed") # save normal json report
+        _record_modbus_metrics(modbus_tester, alias_and_uids_list, report, com_port) # still keep the bus metrics, most useful when things go wrong
         report.save_txt_file(txt_content=txt_content) # save normal txt file of alias / uid mappings
+        report.save_report(final_status="Modbus Test Failed") # save normal json report (flushes all report files)
         log_msg = ("=" * 50 + "\n"
                 "Configuration was succesful but Modbus testing failed due to an unexpected error.\n"
                 "=" * 50 + "\n")
         return False
 
+    _record_modbus_metrics(modbus_tester, alias_and_uids_list, report, com_port)
+
     # Analysis + Reporting:
     datalogger_df = pd.DataFrame(modbus_record)
     # check for failures:
@@ -579,7 +775,8 @@ def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port)
                 f"Overall Result: {'✅ PASS' if row['Overall_Pass'] else '❌ FAIL'} \n"
                 f"=============================== \n")
         logging.debug(log_msg) # this is for debug log, for when i start saving the logs with every configuration run
-        print(log_msg) # this will look cleaner in the terminal
+        if not live_view.active(): # the live table already shows these
+            print(log_msg) # this will look cleaner in the terminal
 
     if failed_sensors.empty:
         logging.info(f"✅ ALL {len(datalogger_df)} SENSORS PASSED.")
@@ -595,11 +792,13 @@ def _run_modbus_verification(alias_and_uids_list, report, txt_content, com_port)
         logging.warning(f"Modbus verification complete. {len(failed_sensors)} sensors failed.")
 
     # pause so user sees summary:
-    input("Press Enter to acknowledge results and save reports...")
+    if acknowledge:
+        with live_view.suspended():
+            input("Press Enter to acknowledge results and save reports...")
     return True, datalogger_df, final_run_status
 
 
-def _run_geosense_verification(uids_list, report, txt_content, com_port):
+def _run_geosense_verification(uids_list, report, txt_content, com_port, acknowledge: bool = True):
     """
     Runs Geosense (datalogger) verification tests on configured sensors.
     Hardcoded to 9600 baud, should never be anything different for geosense.
@@ -608,6 +807,7 @@ def _run_geosense_verification(uids_list, report, txt_content, com_port):
         report: ReportGenerator instance for logging results
         com_port: COM port to use for Geosense communication
         txt_content: Content for the .txt report file
+        acknowledge: wait for the user to press Enter after the summary
     Returns:
         True: if all tests completed
         False: if critical error occurred
@@ -616,24 +816,48 @@ def _run_geosense_verification(uids_list, report, txt_content, com_port):
     logging.info("Starting Geosense measurement procedure for all inserts....")
     # instantiate geosensemeasurer
     # hardcoded to 9600, should never be anything different
+    import pandas as pd
+    from IPX_datalogger_tester import IPXGeosenseTester
+
     try:
         with IPXGeosenseTester(port=com_port, baudrate=9600) as geosense_tester:
+            # measure the whole string in one batched trigger-then-collect session
+            live_view.update_all(stage="geosense", state="running")
+            if IPXCommands.Geosense_settings.Acceptance_mode == "statistical":
+                logging.info(f"Collecting {IPXCommands.Geosense_settings.Samples_per_insert} samples per insert for statistical acceptance")
+                with report.stage_timer.stage("string_measurement", mode="statistical"):
+                    batch_results, failed_uids = geosense_tester.gxm_measure_string_statistical(uids_list)
+                measure_one_insert = geosense_tester.gxm_measure_test_statistical
+            else:
+                with report.stage_timer.stage("string_measurement", mode="single"):
+                    batch_results, failed_uids = geosense_tester.gxm_measure_string(uids_list)
+                measure_one_insert = geosense_tester.gxm_measure_test
+            results_by_uid = {result["uid"]: result for result in batch_results}
+
             measurement_record = [] # list to store all measurement results, (list of dicts)
             for uid in uids_list: 
-                logging.debug(f"Starting Geosense measurement for UID {uid}")
-                measurement_result = fh.retry_on_exception(
-                    operation_func=lambda: geosense_tester.gxm_measure_test(uid=uid)
-                )
-                # log measurement result to report
+                if uid in results_by_uid:
+                    measurement_result = results_by_uid[uid]
+                else:
+                    # inserts that failed in the batch get the usual one at a time retry handling
+                    logging.warning(f"Batched Geosense measurement failed for UID {uid} ({failed_uids.get(uid)}), measuring individually")
+                    with report.stage_timer.stage("uid_remeasure", uid=str(uid)):
+                        measurement_result = fh.retry_on_exception(
+                            operation_func=lambda: measure_one_insert(uid=uid)
+                        )
+                # log measurement result (including per-insert statistics in statistical mode) to report
                 report.add_sensor_data(uid=uid, data_key='geosense_measurement', data_value=measurement_result)
+                if measurement_result is not None:
+                    live_view.update(uid, state="pass" if measurement_result["pass"] else "fail",
+                                     verification=f"A {measurement_result['axis_a']}  {measurement_result['temperature']} C")
 
                 logging.info(f"Geosense measurement completed for UID {uid} with results: {measurement_result}")
                 measurement_record.append(measurement_result) # add result dict to record list
 
     except Exception as e:
         logging.critical(f"A critical error occurred during Geosense measurement: {e}", exc_info=True)
-        report.save_report(final_status="Geosense Measurement Failed") # save normal json report
         report.save_txt_file(txt_content=txt_content) # save normal txt file of uids
+        report.save_report(final_status="Geosense Measurement Failed") # save normal json report (flushes all report files)
         log_msg = ("=" * 50 + "\n"
                 "Configuration was succesful but Geosense measurement failed due to an unexpected error.\n"
                 "=" * 50 + "\n")
@@ -663,7 +887,8 @@ def _run_geosense_verification(uids_list, report, txt_content, com_port):
                 f"Overall Result: {'✅ PASS' if row['pass'] else '❌ FAIL'} \n"
                 f"=============================== \n")
         logging.debug(log_msg) # this is for debug log, for when i start saving the logs with every configuration run
-        print(log_msg) # this will look cleaner in the terminal
+        if not live_view.active(): # the live table already shows these
+            print(log_msg) # this will look cleaner in the terminal
 
     if failed_sensors.empty:
         logging.info(f"✅ ALL {len(datalogger_df)} SENSORS PASSED.")
@@ -679,9 +904,38 @@ def _run_geosense_verification(uids_list, report, txt_content, com_port):
         logging.warning(f"Geosense verification complete. {len(failed_sensors)} sensors failed.")
 
     # pause so user sees summary:
-    input("Press Enter to acknowledge results and save reports...")
+    if acknowledge:
+        with live_view.suspended():
+            input("Press Enter to acknowledge results and save reports...")
     return True, datalogger_df, final_run_status
     
+def _save_run_reports(report: "ReportGenerator", datalogger_df, txt_content, final_run_status, open_report: bool = True):
+    """ Saves the datalogger results, alias/uid txt file and the final json report, then opens the report """
+    # save final json report and uid + alias text file:
+    report.save_datalogger_results(datalogger_df=datalogger_df) # moved saving modbus results to here, as we do not need to save it for inserts
+    report.save_txt_file(txt_content=txt_content)
+    report.save_report(final_status=final_run_status) # should be consistent with the final_run_status variable, flushes all report files
+    
+
+    logging.debug("Report generation completed successfully.")
+    logging.info("-----------------------------------------------")
+    logging.info(str(final_run_status).upper())  
+    logging.info("-----------------------------------------------")
+
+    if not open_report:
+        return
+    # Open json file automatically when done:
+    try:
+        file_path = report.json_filepath
+        logging.info(f"Automatically opening report file: {file_path}")
+        if platform.system() == 'Windows':
+            os.startfile(file_path)
+        else:
+            logging.warning("Automatic opening of report file is only supported on Windows.")
+    except Exception as e:
+        logging.warning(f"Could not automatically open report file: {e}")
+
+
 # Function for getting order details from user:
 def get_order_details():
     """Gets manufacturing order details from user input."""
@@ -692,54 +946,103 @@ def get_order_details():
         return manufacturing_order, string_description, operator
     except KeyboardInterrupt:
         logging.info("Order details input cancelled by user.")
-        raise fh.UserAbortError("Order details input cancelled by user.")
+        raise fh.UserCancelledError("Order details input cancelled by user.")
 
 
 # Main function for handling configuration with user inputs:
-def run_configuration_flow(com_port, baudrate):
-    """Handles full sensor configuration flow.""" 
+def run_configuration_flow(com_port, baudrate, profile: bool = False, num_sensors: int = None, mo: str = None,
+                           string_description: str = None, operator: str = None, continue_without_check_sensor: bool = None,
+                           acknowledge: bool = True, open_report: bool = True,
+                           checkpoint: "session_checkpoint.SessionCheckpoint" = None):
+    """Handles full sensor configuration flow.
+    Anything not passed in (number of sensors, order details) is prompted for, batch runs pass everything.
+    Progress per sensor is checkpointed (session_checkpoint.py), so an interrupted run can be resumed.
+
+    Args:
+        profile (bool): cProfile the session, the .pstats file is saved next to the report
+        continue_without_check_sensor (bool): carry on if the bottom check sensor is missing (inserts), None to ask
+        acknowledge (bool): wait for Enter after the verification summary
+        open_report (bool): open the json report when done (Windows only)
+        checkpoint (SessionCheckpoint): only from resume_configuration_flow, carries on that run and skips
+                                        the work it has done
+    Returns:
+        The final run status string ("SUCCESS" if every sensor passed verification) if the run completed,
+        False if it failed, None if sensor detection was skipped
+    """ 
 
     # ------------------------- get initial settings, plus instantiate classes -------------------------------------- 
     try:
-        # get all the initial settings from user
-        num_sensors_int = get_initial_settings()
-        mo, string_description, operator = get_order_details()
+        # get all the initial settings from user (unless given)
+        num_sensors_int = num_sensors if num_sensors is not None else get_initial_settings()
+        if None in (mo, string_description, operator):
+            mo, string_description, operator = get_order_details()
+        if checkpoint is None:
+            import session_estimator # reads the run history, only when a run starts
+            session_estimator.log_estimate([num_sensors_int])
 
 
         # initialise the report generator
+        from report_generator import ReportGenerator # pandas / report modules only loaded when we start reporting
         report = ReportGenerator(
             port = com_port,
             manufacturing_order = mo,
             string_description = string_description,
-            operator = operator
+            operator = operator,
+            profile = profile,
+            resume_journal = checkpoint.journal_path if checkpoint is not None else None
         )
+        timer = report.stage_timer
+        run_log = ipx_logging.start_run_log(report.log_filepath) # json lines of everything logged during this run
 
 
 
         configurator = IPXConfigurator() # initialise IPX configurator without port or baudrate, as these will be set in the communicator context manager
+        view = live_view.LiveView(f"{mo} / {string_description}").start() # per sensor progress table, drawn in place
 
         # --------------------------- End of intial setup, ipx communicator is used in with loop -------------------------------
 
-        logging.info(f"--- Starting new external configuration session on {com_port} for {num_sensors_int} sensors ---")
         try:
             with IPXSerialCommunicator(port=com_port, baudrate=baudrate, verify=True) as ipx:
-                # Step 1: Verify sensor count with automatic retry handling
-                uids_list, check_sensor_present = fh.retry_on_failure(
-                    operation_func=configurator.verify_sensor_count,
-                    prompt_func=fh.prompt_user_on_other_failure,
-                    success_message=f"Successfully detected {num_sensors_int} sensors",
-                    ipx=ipx,
-                    num_sensors=num_sensors_int
-                )
-                
-                # could add failure rerpot?
-                if uids_list is None:
-                    logging.error("Sensor detection failed or was skipped. Exiting configuration.")
-                    return
-
-
-                
-                report.set_detected_sensors(uids_list) # NEW log detected UIDs to report:
+                resuming = checkpoint is not None
+                if resuming: # the sensors were confirmed by resume_configuration_flow
+                    checkpoint.journal, checkpoint.writer = report.journal, report.writer
+                    logging.info(f"--- Resuming configuration session on {com_port} for {num_sensors_int} sensors ---")
+                    uids_list, check_sensor_present = checkpoint.uids, checkpoint.data["check_sensor_present"]
+                    live_view.add_sensors(uids_list, stage="resumed", state="ok")
+                else:
+                    logging.info(f"--- Starting new external configuration session on {com_port} for {num_sensors_int} sensors ---")
+                    # Step 1: Verify sensor count with automatic retry handling
+                    with timer.stage("detect_sensors", expected=num_sensors_int):
+                        uids_list, check_sensor_present = fh.retry_on_failure(
+                            operation_func=configurator.verify_sensor_count,
+                            prompt_func=fh.prompt_user_on_other_failure,
+                            success_message=f"Successfully detected {num_sensors_int} sensors",
+                            ipx=ipx,
+                            num_sensors=num_sensors_int
+                        )
+
+                    # could add failure rerpot?
+                    if uids_list is None:
+                        logging.error("Sensor detection failed or was skipped. Exiting configuration.")
+                        return
+
+                    report.set_detected_sensors(uids_list) # NEW log detected UIDs to report:
+                    live_view.add_sensors(uids_list, stage="detected", state="ok")
+                    checkpoint = session_checkpoint.SessionCheckpoint.create(
+                        report.json_filepath, report.journal_filepath,
+                        run={"com_port": com_port, "baudrate": baudrate, "num_sensors": num_sensors_int, "mo": mo,
+                             "string_description": string_description, "operator": operator},
+                        uids=uids_list, check_sensor_present=check_sensor_present,
+                        journal=report.journal, writer=report.writer)
+
+                # quick sweep of the bus, so wiring / termination faults show up now and not after several calibrations
+                if IPXCommands.Preflight_settings.Enabled and not resuming:
+                    with timer.stage("preflight", sensors=len(uids_list)):
+                        fh.retry_on_failure(
+                            operation_func=_run_preflight_check,
+                            prompt_func=lambda: fh.prompt_user_on_other_failure("Pre-flight bus check failed, check the wiring and retry, or skip to calibrate anyway"),
+                            ipx=ipx, configurator=configurator, uids_list=uids_list, report=report
+                        )
 
                 inserts = False # initialise this flag for whether inserts are connected or not
                 #2. check whether inserts or normal extensometers are connected, and set default parameters accordingly:
@@ -749,13 +1052,20 @@ def run_configuration_flow(com_port, baudrate):
                     logging.info("Inserts detected, skipping alias assigning process")
                     if check_sensor_present is False:
                         logging.warning("Bottom check sensors has not been detected")
-                        user_response = input("Bottom check sensors not detected. Do you want to continue? (y/n): ").strip().lower()
+                        if continue_without_check_sensor is None:
+                            with live_view.suspended():
+                                user_response = input("Bottom check sensors not detected. Do you want to continue? (y/n): ").strip().lower()
+                        else:
+                            user_response = 'y' if continue_without_check_sensor else 'n'
                         if user_response != 'y':
                             logging.info("Configuration aborted by user due to missing bottom check sensors.")
                             raise fh.UserAbortError("Configuration aborted by user due to missing bottom check sensors.")
                         
                     # now log paramaters etc
-                    fh.retry_on_exception(lambda: configurator.set_default_parameters(ipx, uids_list, baud=baudrate, set_aliases=False,))
+                    with timer.stage("set_default_parameters", sensors=len(uids_list)):
+                        fh.retry_on_exception(lambda: configurator.set_default_parameters(ipx, uids_list, baud=baudrate, set_aliases=False,
+                                                                                          done_uids=checkpoint.done("parameters"),
+                                                                                          on_sensor_done=lambda uid: checkpoint.mark(uid, "parameters")))
                     txt_content = report.create_txt_content(aliases_and_uids_list=uids_list, inserts=True) # create the .txt content for the report generator
 
 
@@ -770,74 +1080,71 @@ def run_configuration_flow(com_port, baudrate):
                 else:
                     logging.info("Normal extensometers detected, proceeding with full configuration (including alias assignment) ")
                     inserts = False # ensure inserts flag is false
-                    alias_and_uids_list = fh.retry_on_exception(operation_func=lambda:configurator.set_default_parameters(ipx, uids_list, baud=baudrate))
+                    with timer.stage("set_default_parameters", sensors=len(uids_list)):
+                        alias_and_uids_list = fh.retry_on_exception(operation_func=lambda:configurator.set_default_parameters(
+                            ipx, uids_list, baud=baudrate, done_uids=checkpoint.done("parameters"),
+                            on_sensor_done=lambda uid: checkpoint.mark(uid, "parameters")))
                     # alias_and_uids_list is a list of tuples of format [(alias, uid), (alias, uid), etc....]
                     txt_content = report.create_txt_content(aliases_and_uids_list=alias_and_uids_list) # create the .txt content for the report generator
                 
                 logging.debug(f"UIDS_list before parsing into cal loop: {uids_list}")
 
                 #3. --------------------------------- run calibration with retry handling: ---------------------------------
-                _run_calibration_loop(uids_list=uids_list, ipx=ipx, configurator=configurator, report=report)
+                with timer.stage("calibration", sensors=len(uids_list)):
+                    _run_calibration_loop(uids_list=checkpoint.pending("calibration"), ipx=ipx, configurator=configurator, report=report,
+                                          checkpoint=checkpoint)
                 
                 
                         
                 #5. set final baud rate to 9600 for all sensors:
                 final_baud = IPXCommands.Default_settings.Baud_rate
                 logging.info(f"Setting baud rate for all devices to {final_baud}")
-                for uid in uids_list:
-                    fh.retry_on_exception(operation_func=lambda:ipx.set_baud(uid=uid, baud=final_baud))
+                with timer.stage("baud_switch", baud=final_baud):
+                    for uid in checkpoint.pending("baud_switch"):
+                        live_view.update(uid, stage="baud switch", state="running")
+                        fh.retry_on_exception(operation_func=lambda:ipx.set_baud(uid=uid, baud=final_baud))
+                        checkpoint.mark(uid, "baud_switch")
+                        live_view.update(uid, state="ok")
                 
                 
             
             with IPXSerialCommunicator(port=com_port, baudrate=final_baud, verify=True) as ipx:
                 # Final get status to store in the report
-                for uid in uids_list:
-                    #put this into a try catch, while retry loop, as have had issues where a sensor hasnt responded in time
-                    fh.retry_on_exception(
-                        operation_func=lambda: report.add_sensor_data(uid=uid, data_key='final_status', data_value=ipx.get_status(uid=uid, data_type='dict'))
-                    )
-                    logging.debug(f"Successfully retrieved final status for UID {uid}")
+                with timer.stage("final_status"):
+                    for uid in checkpoint.pending("final_status"):
+                        live_view.update(uid, stage="final status", state="running")
+                        #put this into a try catch, while retry loop, as have had issues where a sensor hasnt responded in time
+                        fh.retry_on_exception(
+                            operation_func=lambda: report.add_sensor_data(uid=uid, data_key='final_status', data_value=ipx.get_status(uid=uid, data_type='dict'))
+                        )
+                        logging.debug(f"Successfully retrieved final status for UID {uid}")
+                        checkpoint.mark(uid, "final_status")
+                        live_view.update(uid, state="ok")
 
 
 
                 #------------------------- Modbus testing time! -------------------------
             if inserts == False: # only run modbus testing for normal extensometers
-                _, datalogger_df, final_run_status = _run_modbus_verification(alias_and_uids_list=alias_and_uids_list, report=report, txt_content=txt_content, com_port=com_port)
+                with timer.stage("modbus_verification"):
+                    verification = _run_modbus_verification(alias_and_uids_list=alias_and_uids_list, report=report, txt_content=txt_content, com_port=com_port, acknowledge=acknowledge)
                 
 # ------------------------------------------- Geosense measurement procedure --------------------------------------------------------
             # debating whether to chane modbus_df to just datalogger_df, that way can keep saving seperate
             # insert measurements should be in df as well
             elif inserts == True:
-                _, datalogger_df, final_run_status = _run_geosense_verification(uids_list=uids_list, report=report, txt_content=txt_content, com_port=com_port)  
-
+                with timer.stage("geosense_verification"):
+                    verification = _run_geosense_verification(uids_list=uids_list, report=report, txt_content=txt_content, com_port=com_port, acknowledge=acknowledge)
 
+            if verification is False: # reports already saved with the failure status
+                checkpoint.finish()
+                return False
+            _, datalogger_df, final_run_status = verification
+            checkpoint.mark_all("verification", final_run_status)
 
-                
 # Now onto saving the reports:
-            
-            # save final json report and uid + alias text file:
-            report.save_datalogger_results(datalogger_df=datalogger_df) # moved saving modbus results to here, as we do not need to save it for inserts
-            report.save_report(final_status=final_run_status) # should be consistent with the final_run_status variable
-            report.save_txt_file(txt_content=txt_content)
-            
-
-            logging.debug("Report generation completed successfully.")
-            logging.info("-----------------------------------------------")
-            logging.info(str(final_run_status).upper())  
-            logging.info("-----------------------------------------------")
-            
-            # Open json file automatically when done:
-            try:
-                file_path = report.json_filepath
-                logging.info(f"Automatically opening report file: {file_path}")
-                if platform.system() == 'Windows':
-                    os.startfile(file_path)
-                else:
-                    logging.warning("Automatic opening of report file is only supported on Windows.")
-            except Exception as e:
-                logging.warning(f"Could not automatically open report file: {e}")
-
-            return True
+            _save_run_reports(report, datalogger_df, txt_content, final_run_status, open_report=open_report)
+            checkpoint.finish()
+            return final_run_status
 
                     # Try to catch any unexpected errrors
         except fh.UserAbortError:
@@ -854,9 +1161,17 @@ def run_configuration_flow(com_port, baudrate):
             logging.critical(f"CONFIGURATION FAILED: An unexpected error occurred: {e}", exc_info=True)
             return False
 
+        finally:
+            report.stop_profiling() # no-op unless profiling, and if save_report already dumped it
+            report.close() # failed / aborted runs too, queued files are written and nothing is left open
+            view.stop()
+            if checkpoint is not None and not checkpoint.finished:
+                logging.warning(f"Run can be resumed: main.py resume --checkpoint \"{checkpoint.filepath}\" (or menu option 11)")
+            ipx_logging.stop_run_log(run_log)
+
     except KeyboardInterrupt:
         logging.info("Configuration flow interrupted by user (Ctrl+C). Returning to main menu.")
-        raise fh.UserAbortError("Configuration flow cancelled by user.")
+        raise fh.UserCancelledError("Configuration flow cancelled by user.")
     
 
 
@@ -873,4 +1188,216 @@ def run_configuration_flow(com_port, baudrate):
 
 
 
-    
\ No newline at end of file
+    
+
+
+# Verification only (no configuration), e.g. re-testing a string that was configured earlier:
+def _status_matches_defaults(status: dict, alias: int = None) -> bool:
+    """ True if a sensor's get_status shows the default parameters (and its alias), i.e. set_default_parameters got to it """
+    defaults = IPXCommands.Default_settings
+    expected = {"Gain": defaults.Gain, "Centroid Threshold": defaults.Centroid_threshold,
+                "Termination Resistor": defaults.Termination, "Standard Devs Threshold": defaults.N_stds}
+    if alias is not None:
+        expected["Alias"] = alias
+    for key, value in expected.items():
+        if key not in status: # older firmware doesn't report everything
+            continue
+        try:
+            if float(status[key]) != float(value):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+def _confirm_resume_state(checkpoint: "session_checkpoint.SessionCheckpoint", com_port: str) -> bool:
+    """get_status sweep of the interrupted run's sensors, at the run baud and then the final baud, and brings the
+    checkpoint in line with what the sensors say, e.g. a baud switch that went through just before the interruption.
+    Returns:
+        bool: False if any sensor doesn't answer (another string connected, or a wiring fault)"""
+    configurator = IPXConfigurator()
+    run_baud, final_baud = checkpoint.run["baudrate"], IPXCommands.Default_settings.Baud_rate
+    found = {} # uid: (baud it answered at, status)
+    for baud in dict.fromkeys((run_baud, final_baud)):
+        missing = [uid for uid in checkpoint.uids if uid not in found]
+        if not missing:
+            break
+        with IPXSerialCommunicator(port=com_port, baudrate=baud) as ipx:
+            for uid, status in configurator.status_sweep(ipx, missing).items():
+                if status is not None:
+                    found[uid] = (baud, status)
+
+    missing = [uid for uid in checkpoint.uids if uid not in found]
+    if missing:
+        logging.error(f"{len(missing)} sensor(s) of the interrupted run did not answer: {missing}. Is the same string connected?")
+        return False
+
+    inserts = all(str(uid).startswith("104") for uid in checkpoint.uids)
+    for index, uid in enumerate(checkpoint.uids):
+        baud, status = found[uid]
+        if run_baud != final_baud:
+            if baud == final_baud and not checkpoint.is_done(uid, "baud_switch"):
+                logging.info(f"UID {uid} is already at {final_baud} baud")
+                checkpoint.mark(uid, "baud_switch")
+            elif baud == run_baud and checkpoint.is_done(uid, "baud_switch"):
+                logging.warning(f"UID {uid} is still at {run_baud} baud, switching it again")
+                checkpoint.unmark(uid, "baud_switch")
+                checkpoint.unmark(uid, "final_status")
+        alias = None if inserts else len(checkpoint.uids) - index # same as set_default_parameters
+        if baud == run_baud and checkpoint.is_done(uid, "parameters") and not _status_matches_defaults(status, alias):
+            logging.warning(f"UID {uid} does not have the default parameters, setting and calibrating it again")
+            checkpoint.unmark(uid, "parameters")
+            checkpoint.unmark(uid, "calibration")
+    return True
+
+
+def _select_checkpoint(checkpoint_path: str = None) -> "session_checkpoint.SessionCheckpoint":
+    """ Checkpoint from a path, 'latest', or (None) picked from the interrupted runs in production_runs """
+    if checkpoint_path and checkpoint_path != "latest":
+        return session_checkpoint.SessionCheckpoint.load(checkpoint_path)
+    checkpoints = session_checkpoint.find_checkpoints()
+    if not checkpoints:
+        raise session_checkpoint.CheckpointError("No interrupted runs to resume in production_runs")
+    if checkpoint_path == "latest" or len(checkpoints) == 1:
+        return checkpoints[0]
+    print("\nInterrupted runs (newest first):")
+    for number, checkpoint in enumerate(checkpoints, start=1):
+        run = checkpoint.run
+        print(f"{number}. {run.get('mo')} / {run.get('string_description')} ({len(checkpoint.uids)} sensors, "
+              f"last update {checkpoint.data.get('updated')}): {checkpoint.summary()}")
+    choice = input(f"Select a run to resume (1-{len(checkpoints)}, Enter for 1): ").strip() or "1"
+    if not choice.isdigit() or not 1 <= int(choice) <= len(checkpoints):
+        raise session_checkpoint.CheckpointError(f"Invalid choice '{choice}'")
+    return checkpoints[int(choice) - 1]
+
+
+def resume_configuration_flow(checkpoint_path: str = None, com_port: str = None, acknowledge: bool = True, open_report: bool = True):
+    """Carries on an interrupted configuration run from its checkpoint: confirms the sensors with a get_status sweep,
+    then run_configuration_flow does only the unfinished work, into the same report.
+
+    Args:
+        checkpoint_path (str): checkpoint file, 'latest' for the newest, None to choose from a list
+        com_port (str): port the string is on now, default the one the run was on
+    Returns:
+        as run_configuration_flow, False if the run can't be resumed
+    """
+    try:
+        checkpoint = _select_checkpoint(checkpoint_path)
+    except session_checkpoint.CheckpointError as e:
+        logging.error(str(e))
+        return False
+    except KeyboardInterrupt:
+        raise fh.UserCancelledError("Resume cancelled by user.")
+    if not os.path.exists(checkpoint.journal_path):
+        logging.error(f"Run journal {checkpoint.journal_path} is gone (report already saved or recovered), the run can't be resumed")
+        return False
+
+    run = checkpoint.run
+    com_port = com_port or run["com_port"]
+    logging.info(f"Resuming {run['mo']} / {run['string_description']} ({len(checkpoint.uids)} sensors) on {com_port}: {checkpoint.summary()}")
+    try:
+        if not _confirm_resume_state(checkpoint, com_port):
+            return False
+    except (IPXSerialError, OSError) as e: # SerialException is an OSError, e.g. port gone
+        logging.error(f"Could not check the sensors on {com_port}: {e}")
+        return False
+    checkpoint.add_resume(com_port)
+    logging.info(f"To do after the status sweep: {checkpoint.summary()}")
+
+    return run_configuration_flow(com_port, run["baudrate"], num_sensors=run["num_sensors"], mo=run["mo"],
+                                  string_description=run["string_description"], operator=run["operator"],
+                                  continue_without_check_sensor=True, acknowledge=acknowledge, open_report=open_report,
+                                  checkpoint=checkpoint)
+
+
+def run_verification_flow(com_port, num_sensors: int = None, mo: str = None, string_description: str = None,
+                          operator: str = None, baudrate: int = None, acknowledge: bool = True, open_report: bool = True):
+    """Runs the datalogger verification (Modbus for extensometers, Geosense for inserts) on an already configured string.
+    Aliases are taken to be the ones set_default_parameters assigned (counting down from the top of the string).
+
+    Args:
+        baudrate (int): baud rate the sensors are at, defaults to the configured baud rate
+        acknowledge (bool): wait for Enter after the verification summary
+        open_report (bool): open the json report when done (Windows only)
+    Returns:
+        The final run status string if verification completed, False if it failed, None if sensor detection was skipped
+    """
+    try:
+        num_sensors_int = num_sensors if num_sensors is not None else get_initial_settings()
+        if None in (mo, string_description, operator):
+            mo, string_description, operator = get_order_details()
+        baudrate = baudrate or IPXCommands.Default_settings.Baud_rate
+
+        from report_generator import ReportGenerator
+        report = ReportGenerator(port=com_port, manufacturing_order=mo, string_description=string_description, operator=operator)
+        report.add_metadata("Run Type", "Verification only")
+        timer = report.stage_timer
+        run_log = ipx_logging.start_run_log(report.log_filepath)
+        configurator = IPXConfigurator()
+        view = live_view.LiveView(f"{mo} / {string_description} (verification)").start()
+
+        logging.info(f"--- Starting verification session on {com_port} for {num_sensors_int} sensors ---")
+        try:
+            with IPXSerialCommunicator(port=com_port, baudrate=baudrate, verify=True) as ipx:
+                with timer.stage("detect_sensors", expected=num_sensors_int):
+                    detected = fh.retry_on_failure(
+                        operation_func=configurator.verify_sensor_count,
+                        prompt_func=fh.prompt_user_on_other_failure,
+                        success_message=f"Successfully detected {num_sensors_int} sensors",
+                        ipx=ipx,
+                        num_sensors=num_sensors_int
+                    )
+                if detected is None:
+                    logging.error("Sensor detection failed or was skipped. Exiting verification.")
+                    return None
+                uids_list, _ = detected
+                report.set_detected_sensors(uids_list)
+                live_view.add_sensors(uids_list, stage="detected", state="ok")
+
+                with timer.stage("final_status"):
+                    for uid in uids_list:
+                        live_view.update(uid, stage="final status", state="running")
+                        fh.retry_on_exception(
+                            operation_func=lambda: report.add_sensor_data(uid=uid, data_key='final_status', data_value=ipx.get_status(uid=uid, data_type='dict'))
+                        )
+                        live_view.update(uid, state="ok")
+
+            if all(str(uid).startswith("104") for uid in uids_list): # inserts
+                txt_content = report.create_txt_content(aliases_and_uids_list=uids_list, inserts=True)
+                with timer.stage("geosense_verification"):
+                    verification = _run_geosense_verification(uids_list=uids_list, report=report, txt_content=txt_content, com_port=com_port, acknowledge=acknowledge)
+            elif any(str(uid).startswith("104") for uid in uids_list):
+                logging.critical("Mixed sensor types detected (inserts and extensometers). Aborting verification.")
+                raise fh.UserAbortError("Verification aborted due to mixed sensor types (inserts and normal extensometers).")
+            else:
+                alias_and_uids_list = list(zip(range(len(uids_list), 0, -1), uids_list)) # same aliases as set_default_parameters
+                txt_content = report.create_txt_content(aliases_and_uids_list=alias_and_uids_list)
+                with timer.stage("modbus_verification"):
+                    verification = _run_modbus_verification(alias_and_uids_list=alias_and_uids_list, report=report, txt_content=txt_content, com_port=com_port, acknowledge=acknowledge)
+
+            if verification is False:
+                return False
+            _, datalogger_df, final_run_status = verification
+            _save_run_reports(report, datalogger_df, txt_content, final_run_status, open_report=open_report)
+            return final_run_status
+
+        except fh.UserAbortError:
+            logging.info("Verification aborted by user.")
+            raise
+
+        except(IPXSerialError, RuntimeError) as e:
+            logging.critical(f" VERIFICATION FAILED: A critical error occurred: {e}")
+            return False
+
+        except Exception as e:
+            logging.critical(f"VERIFICATION FAILED: An unexpected error occurred: {e}", exc_info=True)
+            return False
+
+        finally:
+            report.close()
+            view.stop()
+            ipx_logging.stop_run_log(run_log)
+
+    except KeyboardInterrupt:
+        logging.info("Verification flow interrupted by user (Ctrl+C). Returning to main menu.")
+        raise fh.UserCancelledError("Verification flow cancelled by user.")
@@ -0,0 +1,325 @@
+# batch_cli.py
+# Non-interactive subcommands for main.py, so runs can be scripted / queued with nobody waiting at the prompts.
+# Every parameter comes from flags or a JSON / YAML job file (flags override the file), failures are handled
+# by a Failure_handlers.NonInteractivePolicy instead of prompts, and the exit code says how it went.
+#
+#   main.py configure --port COM5 --sensors 12 --mo MO123 --string STRING_A --operator HS
+#   main.py configure --job queue.yaml                  (several strings back to back)
+#   main.py list-uids --port COM5 --baud 9600
+#   main.py update-uids --port COM5 --sensors 3 --new-uids 20001,20002,20003
+#   main.py update-uids --port COM5 --mapping uids.csv  (bulk remap, CSV or build sheet order JSON, see uid_remap.py)
+#   main.py switch-baud --port COM5
+#   main.py verify --port COM5 --sensors 12 --mo MO123 --string STRING_A --operator HS
+#   main.py resume --checkpoint latest                 (carry on an interrupted configure run, see session_checkpoint.py)
+#   main.py order --order HS2_order_data.json --mo MO123 --port COM5 --operator HS  (every string of a build sheet order, see order_runner.py)
+#
+# Job file, either one job, a list of jobs, or defaults + jobs (keys are the flag names, with _ instead of -):
+#   defaults: {port: COM5, operator: HS}
+#   jobs:
+#     - {mo: MO123, string: STRING_A, sensors: 12}
+#     - {mo: MO123, string: STRING_B, sensors: 8}
+#
+# One json line per job is printed to stdout (logs go to stderr), the exit code is the worst job's (EXIT_* below).
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import Failure_handlers as fh
+import IPX_workflows
+import ipx_logging
+import session_checkpoint
+
+
+EXIT_OK = 0             # completed, every sensor passed
+EXIT_TEST_FAILURES = 1  # completed, but some sensors failed verification
+EXIT_USAGE = 2          # bad arguments or job file (argparse errors are 2 as well)
+EXIT_ABORTED = 3        # aborted by the failure policy or Ctrl+C
+EXIT_FAILED = 4         # run failed (comms error, sensors not detected, unexpected error)
+
+COMMANDS = ["configure", "list-uids", "update-uids", "switch-baud", "verify", "resume"]
+ORDER_COMMAND = "order" # runs configure jobs planned from an order file, see order_runner.py
+
+# per command: required job keys and the defaults for the optional ones
+JOB_KEYS = {
+    "configure": (["port", "sensors", "mo", "string", "operator"],
+                  {"baud": 115200, "profile": False, "continue_without_check_sensor": False}),
+    "list-uids": (["port"], {"baud": 115200}),
+    "update-uids": (["port"], {"baud": 115200, "sensors": None, "new_uids": None, "mapping": None, "string": None}),
+    "switch-baud": (["port"], {}),
+    "verify": (["port", "sensors", "mo", "string", "operator"], {"baud": None}),
+    "resume": (["checkpoint"], {"port": None}), # port defaults to the one the run was on
+}
+POLICY_DEFAULTS = {"on_cal_failure": "skip", "on_error": "retry", "max_retries": 2}
+
+
+class JobFileError(Exception):
+    """ Job file could not be read or has invalid jobs """
+    pass
+
+
+def add_subcommands(parser: argparse.ArgumentParser):
+    """ Adds the batch subcommands to main.py's parser (args.command is None when none is given) """
+    subparsers = parser.add_subparsers(dest="command", metavar="{" + ",".join(COMMANDS + [ORDER_COMMAND]) + "}")
+
+    # options are SUPPRESSed when not given, so we can tell which flags should override the job file
+    common = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    common.add_argument("--job", dest="job_file", help="JSON or YAML job file (one job, a list, or defaults + jobs)")
+    common.add_argument("--port", help="COM port")
+    common.add_argument("--baud", type=int, help="Baud rate the sensors are currently at")
+    common.add_argument("--on-cal-failure", dest="on_cal_failure", choices=fh.FAILURE_ACTIONS,
+                        help=f"What to do when a sensor fails calibration (default {POLICY_DEFAULTS['on_cal_failure']})")
+    common.add_argument("--on-error", dest="on_error", choices=fh.FAILURE_ACTIONS,
+                        help=f"What to do on any other failure (default {POLICY_DEFAULTS['on_error']})")
+    common.add_argument("--max-retries", dest="max_retries", type=int,
+                        help=f"Automatic retries before skipping / aborting (default {POLICY_DEFAULTS['max_retries']})")
+    common.add_argument("--stop-on-failure", dest="stop_on_failure", action="store_true",
+                        help="Stop the job queue at the first job that does not succeed")
+    common.add_argument("--verbose", action="store_true", help="Debug logging")
+
+    string_job = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    string_job.add_argument("--sensors", type=int, help="Expected number of sensors (excluding the check sensor)")
+    string_job.add_argument("--mo", help="Manufacturing order")
+    string_job.add_argument("--string", help="String description")
+    string_job.add_argument("--operator", help="Operator name / ID")
+
+    configure = subparsers.add_parser("configure", parents=[common, string_job], help="Full sensor configuration + verification")
+    configure.add_argument("--profile", action="store_true", default=argparse.SUPPRESS, help="cProfile the run")
+    configure.add_argument("--continue-without-check-sensor", dest="continue_without_check_sensor", action="store_true",
+                           default=argparse.SUPPRESS, help="Carry on if the bottom check sensor is missing (inserts)")
+
+    subparsers.add_parser("list-uids", parents=[common], help="List the UIDs of the connected sensors")
+
+    update_uids = subparsers.add_parser("update-uids", parents=[common], help="Set new UIDs, in string order (top to bottom)")
+    update_uids.add_argument("--sensors", type=int, default=argparse.SUPPRESS, help="Expected number of sensors")
+    update_uids.add_argument("--new-uids", dest="new_uids", type=lambda value: [uid.strip() for uid in value.split(",") if uid.strip()],
+                             default=argparse.SUPPRESS, help="Comma separated new UIDs, top to bottom")
+    update_uids.add_argument("--mapping", default=argparse.SUPPRESS,
+                             help="Bulk remap file instead of --new-uids: old_uid,new_uid CSV, new_uid CSV or build sheet order JSON")
+    update_uids.add_argument("--string", default=argparse.SUPPRESS, help="String name, for multi string order files")
+
+    subparsers.add_parser("switch-baud", parents=[common], help="Switch all connected sensors from 9600 to 115200 baud")
+
+    subparsers.add_parser("verify", parents=[string_job, common], help="Datalogger verification only, of an already configured string")
+
+    resume = subparsers.add_parser("resume", parents=[common], help="Carry on an interrupted configure run from its checkpoint")
+    resume.add_argument("--checkpoint", required=True, help="Run checkpoint (*_checkpoint.json), or 'latest'")
+
+    order = subparsers.add_parser(ORDER_COMMAND, parents=[common], help="Configure every string of a build sheet order")
+    order.add_argument("--order", nargs="+", required=True, help="Order JSON file(s), or a folder of them")
+    order.add_argument("--mo", default=argparse.SUPPRESS, help="Manufacturing order, if the order file has none")
+    order.add_argument("--operator", required=True, help="Operator name / ID")
+    order.add_argument("--strings", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                       default=argparse.SUPPRESS, help="Comma separated strings (description or id) to run, default all")
+    order.add_argument("--wait", action="store_true", default=argparse.SUPPRESS,
+                       help="Wait for Enter before each string, so it can be connected")
+    order.add_argument("--rerun", action="store_true", default=argparse.SUPPRESS,
+                       help="Run strings that already passed in an earlier run of the order too")
+    order.add_argument("--continue-without-check-sensor", dest="continue_without_check_sensor", action="store_true",
+                       default=argparse.SUPPRESS, help="Carry on if the bottom check sensor is missing (inserts)")
+    return subparsers
+
+
+def load_job_file(filepath: str) -> list[dict]:
+    """ Reads a JSON or YAML job file into a list of job dicts (defaults merged in) """
+    is_yaml = os.path.splitext(filepath)[1].lower() in (".yaml", ".yml")
+    try:
+        with open(filepath, "r", encoding="utf-8") as file:
+            text = file.read()
+    except OSError as e:
+        raise JobFileError(f"Could not read job file {filepath}: {e}")
+
+    if is_yaml:
+        try:
+            import yaml # optional, only needed for yaml job files
+        except ImportError:
+            raise JobFileError("YAML job files need PyYAML (pip install pyyaml), or use a .json job file")
+        try:
+            content = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise JobFileError(f"Could not parse job file {filepath}: {e}")
+    else:
+        try:
+            content = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise JobFileError(f"Could not parse job file {filepath}: {e}")
+
+    defaults = {}
+    if isinstance(content, dict) and "jobs" in content:
+        defaults = content.get("defaults") or {}
+        content = content["jobs"]
+    jobs = content if isinstance(content, list) else [content]
+    if not jobs or not all(isinstance(job, dict) for job in jobs) or not isinstance(defaults, dict):
+        raise JobFileError(f"Job file {filepath} must contain a job, a list of jobs, or 'defaults' + 'jobs'")
+    return [{**defaults, **job} for job in jobs]
+
+
+def prepare_job(command: str, job: dict, index: int = 1) -> dict:
+    """ Checks a job dict for the command (keys, required values, failure actions) and fills in the defaults
+
+    Raises:
+        JobFileError: if the job is invalid
+    """
+    if command not in JOB_KEYS:
+        raise JobFileError(f"Unknown command '{command}', must be one of {COMMANDS}")
+    required, optional = JOB_KEYS[command]
+    allowed = set(required) | set(optional) | set(POLICY_DEFAULTS)
+
+    job = {key.replace("-", "_"): value for key, value in job.items()}
+    unknown = set(job) - allowed
+    if unknown:
+        raise JobFileError(f"Job {index}: unknown keys for '{command}': {', '.join(sorted(unknown))}")
+    job = {**POLICY_DEFAULTS, **optional, **job}
+    missing = [key for key in required if job.get(key) in (None, "", [])]
+    if missing:
+        raise JobFileError(f"Job {index}: missing {', '.join('--' + key.replace('_', '-') for key in missing)}")
+    for action_key in ("on_cal_failure", "on_error"):
+        if job[action_key] not in fh.FAILURE_ACTIONS:
+            raise JobFileError(f"Job {index}: {action_key} must be one of {fh.FAILURE_ACTIONS}")
+    if command == "update-uids" and (job["new_uids"] is None) == (job["mapping"] is None):
+        raise JobFileError(f"Job {index}: update-uids needs either --new-uids (with --sensors) or --mapping")
+    if command == "update-uids" and job["new_uids"] is not None and not job["sensors"]:
+        raise JobFileError(f"Job {index}: missing --sensors")
+    if job.get("new_uids") is not None:
+        try:
+            job["new_uids"] = [int(uid) for uid in job["new_uids"]]
+        except (TypeError, ValueError):
+            raise JobFileError(f"Job {index}: new_uids must be a list of integer UIDs")
+    if command == "resume":
+        _prepare_resume_job(job, index)
+    return job
+
+
+def _prepare_resume_job(job: dict, index: int):
+    """ Resolves 'latest' to the checkpoint path and fills in the port / order details from it """
+    try:
+        if job["checkpoint"] == "latest":
+            checkpoints = session_checkpoint.find_checkpoints()
+            if not checkpoints:
+                raise session_checkpoint.CheckpointError("no interrupted runs to resume in production_runs")
+            checkpoint = checkpoints[0]
+        else:
+            checkpoint = session_checkpoint.SessionCheckpoint.load(job["checkpoint"])
+    except session_checkpoint.CheckpointError as e:
+        raise JobFileError(f"Job {index}: {e}")
+    job["checkpoint"] = checkpoint.filepath
+    job["port"] = job["port"] or checkpoint.run["com_port"]
+    job["mo"], job["string"] = checkpoint.run["mo"], checkpoint.run["string_description"]
+
+
+def build_jobs(command: str, args: argparse.Namespace) -> list[dict]:
+    """ Job dicts for the command: job file values, overridden by any flags given, plus defaults """
+    allowed_flags = set(JOB_KEYS[command][0]) | set(JOB_KEYS[command][1]) | set(POLICY_DEFAULTS)
+    flags = {key: value for key, value in vars(args).items() if key in allowed_flags}
+    jobs = load_job_file(args.job_file) if getattr(args, "job_file", None) else [{}]
+    return [prepare_job(command, {**job, **flags}, index) for index, job in enumerate(jobs, start=1)]
+
+
+def _status_to_exit_code(status) -> int:
+    """ Workflow return value -> exit code """
+    if status is None or status is False:
+        return EXIT_FAILED
+    if status is True or status == "SUCCESS":
+        return EXIT_OK
+    return EXIT_TEST_FAILURES # completed with a failure status string
+
+
+def run_job(command: str, job: dict, interactive: bool = False) -> dict:
+    """ Runs one job with the non-interactive failure policy, returns the result line (includes exit_code)
+
+    Args:
+        interactive: failures prompt the operator instead (menu order runs, order_runner.py)
+    """
+    result = {"command": command, "port": job["port"]}
+    for key in ("mo", "string"):
+        if job.get(key) is not None:
+            result[key] = job[key]
+
+    if not interactive:
+        fh.set_failure_policy(fh.NonInteractivePolicy(on_cal_failure=job["on_cal_failure"], on_other_failure=job["on_error"],
+                                                      max_retries=job["max_retries"]))
+    try:
+        if command == "configure":
+            status = IPX_workflows.run_configuration_flow(
+                job["port"], job["baud"], profile=job["profile"], num_sensors=job["sensors"], mo=job["mo"],
+                string_description=job["string"], operator=job["operator"],
+                continue_without_check_sensor=job["continue_without_check_sensor"], acknowledge=interactive, open_report=False)
+        elif command == "verify":
+            status = IPX_workflows.run_verification_flow(
+                job["port"], num_sensors=job["sensors"], mo=job["mo"], string_description=job["string"],
+                operator=job["operator"], baudrate=job["baud"], acknowledge=False, open_report=False)
+        elif command == "list-uids":
+            result["uids"] = IPX_workflows.list_uids(job["port"], job["baud"])
+            status = result["uids"] is not None
+        elif command == "update-uids" and job["mapping"]:
+            status = IPX_workflows.run_bulk_uid_remap_flow(job["port"], job["baud"], job["mapping"],
+                                                           string_name=job["string"], confirm=False)
+        elif command == "update-uids":
+            status = IPX_workflows.run_uid_update_flow(job["port"], job["baud"], num_sensors=job["sensors"],
+                                                       new_uids=job["new_uids"], confirm=False)
+        elif command == "switch-baud":
+            status = IPX_workflows.switch_all_to_115200(job["port"], confirm=False)
+        elif command == "resume":
+            status = IPX_workflows.resume_configuration_flow(job["checkpoint"], com_port=job["port"],
+                                                             acknowledge=interactive, open_report=False)
+        result["status"] = status if isinstance(status, str) else ("ok" if status else "failed")
+        result["exit_code"] = _status_to_exit_code(status)
+    except (KeyboardInterrupt, fh.UserCancelledError) as e: # the workflows turn Ctrl+C into UserCancelledError
+        logging.warning(f"{command} interrupted (Ctrl+C)")
+        result.update(status="aborted", error=str(e) or "KeyboardInterrupt", cancelled=True, exit_code=EXIT_ABORTED)
+    except fh.UserAbortError as e:
+        logging.warning(f"{command} aborted: {e}")
+        result.update(status="aborted", error=str(e), exit_code=EXIT_ABORTED)
+    except Exception as e:
+        logging.critical(f"{command} failed: {e}", exc_info=True)
+        result.update(status="failed", error=str(e), exit_code=EXIT_FAILED)
+    finally:
+        fh.set_failure_policy(None)
+    return result
+
+
+def run(args: argparse.Namespace) -> int:
+    """ Runs every job for args.command, prints one json line per job, returns the exit code """
+    if getattr(args, "verbose", False):
+        ipx_logging.set_console_level(logging.DEBUG)
+    if args.command == ORDER_COMMAND:
+        import order_runner # imports this module
+        return order_runner.run_cli(args)
+    try:
+        jobs = build_jobs(args.command, args)
+    except JobFileError as e:
+        logging.error(str(e))
+        print(json.dumps({"command": args.command, "status": "usage error", "error": str(e), "exit_code": EXIT_USAGE}), flush=True)
+        return EXIT_USAGE
+
+    exit_code = EXIT_OK
+    for index, job in enumerate(jobs, start=1):
+        if len(jobs) > 1:
+            logging.info(f"===== Job {index}/{len(jobs)}: {args.command} {job.get('mo', '')} {job.get('string', '')} =====")
+        result = run_job(args.command, job)
+        result["job"] = index
+        print(json.dumps(result, default=str), flush=True)
+        exit_code = max(exit_code, result["exit_code"])
+        if result.get("cancelled"):
+            break # Ctrl+C stops the whole queue
+        if result["exit_code"] != EXIT_OK and getattr(args, "stop_on_failure", False):
+            logging.warning("Stopping the job queue (--stop-on-failure)")
+            break
+    return exit_code
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="IPX configuration batch CLI")
+    add_subcommands(parser)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return EXIT_USAGE
+    ipx_logging.setup_logging(logging.INFO)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# fleet_analytics.py
+# Fleet wide calibration / datalogger statistics, control limits, outliers and batch drift.
+# Streams the Parquet archive (parquet_archive.py) in fixed size record batches, so memory stays bounded
+# no matter how many years of production data are in it.
+#
+#   python parquet_archive.py archive           (bring the archive up to date first)
+#   python fleet_analytics.py --output fleet_reports
+#   python fleet_analytics.py --mo MO001 --since-month 2025-01 --sigma 3
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import parquet_archive as pa_archive
+
+
+CALIBRATION_KEYS = ["axis", "sensor_num"]
+CALIBRATION_METRICS = ["mean", "std_dev"]
+DATALOGGER_METRICS = ["dist_mm", "temp_c", "volt_v", "axis_a"]
+
+
+# ---------------------------- mergeable statistics ----------------------------
+
+def _batch_moments(df: pd.DataFrame, keys: list[str], metric: str) -> pd.DataFrame:
+    """ count / mean / M2 (sum of squared deviations) per group for one batch, fully vectorised """
+    grouped = df.groupby(keys, observed=True)[metric]
+    moments = grouped.agg(["count", "mean", "min", "max"])
+    moments["m2"] = grouped.var(ddof=0) * moments["count"]
+    return moments
+
+
+def _merge_moments(acc: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """ Parallel (Chan et al.) merge of two count/mean/M2 tables, so batches can be combined exactly """
+    if acc is None:
+        return batch
+    acc, batch = acc.align(batch, join="outer")
+    n_a, n_b = acc["count"].fillna(0), batch["count"].fillna(0)
+    mean_a, mean_b = acc["mean"].fillna(0), batch["mean"].fillna(0)
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        merged = pd.DataFrame({
+            "count": n,
+            "mean": mean_a + delta * (n_b / n),
+            "min": np.fmin(acc["min"], batch["min"]),
+            "max": np.fmax(acc["max"], batch["max"]),
+            "m2": acc["m2"].fillna(0) + batch["m2"].fillna(0) + delta ** 2 * n_a * n_b / n,
+        })
+    return merged
+
+
+def _finalise(moments: pd.DataFrame, sigma: float) -> pd.DataFrame:
+    """ Adds std and the +/- sigma control limits """
+    if moments is None:
+        return pd.DataFrame()
+    result = moments.copy()
+    result["std"] = np.sqrt(result["m2"] / result["count"].where(result["count"] > 1))
+    result["lcl"] = result["mean"] - sigma * result["std"]
+    result["ucl"] = result["mean"] + sigma * result["std"]
+    return result.drop(columns="m2")
+
+
+# ---------------------------- analytics ----------------------------
+
+class FleetAnalytics:
+    """ Two streaming passes over the archive:
+        1. mergeable per group statistics (per axis/sensor_num, per production batch, per month)
+        2. outliers against the control limits from pass 1 (top N kept, so bounded)
+    """
+
+    def __init__(self, archive: pa_archive.ParquetArchive, batch_size: int = 65536, sigma: float = 3.0,
+                 max_outliers: int = 1000, mo: str = None, since_month: str = None):
+        self.archive = archive
+        self.batch_size = batch_size
+        self.sigma = sigma
+        self.max_outliers = max_outliers
+        self.mo = mo.upper() if mo else None
+        self.since_month = since_month
+
+    def _batches(self, dataset_name: str, columns: list[str]):
+        """ Yields pandas frames of at most batch_size rows (filters pushed down to the parquet scan) """
+        if not os.path.isdir(self.archive.dataset_dir(dataset_name)):
+            return
+        expression = None
+        if self.mo:
+            expression = pa_archive.ds.field("mo") == self.mo
+        if self.since_month:
+            condition = pa_archive.ds.field("month") >= self.since_month
+            expression = condition if expression is None else (expression & condition)
+        scanner = self.archive.dataset(dataset_name).scanner(columns=columns, filter=expression, batch_size=self.batch_size)
+        for record_batch in scanner.to_batches():
+            if record_batch.num_rows:
+                yield record_batch.to_pandas()
+
+    def calibration_statistics(self) -> dict:
+        """ Per axis/sensor_num distributions + production batch (run) and monthly drift """
+        per_sensor = {metric: None for metric in CALIBRATION_METRICS}
+        per_axis_acc = {metric: None for metric in CALIBRATION_METRICS}
+        per_run = {metric: None for metric in CALIBRATION_METRICS}
+        per_month = {metric: None for metric in CALIBRATION_METRICS}
+        rows = 0
+
+        columns = CALIBRATION_KEYS + CALIBRATION_METRICS + ["run_id", "month", "mo"]
+        for df in self._batches(pa_archive.CALIBRATION_DATASET, columns):
+            rows += len(df)
+            df["run_id"] = df["run_id"].fillna("unknown")
+            for metric in CALIBRATION_METRICS:
+                per_sensor[metric] = _merge_moments(per_sensor[metric], _batch_moments(df, CALIBRATION_KEYS, metric))
+                per_axis_acc[metric] = _merge_moments(per_axis_acc[metric], _batch_moments(df, ["axis"], metric))
+                per_run[metric] = _merge_moments(per_run[metric], _batch_moments(df, ["axis", "run_id"], metric))
+                per_month[metric] = _merge_moments(per_month[metric], _batch_moments(df, ["axis", "month"], metric))
+
+        stats = {metric: _finalise(per_sensor[metric], self.sigma) for metric in CALIBRATION_METRICS}
+        per_axis = {metric: _finalise(per_axis_acc[metric], self.sigma) for metric in CALIBRATION_METRICS}
+
+        drift = self._drift(per_run, per_axis, "run_id")
+        monthly = {metric: _finalise(per_month[metric], self.sigma) for metric in CALIBRATION_METRICS}
+        return {"rows": rows, "per_sensor_num": stats, "per_axis": per_axis, "run_drift": drift, "monthly": monthly}
+
+    def _drift(self, per_group: dict, per_axis: dict, level: str) -> pd.DataFrame:
+        """ Flags production batches whose mean sits outside mean +/- sigma * std / sqrt(n) of the fleet for that axis """
+        frames = []
+        for metric in CALIBRATION_METRICS:
+            groups = per_group[metric]
+            fleet = per_axis[metric]
+            if groups is None or fleet.empty:
+                continue
+            batch = groups.reset_index()
+            batch = batch.merge(fleet[["mean", "std"]].rename(columns={"mean": "fleet_mean", "std": "fleet_std"}),
+                                left_on="axis", right_index=True, how="left")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                batch["z"] = (batch["mean"] - batch["fleet_mean"]) / (batch["fleet_std"] / np.sqrt(batch["count"]))
+            batch["drifting"] = batch["z"].abs() > self.sigma
+            batch["metric"] = metric
+            frames.append(batch[["metric", "axis", level, "count", "mean", "fleet_mean", "z", "drifting"]])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def calibration_outliers(self, per_sensor_num: dict) -> pd.DataFrame:
+        """ Second pass: readings outside the per axis/sensor_num control limits, largest |z| first (max_outliers kept) """
+        outliers = None
+        columns = ["uid", "run_id", "timestamp"] + CALIBRATION_KEYS + CALIBRATION_METRICS
+        for df in self._batches(pa_archive.CALIBRATION_DATASET, columns):
+            for metric in CALIBRATION_METRICS:
+                limits = per_sensor_num[metric]
+                if limits.empty:
+                    continue
+                joined = df.join(limits[["mean", "std"]].rename(columns={"mean": "expected", "std": "std"}), on=CALIBRATION_KEYS)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    z = (joined[metric] - joined["expected"]) / joined["std"]
+                flagged = joined.loc[z.abs() > self.sigma, ["uid", "run_id", "timestamp", "axis", "sensor_num", metric, "expected"]]
+                if flagged.empty:
+                    continue
+                flagged = flagged.rename(columns={metric: "value"})
+                flagged["metric"] = metric
+                flagged["z"] = z[flagged.index]
+                outliers = flagged if outliers is None else pd.concat([outliers, flagged], ignore_index=True)
+                # keep memory bounded, only the worst max_outliers are ever held
+                if len(outliers) > self.max_outliers:
+                    outliers = outliers.loc[outliers["z"].abs().nlargest(self.max_outliers).index]
+        if outliers is None:
+            return pd.DataFrame()
+        return outliers.loc[outliers["z"].abs().sort_values(ascending=False).index].reset_index(drop=True)
+
+    def datalogger_statistics(self) -> dict:
+        """ Modbus / Geosense measurement distributions and monthly pass rates per test type """
+        per_type = {metric: None for metric in DATALOGGER_METRICS}
+        pass_counts = None
+        rows = 0
+        columns = ["test_type", "month", "overall_pass"] + DATALOGGER_METRICS
+        for df in self._batches(pa_archive.DATALOGGER_DATASET, columns):
+            rows += len(df)
+            df["test_type"] = df["test_type"].astype(str)
+            for metric in DATALOGGER_METRICS:
+                valid = df[df[metric].notna()]
+                if not valid.empty:
+                    per_type[metric] = _merge_moments(per_type[metric], _batch_moments(valid, ["test_type"], metric))
+            counts = df.groupby(["test_type", "month"])["overall_pass"].agg(["count", "sum"])
+            pass_counts = counts if pass_counts is None else pass_counts.add(counts, fill_value=0)
+
+        if pass_counts is not None:
+            pass_counts["pass_rate"] = pass_counts["sum"] / pass_counts["count"]
+            pass_counts = pass_counts.rename(columns={"sum": "passed"})
+        return {
+            "rows": rows,
+            "per_test_type": {metric: _finalise(per_type[metric], self.sigma) for metric in DATALOGGER_METRICS},
+            "pass_rates": pass_counts if pass_counts is not None else pd.DataFrame(),
+        }
+
+    def run(self, output_dir: str) -> str:
+        """ Runs everything and writes csvs + a json summary to output_dir
+
+        Returns:
+            str: path of the json summary
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        calibration = self.calibration_statistics()
+        outliers = self.calibration_outliers(calibration["per_sensor_num"])
+        datalogger = self.datalogger_statistics()
+
+        def write_csv(df: pd.DataFrame, name: str):
+            if df is None or df.empty:
+                return None
+            path = os.path.join(output_dir, f"fleet_{name}_{timestamp}.csv")
+            df.to_csv(path, index=not isinstance(df.index, pd.RangeIndex))
+            return os.path.basename(path)
+
+        files = {}
+        for metric in CALIBRATION_METRICS:
+            files[f"calibration_{metric}_per_sensor_num"] = write_csv(calibration["per_sensor_num"][metric], f"calibration_{metric}_per_sensor_num")
+            files[f"calibration_{metric}_monthly"] = write_csv(calibration["monthly"][metric], f"calibration_{metric}_monthly")
+        files["calibration_run_drift"] = write_csv(calibration["run_drift"], "calibration_run_drift")
+        files["calibration_outliers"] = write_csv(outliers, "calibration_outliers")
+        for metric in DATALOGGER_METRICS:
+            files[f"datalogger_{metric}"] = write_csv(datalogger["per_test_type"][metric], f"datalogger_{metric}")
+        files["datalogger_pass_rates"] = write_csv(datalogger["pass_rates"], "datalogger_pass_rates")
+
+        drift = calibration["run_drift"]
+        summary = {
+            "generated": datetime.datetime.now().isoformat(),
+            "filters": {"mo": self.mo, "since_month": self.since_month},
+            "sigma": self.sigma,
+            "calibration_rows": calibration["rows"],
+            "datalogger_rows": datalogger["rows"],
+            "per_axis": {
+                metric: calibration["per_axis"][metric].reset_index().to_dict(orient="records")
+                for metric in CALIBRATION_METRICS if not calibration["per_axis"][metric].empty
+            },
+            "drifting_runs": drift[drift["drifting"]].to_dict(orient="records") if not drift.empty else [],
+            "outlier_count": len(outliers),
+            "worst_outliers": outliers.head(20).to_dict(orient="records") if not outliers.empty else [],
+            "files": {key: value for key, value in files.items() if value},
+        }
+        summary_path = os.path.join(output_dir, f"fleet_summary_{timestamp}.json")
+        with open(summary_path, 'w') as json_file:
+            json.dump(summary, json_file, indent=4, default=str)
+        logging.info(f"Fleet summary ({calibration['rows']} calibration rows, {datalogger['rows']} datalogger rows) saved to {summary_path}")
+        return summary_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fleet calibration / datalogger statistics from the Parquet archive")
+    parser.add_argument("--root", default="production_runs", help="production_runs directory")
+    parser.add_argument("--archive-dir", help="Archive location (default <root>/_archive)")
+    parser.add_argument("--output", default=os.path.join("production_runs", "fleet_reports"), help="Where to write the summary")
+    parser.add_argument("--mo", help="Only this manufacturing order")
+    parser.add_argument("--since-month", help="Only months >= YYYY-MM")
+    parser.add_argument("--sigma", type=float, default=3.0, help="Control limit width in standard deviations")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Rows per streamed batch (memory bound)")
+    parser.add_argument("--max-outliers", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        archive = pa_archive.ParquetArchive(args.root, args.archive_dir)
+    except ImportError as e:
+        logging.error(str(e))
+        return 2
+
+    analytics = FleetAnalytics(archive, batch_size=args.batch_size, sigma=args.sigma, max_outliers=args.max_outliers,
+                               mo=args.mo, since_month=args.since_month)
+    analytics.run(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# ipx_logging.py
+# Logging setup for the IPX CLI: every record goes through a QueueHandler onto a queue, and a QueueListener
+# thread does the console / file writing, so the serial code never waits on terminal or disk I/O.
+# During a run the records are also written as JSON lines to a rotating per-run log next to the report.
+#
+#   ipx_logging.setup_logging(logging.INFO)               (instead of logging.basicConfig)
+#   run_log = ipx_logging.start_run_log(report.log_filepath)
+#   ...
+#   ipx_logging.stop_run_log(run_log)
+#
+#   python ipx_logging.py benchmark                        (logging overhead in the caller thread, per call)
+#
+# The run log is at INFO by default. At DEBUG every serial transaction logs its whole response, which costs
+# the serial thread a LogRecord per line, so only turn it up (Logging_settings.Run_log_level) to chase a problem.
+
+import argparse
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from IPX_Config import IPXCommands
+
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not "extra" fields
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: "_QueueListener | None" = None
+_console_handler: logging.Handler | None = None
+_run_logs: "RunLogRouter | None" = None
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per record: time, level, logger, thread, message, source location, extra fields, exception """
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items(): # logging.info("...", extra={"uid": uid}) fields
+            if key not in _STANDARD_ATTRIBUTES:
+                event[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            event["exception"] = record.exc_text
+        return json.dumps(event, default=str)
+
+
+# args of these types are copied when queued, as the caller may change them (e.g. a reused serial buffer)
+_MUTABLE_ARGS = (bytearray, list, dict, set)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """ QueueHandler that leaves the formatting to the listener thread, and keeps the exception separate from
+    the message (so the JSON log has it as a field) """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the root logger's only handler, so the record can be queued as it is: msg % args is done on the listener
+        # thread, only args that could change before then are snapshotted
+        args = record.args
+        if isinstance(args, tuple):
+            if any(isinstance(arg, _MUTABLE_ARGS) for arg in args):
+                record.args = tuple(copy.copy(arg) if isinstance(arg, _MUTABLE_ARGS) else arg for arg in args)
+        elif isinstance(args, dict): # logging.info("%(uid)s", {"uid": uid})
+            record.args = dict(args)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None # tracebacks hold frames alive
+        return record
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """ QueueListener that also answers flush_queue() markers (after everything queued before them is written) """
+
+    def handle(self, record: logging.LogRecord):
+        flush_event = getattr(record, "flush_event", None)
+        if flush_event is not None:
+            flush_event.set()
+            return
+        super().handle(record)
+
+
+class RunLogRouter(logging.Handler):
+    """ Sends records to the per-run log files that are currently open (runs on the listener thread)
+
+    Each run log belongs to the thread that started it. It gets that thread's records plus those of threads
+    that don't own a run log (report writer etc.), so runs on different ports (station daemon) stay apart.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.NOTSET)
+        self._handlers = [] # (handler, owner thread ident)
+        self._handlers_lock = threading.Lock()
+
+    def add(self, handler: logging.Handler, owner: int):
+        with self._handlers_lock:
+            self._handlers = self._handlers + [(handler, owner)]
+
+    def remove(self, handler: logging.Handler):
+        with self._handlers_lock:
+            self._handlers = [(existing, owner) for existing, owner in self._handlers if existing is not handler]
+
+    @property
+    def levels(self) -> list[int]:
+        return [handler.level for handler, _ in self._handlers]
+
+    def emit(self, record: logging.LogRecord):
+        handlers = self._handlers
+        owners = {owner for _, owner in handlers}
+        for handler, owner in handlers:
+            if record.levelno >= handler.level and (record.thread == owner or record.thread not in owners):
+                handler.handle(record)
+
+
+def setup_logging(level: int = logging.INFO, console_format: str = CONSOLE_FORMAT, stream=None) -> logging.handlers.QueueListener:
+    """ Sets the root logger up with the queue pipeline (replaces logging.basicConfig), safe to call again
+
+    Args:
+        level: console level (set_console_level() to change it later)
+        stream: console stream, default stderr
+    """
+    global _listener, _console_handler, _run_logs
+    if _listener is not None:
+        set_console_level(level)
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    _console_handler = logging.StreamHandler(stream)
+    _console_handler.setFormatter(logging.Formatter(console_format))
+    _console_handler.setLevel(level)
+    _run_logs = RunLogRouter()
+    _listener = _QueueListener(log_queue, _console_handler, _run_logs, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers): # like basicConfig(force=True), anything already there would write synchronously
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_QueueHandler(log_queue))
+    _listener.start()
+    atexit.unregister(shutdown_logging)
+    atexit.register(shutdown_logging)
+    _update_root_level()
+    return _listener
+
+
+def shutdown_logging():
+    """ Writes everything still queued, stops the listener thread and takes the queue handler off the root logger
+    (registered with atexit, setup_logging() can be called again afterwards) """
+    global _listener, _console_handler, _run_logs
+    if _listener is None:
+        return
+    _listener.stop() # processes everything still queued first
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    for handler in [_console_handler] + [handler for handler, _ in _run_logs._handlers]:
+        handler.close()
+    _listener = _console_handler = _run_logs = None
+
+
+def set_console_level(level: int):
+    """ Console verbosity (the run log files keep their own level) """
+    if _console_handler is None:
+        logging.getLogger().setLevel(level)
+        return
+    _console_handler.setLevel(level)
+    _update_root_level()
+
+
+def get_console_level() -> int:
+    return _console_handler.level if _console_handler is not None else logging.getLogger().level
+
+
+def set_console_stream(stream):
+    """ Points the console output somewhere else (live_view.py draws log lines above its table), returns the old stream """
+    if _console_handler is None:
+        return None
+    return _console_handler.setStream(stream) or stream # setStream returns None if it's the same stream
+
+
+def _update_root_level():
+    """ Root level is the lowest level anything wants, so disabled levels stay cheap (isEnabledFor is False) """
+    levels = [get_console_level()] + (_run_logs.levels if _run_logs else [])
+    logging.getLogger().setLevel(min(levels))
+
+
+def start_run_log(filepath: str, level: str | int = None, max_bytes: int = None, backup_count: int = None) -> logging.Handler | None:
+    """ Starts writing JSON lines to a rotating per-run log file
+
+    Returns:
+        handler to pass to stop_run_log(), or None if logging isn't set up / the file can't be opened
+    """
+    settings = IPXCommands.Logging_settings
+    if _run_logs is None:
+        logging.warning("Run log not started, call ipx_logging.setup_logging() first")
+        return None
+    try:
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            filepath, maxBytes=max_bytes or settings.Run_log_max_bytes,
+            backupCount=backup_count if backup_count is not None else settings.Run_log_backups,
+            encoding="utf-8", delay=True)
+    except OSError as e:
+        logging.error(f"Could not open run log {filepath}: {e}")
+        return None
+    handler.setLevel(level or settings.Run_log_level)
+    handler.setFormatter(JsonFormatter())
+    _run_logs.add(handler, owner=threading.get_ident())
+    _update_root_level()
+    logging.debug("Run log started: %s", filepath)
+    return handler
+
+
+def stop_run_log(handler: logging.Handler | None):
+    """ Stops and closes a run log started with start_run_log() (waits for its queued records first) """
+    if handler is None or _run_logs is None:
+        return
+    flush_queue()
+    _run_logs.remove(handler)
+    handler.close()
+    _update_root_level()
+
+
+def flush_queue(timeout: float = 5.0):
+    """ Waits for the listener to write everything queued so far """
+    if _listener is None:
+        return
+    done = threading.Event()
+    marker = logging.LogRecord("ipx_logging", logging.NOTSET, "", 0, "", None, None)
+    marker.flush_event = done
+    _listener.queue.put_nowait(marker)
+    done.wait(timeout)
+
+
+# ------------------------------ benchmark ------------------------------
+def _serial_transaction(lazy: bool, response: bytearray, lines: list[str]):
+    """ The logging one _send_and_receive_listen call does (command, every response line, whole response) """
+    if lazy:
+        logging.debug("Sent command: %s", "calibrate 12345678")
+        for line in lines:
+            logging.debug(line)
+        logging.debug("Received response: %s", response)
+    else:
+        logging.debug(f"Sent command: {'calibrate 12345678'}")
+        for line in lines:
+            logging.debug(line)
+        logging.debug(f"Received response: {response}")
+    logging.info("Calibration successful for UID 12345678")
+
+
+def _time_transactions(lazy: bool, transactions: int) -> float:
+    """ Mean caller thread time per transaction, in seconds """
+    lines = [f"{sensor_num},{1000 + sensor_num},{sensor_num % 7},{axis}" for sensor_num in range(32) for axis in ("x", "y")]
+    response = bytearray("\n".join(lines).encode("utf-8"))
+    start = time.perf_counter()
+    for _ in range(transactions):
+        _serial_transaction(lazy, response, lines)
+    return (time.perf_counter() - start) / transactions
+
+
+def benchmark(transactions: int = 2000, log_dir: str = None) -> list[dict]:
+    """ Times the logging of a calibration sized serial transaction under the old and new setups
+
+    Returns:
+        list of {'setup', 'per_transaction_us', 'share_of_250ms_listen_pct'}
+    """
+    import tempfile
+
+    log_dir = log_dir or tempfile.mkdtemp(prefix="ipx_logging_benchmark_")
+    os.makedirs(log_dir, exist_ok=True)
+    devnull = open(os.devnull, "w")
+    results = []
+
+    def record(name, seconds):
+        results.append({"setup": name, "per_transaction_us": round(seconds * 1e6, 1),
+                        "share_of_250ms_listen_pct": round(seconds / 0.25 * 100, 4)})
+
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        # old pipeline: basicConfig style synchronous handlers, eager f-strings
+        for level, debug_file in ((logging.INFO, False), (logging.DEBUG, True)):
+            shutdown_logging()
+            root.handlers = [logging.StreamHandler(devnull)]
+            if debug_file:
+                root.handlers.append(logging.FileHandler(os.path.join(log_dir, "sync_debug.log"), encoding="utf-8"))
+            for handler in root.handlers:
+                handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            root.setLevel(level)
+            record(f"sync handlers, eager f-strings, {logging.getLevelName(level)}", _time_transactions(False, transactions))
+            for handler in root.handlers:
+                handler.close()
+
+        # new pipeline: queue + listener thread, lazy formatting, with / without the JSON run log
+        for console_level, run_log_level in ((logging.INFO, None), (logging.INFO, "INFO"), (logging.INFO, "DEBUG"), (logging.DEBUG, "DEBUG")):
+            root.handlers = []
+            setup_logging(console_level, stream=devnull)
+            handler = start_run_log(os.path.join(log_dir, "run_log.jsonl"), level=run_log_level) if run_log_level else None
+            name = f"queue pipeline, lazy, console {logging.getLevelName(console_level)}" + (f" + {run_log_level} json run log" if run_log_level else "")
+            record(name, _time_transactions(True, transactions))
+            stop_run_log(handler)
+            shutdown_logging()
+    finally:
+        shutdown_logging()
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+        devnull.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPX logging pipeline tools")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    bench = subparsers.add_parser("benchmark", help="Logging overhead per serial transaction, old vs new setup")
+    bench.add_argument("--transactions", type=int, default=2000)
+    bench.add_argument("--log-dir", help="Where the benchmark log files go (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.transactions, args.log_dir)
+    print(f"{'setup':<64} {'us / transaction':>17} {'% of 250 ms listen':>19}")
+    for result in results:
+        print(f"{result['setup']:<64} {result['per_transaction_us']:>17.1f} {result['share_of_250ms_listen_pct']:>19.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
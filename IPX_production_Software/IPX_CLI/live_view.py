@@ -0,0 +1,432 @@
+# live_view.py
+# Live per-sensor progress table for configuration / verification runs. Rows are redrawn in place, instead of
+# clearing the terminal (os.system('cls') spawns a shell every time) or printing a block of lines per sensor.
+#
+#   view = live_view.LiveView("MO123 / STRING_A").start()      (in the workflow thread)
+#   live_view.add_sensors(uids_list)
+#   live_view.update(uid, stage="calibration", state="running", detail="attempt 2")
+#   with live_view.suspended():                               (around input() prompts)
+#       ...
+#   view.stop()
+#
+# update() only changes the row data. Drawing happens on another thread (ours or rich's), at most
+# Display_settings.Refresh_fps times a second, so the serial code never waits on a slow console.
+# Backends: rich (if installed), ansi (rewrites only the lines that changed), plain (one table at the end, when
+# the output isn't a terminal) and off. While the table is live, console log lines are printed above it.
+
+import importlib.util
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from IPX_Config import IPXCommands
+import ipx_logging
+
+
+FINAL_STATES = ("ok", "pass", "fail", "skipped", "error")
+STATE_COLOURS = {"running": "33", "ok": "32", "pass": "1;32", "fail": "1;31", "skipped": "35", "error": "1;31"} # ansi sgr codes
+STATE_STYLES = {"running": "yellow", "ok": "green", "pass": "bold green", "fail": "bold red", "skipped": "magenta", "error": "bold red"} # rich
+COLUMNS = [("UID", 11), ("Alias", 5), ("Stage", 15), ("State", 8), ("Stage t", 8), ("Total", 8),
+           ("Calibration", 14), ("Verification", 24), ("Detail", 18)]
+STATE_COLUMN = 3
+
+_local = threading.local() # the view of the workflow running in this thread
+_ansi_streams = {} # fileno -> whether escape codes work there
+
+
+def _is_terminal(stream) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _enable_ansi(stream) -> bool:
+    """ Escape codes work on every terminal except older Windows consoles, where VT processing has to be switched on """
+    if os.name != "nt":
+        return True
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, ValueError, OSError):
+        return False
+    if fileno not in _ansi_streams:
+        try:
+            import ctypes
+            import msvcrt
+            kernel32 = ctypes.windll.kernel32
+            handle = msvcrt.get_osfhandle(fileno)
+            mode = ctypes.c_uint32()
+            _ansi_streams[fileno] = bool(kernel32.GetConsoleMode(handle, ctypes.byref(mode))
+                                         and kernel32.SetConsoleMode(handle, mode.value | 0x0004)) # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        except (ImportError, AttributeError, OSError):
+            _ansi_streams[fileno] = False
+    return _ansi_streams[fileno]
+
+
+def _rich_available() -> bool:
+    """ rich is optional, only for the nicer table, find_spec checks for it without importing it """
+    return importlib.util.find_spec("rich") is not None
+
+
+def clear_screen(stream=None):
+    """ Clears the terminal with escape codes (no cls / clear subprocess), just starts a new line if it can't """
+    stream = stream or sys.stdout
+    if _is_terminal(stream) and _enable_ansi(stream):
+        stream.write("\x1b[2J\x1b[H")
+    else:
+        stream.write("\n")
+    stream.flush()
+
+
+def _seconds(value) -> str:
+    return "" if value is None else f"{value:.1f}s"
+
+
+class _LogWriter:
+    """ File-like console stream for the log handler while a view is live, hands complete lines to the backend """
+
+    def __init__(self, write_log):
+        self._write_log = write_log
+        self._buffer = ""
+
+    def write(self, text: str):
+        self._buffer += text
+        if "\n" in self._buffer:
+            complete, _, self._buffer = self._buffer.rpartition("\n")
+            self._write_log(complete + "\n")
+
+    def flush(self):
+        pass
+
+
+class _AnsiBackend:
+    """ Draws the table at the bottom of the terminal and rewrites only the lines that changed since the last frame """
+
+    def __init__(self, view: "LiveView"):
+        self.view = view
+        self.stream = view.stream
+        self._drawn = [] # lines currently on screen, the cursor is on the line below them
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._paused = False
+        self._thread = threading.Thread(target=self._run, name="live-view", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        with self._io_lock:
+            self._draw()
+            self._drawn = [] # leave the final table on screen
+
+    def pause(self):
+        with self._io_lock:
+            self._draw()
+            self._drawn = []
+            self._paused = True
+
+    def resume(self):
+        with self._io_lock:
+            self._paused = False
+
+    def write_log(self, text: str):
+        """ Log lines go where the table is, it is redrawn below them on the next frame """
+        with self._io_lock:
+            if self._drawn:
+                self.stream.write(f"\x1b[{len(self._drawn)}A\r\x1b[J")
+                self._drawn = []
+            self.stream.write(text)
+            self.stream.flush()
+
+    def _run(self):
+        interval = 1.0 / self.view.fps
+        while not self._stop.wait(interval):
+            with self._io_lock:
+                if not self._paused:
+                    self._draw()
+
+    def _draw(self):
+        size = shutil.get_terminal_size()
+        lines = self.view.text_lines(width=size.columns - 1, max_lines=size.lines - 2, colour=True)
+        drawn = len(self._drawn)
+        out = []
+        for index, line in enumerate(lines):
+            if index >= drawn:
+                out.append(f"{line}\x1b[K\n")
+            elif self._drawn[index] != line:
+                up = drawn - index
+                out.append(f"\x1b[{up}A\r{line}\x1b[K\x1b[{up}B\r")
+        if len(lines) < drawn: # fewer lines than last time (terminal resized), clear what's left over
+            up = drawn - len(lines)
+            out.append(f"\x1b[{up}A\r\x1b[J")
+        if out:
+            self.stream.write("".join(out))
+            self.stream.flush()
+        self._drawn = lines
+
+
+class _RichBackend:
+    """ rich.live.Live, refreshed by rich's own thread at the capped frame rate """
+
+    def __init__(self, view: "LiveView"):
+        from rich.console import Console
+        from rich.live import Live
+        self.console = Console(file=view.stream)
+        self.live = Live(get_renderable=view.rich_table, console=self.console, refresh_per_second=view.fps,
+                         transient=False, redirect_stdout=False, redirect_stderr=False)
+
+    def start(self):
+        self.live.start()
+
+    def stop(self):
+        self.live.stop()
+
+    def pause(self):
+        self.live.stop()
+
+    def resume(self):
+        self.live.start()
+
+    def write_log(self, text: str):
+        self.console.print(text.rstrip("\n"), markup=False, highlight=False, soft_wrap=True) # printed above the live table
+
+
+class _PlainBackend:
+    """ Output isn't a terminal (log file, pipe, ...): no redrawing, the table is printed once at the end """
+
+    def __init__(self, view: "LiveView"):
+        self.view = view
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.view.stream.write("\n".join(self.view.text_lines()) + "\n")
+        self.view.stream.flush()
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+
+class LiveView:
+    """ Per sensor progress rows: stage, state, stage / total time, calibration and verification results
+
+    Args:
+        title: shown above the table (e.g. MO / string)
+        mode: 'auto', 'rich', 'ansi', 'plain' or 'off', default Display_settings.Live_view
+        fps: max redraws per second, default Display_settings.Refresh_fps
+        stream: where to draw, default stderr (stdout is for batch result lines)
+    """
+
+    def __init__(self, title: str = "", mode: str = None, fps: float = None, stream=None):
+        self.title = title
+        self.stream = stream or sys.stderr
+        self.fps = fps or IPXCommands.Display_settings.Refresh_fps
+        self.mode = self._choose_mode(mode or IPXCommands.Display_settings.Live_view)
+        self._rows = {} # str(uid) -> row, in string order
+        self._rows_lock = threading.Lock()
+        self._backend = None
+        self._console_stream = None
+        self._start = time.perf_counter()
+
+    def _choose_mode(self, mode: str) -> str:
+        if mode == "off" or (mode == "auto" and threading.current_thread() is not threading.main_thread()):
+            return "off" # station daemon jobs run side by side in worker threads, they only log
+        if mode == "plain" or not _is_terminal(self.stream):
+            return "plain"
+        if mode in ("auto", "rich"):
+            if _rich_available():
+                return "rich"
+            if mode == "rich":
+                logging.warning("rich is not installed (pip install rich), using the plain terminal live view")
+        return "ansi" if _enable_ansi(self.stream) else "plain"
+
+    # ------------------------------ lifecycle ------------------------------
+    def start(self) -> "LiveView":
+        """ Starts drawing and makes this the current view for the calling thread (live_view.update() etc.) """
+        _local.view = self
+        if self.mode == "off":
+            return self
+        self._backend = {"rich": _RichBackend, "ansi": _AnsiBackend, "plain": _PlainBackend}[self.mode](self)
+        if self.mode != "plain":
+            self._console_stream = ipx_logging.set_console_stream(_LogWriter(self._backend.write_log))
+        self._backend.start()
+        return self
+
+    def stop(self):
+        """ Draws the final table and leaves it on screen, safe to call more than once """
+        if getattr(_local, "view", None) is self:
+            _local.view = None
+        backend, self._backend = self._backend, None
+        if backend is None:
+            return
+        if self._console_stream is not None:
+            ipx_logging.flush_queue() # log lines still queued go above the final table, not below it
+        backend.stop()
+        if self._console_stream is not None:
+            ipx_logging.set_console_stream(self._console_stream)
+            self._console_stream = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @contextmanager
+    def suspended(self):
+        """ Stops redrawing while the user is prompted, the table starts again below the prompt """
+        if self._backend is None:
+            yield
+            return
+        if self._console_stream is not None:
+            ipx_logging.flush_queue() # so what was logged before the prompt shows above it
+        self._backend.pause()
+        try:
+            yield
+        finally:
+            if self._backend is not None:
+                self._backend.resume()
+
+    # ------------------------------ row updates (any thread, no drawing) ------------------------------
+    def update(self, uid, **fields):
+        """ Updates (or adds) a sensor row, e.g. update(uid, stage="calibration", state="running", detail="attempt 1")
+
+        A new stage restarts the stage timer, a final state (ok, pass, fail, skipped, error) stops it.
+        """
+        now = time.perf_counter()
+        with self._rows_lock:
+            row = self._rows.get(str(uid))
+            if row is None:
+                row = self._rows[str(uid)] = {"uid": str(uid), "alias": "", "stage": "", "state": "waiting", "detail": "",
+                                              "calibration": "", "verification": "",
+                                              "_stage_start": None, "_stage_time": None, "_total": 0.0}
+            if "stage" in fields and fields["stage"] != row["stage"]:
+                self._stop_stage_timer(row, now)
+                row["_stage_start"], row["_stage_time"] = None, None
+                row["detail"] = ""
+            state = fields.get("state")
+            if state == "running" and row["_stage_start"] is None:
+                row["_stage_start"] = now
+            elif state in FINAL_STATES:
+                self._stop_stage_timer(row, now)
+            row.update({key: "" if value is None else str(value) for key, value in fields.items()})
+
+    @staticmethod
+    def _stop_stage_timer(row: dict, now: float):
+        if row["_stage_start"] is not None and row["_stage_time"] is None:
+            row["_stage_time"] = now - row["_stage_start"]
+            row["_total"] += row["_stage_time"]
+
+    def update_all(self, **fields):
+        with self._rows_lock:
+            uids = list(self._rows)
+        for uid in uids:
+            self.update(uid, **fields)
+
+    # ------------------------------ rendering ------------------------------
+    def cells(self) -> list[list[str]]:
+        """ Display cells per row, as of now """
+        now = time.perf_counter()
+        with self._rows_lock:
+            rows = [dict(row) for row in self._rows.values()]
+        cells = []
+        for row in rows:
+            running = row["_stage_start"] is not None and row["_stage_time"] is None
+            stage_time = now - row["_stage_start"] if running else row["_stage_time"]
+            total = row["_total"] + (stage_time if running else 0)
+            cells.append([row["uid"], row["alias"], row["stage"], row["state"], _seconds(stage_time),
+                          _seconds(total if total or running else None), row["calibration"], row["verification"], row["detail"]])
+        return cells
+
+    def footer(self, cells: list[list[str]] = None) -> str:
+        cells = self.cells() if cells is None else cells
+        states = [row[STATE_COLUMN] for row in cells]
+        counts = "  ".join(f"{state} {states.count(state)}" for state in ("running",) + FINAL_STATES if state in states)
+        return f"{len(cells)} sensors  {counts}  elapsed {time.perf_counter() - self._start:.0f}s"
+
+    def text_lines(self, width: int = None, max_lines: int = None, colour: bool = False) -> list[str]:
+        """ The table as text lines (ansi / plain backends), cut to the terminal width and height """
+        all_cells = cells = self.cells()
+        if max_lines is not None and len(cells) + 4 > max_lines: # keep the rows being worked on in view
+            fit = max(max_lines - 4, 1)
+            active = next((index for index, row in enumerate(cells) if row[STATE_COLUMN] not in FINAL_STATES), len(cells))
+            first = max(0, min(active, len(cells) - fit))
+            cells = cells[first:first + fit]
+        header = self._format_row([name for name, _ in COLUMNS], width)
+        rows = [self._format_row(row, width, colour) for row in cells]
+        return [self.title[:width], header, "-" * len(header)] + rows + [self.footer(all_cells)[:width]]
+
+    @staticmethod
+    def _format_row(cells: list[str], width: int = None, colour: bool = False) -> str:
+        line = " ".join(f"{str(cell)[:size]:<{size}}" for cell, (_, size) in zip(cells, COLUMNS))
+        if width is not None:
+            line = line[:width]
+        state_start = sum(size + 1 for _, size in COLUMNS[:STATE_COLUMN])
+        state_end = state_start + COLUMNS[STATE_COLUMN][1]
+        code = STATE_COLOURS.get(cells[STATE_COLUMN]) if colour else None
+        if code and len(line) >= state_end:
+            line = f"{line[:state_start]}\x1b[{code}m{line[state_start:state_end]}\x1b[0m{line[state_end:]}"
+        return line
+
+    def rich_table(self):
+        from rich import box
+        from rich.table import Table
+        from rich.text import Text
+
+        cells = self.cells()
+        table = Table(title=self.title, caption=self.footer(cells), box=box.SIMPLE_HEAD)
+        for name, _ in COLUMNS:
+            table.add_column(name, no_wrap=True)
+        for row in cells:
+            table.add_row(*(Text(cell, style=STATE_STYLES.get(cell, "") if index == STATE_COLUMN else "") for index, cell in enumerate(row)))
+        return table
+
+
+# ------------------------------ current view of this thread (no-ops when there isn't one) ------------------------------
+def current() -> LiveView | None:
+    return getattr(_local, "view", None)
+
+
+def active() -> bool:
+    """ True when a view is showing the per sensor results (so the per sensor summary blocks needn't be printed) """
+    view = current()
+    return view is not None and view.mode != "off"
+
+
+def add_sensors(uids, **fields):
+    view = current()
+    if view is not None:
+        for uid in uids:
+            view.update(uid, **fields)
+
+
+def update(uid, **fields):
+    view = current()
+    if view is not None:
+        view.update(uid, **fields)
+
+
+def update_all(**fields):
+    view = current()
+    if view is not None:
+        view.update_all(**fields)
+
+
+@contextmanager
+def suspended():
+    view = current()
+    if view is None:
+        yield
+        return
+    with view.suspended():
+        yield
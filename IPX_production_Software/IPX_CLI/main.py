@@ -1,23 +1,22 @@
 # main.py for command line interface 
 
+import argparse
 import logging
 import sys
-from IPX import IPXSerialCommunicator, IPXConfigurator, IPXSerialError
-
-from IPX_datalogger_tester import IPXModbusTester, IPXGeosenseTester
-
-import numpy as np
-import pandas as pd
 from IPX_Config import IPXCommands
-import os
 import time
 
 import Failure_handlers as fh
+import ipx_logging
+import live_view
 
-import os
 import platform
 
+# IPX_workflows imports pandas / plotly / pymodbus only when a workflow needs them, keep main.py free of them
+# too so the menu comes up straight away (check with startup_benchmark.py)
 import IPX_workflows
+import batch_cli
+import order_runner
 
 
 
@@ -26,13 +25,9 @@ import IPX_workflows
 
 
 # setup log level
-# Default is INFO
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-
+# Default is INFO, records are written by a listener thread (ipx_logging), so logging never blocks the serial code
+ipx_logging.setup_logging(logging.INFO)
 
-# import files for JSON report generation
-from report_generator import ReportGenerator
 
 # -----    CUSTOM ERRORS FOR USE IN THIS SCRIPT  -----
 class UserAbortError(Exception):
@@ -44,8 +39,23 @@ class UserAbortError(Exception):
 
 
 
-baudrate = int(input("Enter baud rate (default 115200): ") or "115200")
-com_port = input("Enter COM port (default COM5): ") or "COM5"
+# command line options, with no subcommand the interactive menu runs, otherwise see batch_cli.py
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="IPX configuration CLI")
+    parser.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                        help="cProfile each configuration run, saves a .pstats file next to the report")
+    batch_cli.add_subcommands(parser)
+    return parser
+
+
+# connection settings for the interactive menu, asked for at startup (not at import, so batch runs never block on them)
+baudrate = 115200
+com_port = "COM5"
+
+def prompt_connection_settings():
+    global baudrate, com_port
+    baudrate = int(input("Enter baud rate (default 115200): ") or "115200")
+    com_port = input("Enter COM port (default COM5): ") or "COM5"
 
 def get_baudrate():
     """Get current baudrate value.""" # i think this function is redundant now??? not sure tho
@@ -133,17 +143,17 @@ def set_baudrate(new_baudrate: int = None):
 
 def change_verbosity():
     print("\n----- Change Logging Verbosity ----")
-    print(f"Current log level: {logging.getLevelName(logging.getLogger().level)}")
+    print(f"Current log level: {logging.getLevelName(ipx_logging.get_console_level())}")
     print("[1] Info (Normal)")
     print("[2] Debug (Verbose)")
     while True:
         choice = input("Select log level (1 or 2): ").strip()
         if choice == '1':
-            logging.getLogger().setLevel(logging.INFO)
+            ipx_logging.set_console_level(logging.INFO)
             print("Log level set to INFO.")
             break
         elif choice == '2':
-            logging.getLogger().setLevel(logging.DEBUG)
+            ipx_logging.set_console_level(logging.DEBUG)
             print("Log level set to DEBUG.")
             print("Verbose mode enabled. Detailed logs will be shown.")
             break
@@ -159,7 +169,7 @@ def change_verbosity():
 
 
         
-def main_menu():
+def main_menu(profile: bool = False):
     while True:
         # Clear the terminal screen ('cls' for Windows, 'clear' for macOS/Linux)
         print("\n ----------------- Main Menu -----------------------------------")
@@ -176,17 +186,20 @@ def main_menu():
         print("6. Change Baud Rate")
         print("7. Change COM Port")
         print("8. Select verbosity level (DEBUG/INFO)")
+        print("9. Bulk UID remap from a CSV / build sheet order file")
+        print("10. Run every string of a build sheet order")
+        print("11. Resume an interrupted configuration run")
         print("Ctrl+C to exit")
-        choice = input("Enter your choice (1, 2, 3, 4, 5, 6, 7, 8):").strip()
+        choice = input("Enter your choice (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11):").strip()
     
 
         try:
             if choice == "cls":
-                os.system('cls' if os.name == 'nt' else 'clear')
+                live_view.clear_screen()
             elif choice == '1':
                 IPX_workflows.run_uid_update_flow(com_port, baudrate)
             elif choice == '2':
-                IPX_workflows.run_configuration_flow(com_port, baudrate)
+                IPX_workflows.run_configuration_flow(com_port, baudrate, profile=profile)
             elif choice == '3':
                 IPX_workflows.initial_uid_update(com_port, baudrate)
             elif choice == '4':
@@ -195,8 +208,16 @@ def main_menu():
             elif choice == '6': set_baudrate()  # prompt user to change baud rate
             elif choice == '7': set_com_port()  # prompt user to change COM port
             elif choice == '8': change_verbosity()  # change logging verbosity
+            elif choice == '9':
+                mapping_file = input("Mapping file (old_uid,new_uid CSV or order JSON): ").strip().strip('"')
+                string_name = input("String name (multi string order files only, Enter to skip): ").strip() or None
+                IPX_workflows.run_bulk_uid_remap_flow(com_port, baudrate, mapping_file, string_name=string_name)
+            elif choice == '10':
+                order_runner.run_order_flow(com_port, baudrate)
+            elif choice == '11':
+                IPX_workflows.resume_configuration_flow(com_port=com_port)
             else:
-                print("Invalid choice. Please enter 1, 2, 3, 4, 5, 6, 7, 8.")
+                print("Invalid choice. Please enter 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11.")
             time.sleep(1) # brief pause before returning to main menu
 
         except UserAbortError as e:
@@ -224,8 +245,13 @@ def main_menu():
 
 
 if __name__ == "__main__":
+    cli_args = build_parser().parse_args()
+    if cli_args.command is not None:
+        sys.exit(batch_cli.run(cli_args))
+
     try:
-        main_menu()
+        prompt_connection_settings()
+        main_menu(profile=getattr(cli_args, "profile", False))
     except KeyboardInterrupt:
         logging.info("Program terminated by user (Ctrl+C)")
     except Exception as e:
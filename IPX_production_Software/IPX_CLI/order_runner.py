@@ -0,0 +1,347 @@
+# order_runner.py
+# Runs a whole build sheet order: every string becomes a configuration job with its MO, string description and
+# sensor count filled in from the order (order_spec.py), so nothing is typed per string. Progress across the order
+# is logged after every string, and a roll-up report is kept up to date in production_runs/<MO>/.
+#
+#   main.py order --order generated_orders/HS2_order_data.json --mo MO123 --port COM5 --operator HS --wait
+#   main.py order --order generated_orders/ --port COM5 --operator HS --strings WSCT-XM01001,WSCT-XM01002
+#   menu option 10
+#
+# Running an order again carries on where it left off: strings that already passed in the roll-up are skipped
+# (--rerun to do them all again).
+
+import datetime
+import glob
+import json
+import logging
+import os
+import re
+import time
+
+import Failure_handlers as fh
+import batch_cli
+import order_spec
+import session_estimator
+
+
+ROLLUP_DIR = "production_runs"
+
+
+def find_config_report(mo: str, string_description: str, since: float = 0) -> str | None:
+    """ Newest config report written for the string since the given time (same folders as ReportGenerator) """
+    string_dir = re.sub(r'[^\w\-_.]', '_', str(string_description)).upper()
+    pattern = os.path.join(ROLLUP_DIR, str(mo).upper(), string_dir, "*_config_report.json")
+    reports = [path for path in glob.glob(pattern) if os.path.getmtime(path) >= since - 1]
+    return max(reports, key=os.path.getmtime) if reports else None
+
+
+def summarise_report(filepath: str) -> dict:
+    """ Sensor counts from a config report: detected, passed / failed verification, calibration skipped """
+    try:
+        with open(filepath, "r", encoding="utf-8") as file:
+            report = json.load(file)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read report {filepath} for the roll-up: {e}")
+        return {}
+    sensors = report.get("Sensors") or {}
+    results = []
+    for sensor in sensors.values():
+        verification = sensor.get("modbus_test_result") or sensor.get("geosense_measurement") or {}
+        results.append(verification.get("Overall_Pass", verification.get("pass")))
+    return {
+        "detected": len(report.get("metadata", {}).get("Detected UIDs") or []),
+        "passed": results.count(True),
+        "failed": results.count(False),
+        "calibration_skipped": sum(1 for sensor in sensors.values()
+                                   if (sensor.get("calibration_outcome") or {}).get("result") == "skipped"),
+    }
+
+
+def rollup_filepath(order: order_spec.OrderSpec) -> str:
+    order_id = re.sub(r'[^\w\-_.]', '_', str(order.id)).upper()
+    return os.path.join(ROLLUP_DIR, order.manufacturing_order.upper(), f"{order_id}_order_rollup.json")
+
+
+def load_rollup(order: order_spec.OrderSpec) -> dict | None:
+    filepath = rollup_filepath(order)
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable order roll-up {filepath}: {e}")
+        return None
+
+
+def _write_atomic(filepath: str, text: str):
+    """ Write to a temp file and rename, so an interrupted run never leaves half a roll-up """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    temp_path = filepath + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temp_path, filepath)
+
+
+class OrderProgress:
+    """ Per string results of an order run, the totals and the roll-up files """
+
+    def __init__(self, order: order_spec.OrderSpec, operator: str, port: str, previous: dict = None):
+        self.order = order
+        self.operator = operator
+        self.port = port
+        self.started = time.time()
+        previous_strings = {entry["string"].upper(): entry for entry in (previous or {}).get("strings", [])}
+        self.strings = [previous_strings.get(string.string_description.upper()) or
+                        {"string": string.string_description, "id": string.id, "expected_sensors": string.expected_sensors,
+                         "status": "not run", "exit_code": None}
+                        for string in order.strings]
+        self.run_durations = [] # durations of the strings run this session, for the estimate
+
+    def entry(self, string: order_spec.StringSpec) -> dict:
+        return next(entry for entry in self.strings if entry["string"].upper() == string.string_description.upper())
+
+    def record(self, string: order_spec.StringSpec, result: dict):
+        entry = self.entry(string)
+        entry.update({key: value for key, value in result.items() if key not in ("command", "port", "mo", "job", "cancelled")})
+        entry["finished_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+        if result.get("duration_s") is not None:
+            self.run_durations.append(result["duration_s"])
+
+    def totals(self) -> dict:
+        exit_codes = [entry["exit_code"] for entry in self.strings]
+        return {
+            "strings": len(self.strings),
+            "passed": exit_codes.count(batch_cli.EXIT_OK),
+            "with_test_failures": exit_codes.count(batch_cli.EXIT_TEST_FAILURES),
+            "aborted": exit_codes.count(batch_cli.EXIT_ABORTED),
+            "failed": exit_codes.count(batch_cli.EXIT_FAILED),
+            "not_run": exit_codes.count(None),
+            "sensors_expected": sum(entry["expected_sensors"] for entry in self.strings),
+            "sensors_passed": sum((entry.get("sensors") or {}).get("passed", 0) for entry in self.strings),
+            "sensors_failed": sum((entry.get("sensors") or {}).get("failed", 0) for entry in self.strings),
+            "duration_s": round(sum(entry.get("duration_s") or 0 for entry in self.strings), 1),
+        }
+
+    def remaining(self) -> list[dict]:
+        return [entry for entry in self.strings if entry["exit_code"] != batch_cli.EXIT_OK]
+
+    def progress_line(self) -> str:
+        totals = self.totals()
+        done = totals["strings"] - totals["not_run"]
+        line = (f"Order {self.order.manufacturing_order}: {done}/{totals['strings']} strings run, {totals['passed']} passed, "
+                f"{totals['with_test_failures']} with test failures, {totals['failed'] + totals['aborted']} failed/aborted")
+        if self.run_durations and totals["not_run"]:
+            estimate = sum(self.run_durations) / len(self.run_durations) * totals["not_run"]
+            line += f", about {estimate / 60:.0f} min left"
+        return line
+
+    def to_dict(self, status: str) -> dict:
+        order = self.order
+        return {
+            "order": {"id": order.id, "manufacturing_order": order.manufacturing_order, "customer_order": order.customer_order,
+                      "customer": order.customer, "project": order.project, "area_section": order.area_section,
+                      "sources": order.sources},
+            "operator": self.operator,
+            "port": self.port,
+            "status": status,
+            "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+            "totals": self.totals(),
+            "strings": self.strings,
+        }
+
+    def save(self, status: str) -> str:
+        """ Writes the json roll-up and a text table next to it, returns the json path """
+        filepath = rollup_filepath(self.order)
+        rollup = self.to_dict(status)
+        _write_atomic(filepath, json.dumps(rollup, indent=4, default=str))
+        _write_atomic(filepath.replace(".json", ".txt"), self.table(rollup))
+        return filepath
+
+    @staticmethod
+    def table(rollup: dict) -> str:
+        order, totals = rollup["order"], rollup["totals"]
+        lines = [f"Order {order['manufacturing_order']} ({order['id']})  {order.get('customer') or ''} {order.get('project') or ''}",
+                 f"Operator: {rollup['operator']}  Port: {rollup['port']}  Status: {rollup['status']}  Updated: {rollup['updated']}",
+                 "",
+                 f"{'String':<24} {'Sensors':>7} {'Passed':>6} {'Failed':>6} {'Time':>8}  Status"]
+        for entry in rollup["strings"]:
+            sensors = entry.get("sensors") or {}
+            duration = f"{entry['duration_s'] / 60:.1f}m" if entry.get("duration_s") is not None else ""
+            lines.append(f"{entry['string']:<24} {entry['expected_sensors']:>7} {sensors.get('passed', ''):>6} "
+                         f"{sensors.get('failed', ''):>6} {duration:>8}  {entry['status']}")
+        lines += ["",
+                  f"Strings: {totals['passed']}/{totals['strings']} passed, {totals['with_test_failures']} with test failures, "
+                  f"{totals['failed']} failed, {totals['aborted']} aborted, {totals['not_run']} not run",
+                  f"Sensors: {totals['sensors_passed']}/{totals['sensors_expected']} passed, {totals['sensors_failed']} failed",
+                  f"Total run time: {totals['duration_s'] / 60:.1f} min"]
+        return "\n".join(lines) + "\n"
+
+
+def plan_jobs(order: order_spec.OrderSpec, port: str, operator: str, strings: list[str] = None, **options) -> list[tuple]:
+    """ Configuration job per string, prefilled from the order
+
+    Args:
+        strings: only these strings (description or id), default all
+        options: any other configure job keys (baud, on_cal_failure, ...)
+    Returns:
+        [(StringSpec, job dict)], in order
+    Raises:
+        order_spec.OrderSpecError: unknown string names
+        batch_cli.JobFileError: invalid job options
+    """
+    selected = order.strings
+    if strings:
+        missing = [name for name in strings if order.find_string(name) is None]
+        if missing:
+            raise order_spec.OrderSpecError(f"Order {order.manufacturing_order} has no string(s) {', '.join(missing)}")
+        selected = [string for string in order.strings if any(order.find_string(name) is string for name in strings)]
+
+    jobs = []
+    for index, string in enumerate(selected, start=1):
+        job = {"port": port, "operator": operator, "mo": order.manufacturing_order,
+               "string": string.string_description, "sensors": string.expected_sensors, **options}
+        jobs.append((string, batch_cli.prepare_job("configure", job, index)))
+    return jobs
+
+
+def _wait_for_string(string: order_spec.StringSpec, position: str) -> str:
+    """ Operator connects the next string: 'run', 'skip' or 'stop' """
+    try:
+        answer = input(f"\n[{position}] Connect string {string.string_description} ({string.expected_sensors} sensors), "
+                       f"then press Enter to start (s = skip, q = stop the order): ").strip().lower()
+    except (KeyboardInterrupt, EOFError):
+        return "stop"
+    return {"s": "skip", "q": "stop"}.get(answer, "run")
+
+
+def run_order(order: order_spec.OrderSpec, jobs: list[tuple], operator: str, port: str, interactive: bool = True,
+              wait_for_operator: bool = True, stop_on_failure: bool = False, rerun: bool = False) -> dict:
+    """ Runs the planned jobs one string at a time, updating the roll-up after each
+
+    Args:
+        interactive: failures prompt the operator (menu), otherwise the job's failure policy answers (batch)
+        wait_for_operator: ask before each string, so the operator can connect it
+        rerun: run strings that already passed in an earlier run of this order too
+    Returns:
+        the roll-up dict (see OrderProgress.to_dict), with 'exit_code' (worst of the strings run) and 'path'
+    """
+    previous = None if rerun else load_rollup(order)
+    progress = OrderProgress(order, operator, port, previous)
+    to_run = [(string, job) for string, job in jobs
+              if rerun or progress.entry(string)["exit_code"] != batch_cli.EXIT_OK]
+    if len(to_run) < len(jobs):
+        logging.info(f"{len(jobs) - len(to_run)} string(s) already passed in an earlier run of this order, skipping them (--rerun to redo)")
+    logging.info(f"===== Order {order.manufacturing_order} ({order.id}): {len(to_run)} string(s) to run, "
+                 f"{sum(string.expected_sensors for string, _ in to_run)} sensors =====")
+    if to_run:
+        session_estimator.log_estimate([string.expected_sensors for string, _ in to_run], label=f"the {len(to_run)} string(s)")
+
+    status, exit_code = "complete", batch_cli.EXIT_OK
+    for number, (string, job) in enumerate(to_run, start=1):
+        position = f"{number}/{len(to_run)}"
+        if wait_for_operator:
+            choice = _wait_for_string(string, position)
+            if choice == "stop":
+                status = "stopped"
+                break
+            if choice == "skip":
+                logging.info(f"String {string.string_description} skipped by the operator")
+                continue
+
+        logging.info(f"===== String {position}: {string.string_description} ({string.expected_sensors} sensors) =====")
+        started = time.time()
+        result = batch_cli.run_job("configure", job, interactive=interactive)
+        result["duration_s"] = round(time.time() - started, 1)
+        report_path = find_config_report(order.manufacturing_order, string.string_description, since=started)
+        if report_path:
+            result["report"] = report_path
+            result["sensors"] = summarise_report(report_path)
+        progress.record(string, result)
+        exit_code = max(exit_code, result["exit_code"])
+        progress.save("in progress")
+        logging.info(progress.progress_line())
+
+        if result.get("cancelled"): # Ctrl+C stops the whole order, not just this string
+            logging.warning("Order stopped (Ctrl+C)")
+            status = "stopped"
+            break
+        if result["exit_code"] != batch_cli.EXIT_OK and stop_on_failure:
+            logging.warning("Stopping the order (stop on failure)")
+            status = "stopped"
+            break
+
+    if status == "complete" and progress.remaining():
+        status = "complete with failures" if progress.totals()["not_run"] == 0 else "incomplete"
+    path = progress.save(status)
+    rollup = progress.to_dict(status)
+    for line in OrderProgress.table(rollup).splitlines():
+        logging.info(line)
+    logging.info(f"Order roll-up saved to {path}")
+    rollup.update(exit_code=exit_code, path=path)
+    return rollup
+
+
+# ------------------------------ entry points ------------------------------
+def run_cli(args) -> int:
+    """ main.py order ... (batch_cli dispatches here), prints one json line per order, returns the exit code """
+    options = {key: getattr(args, key) for key in ("baud", "on_cal_failure", "on_error", "max_retries",
+                                                      "continue_without_check_sensor", "profile") if hasattr(args, key)}
+    try:
+        if not getattr(args, "port", None): # --port comes from the shared (SUPPRESSed) options, so argparse can't require it
+            raise batch_cli.JobFileError("missing --port")
+        orders = order_spec.load_orders(args.order, mo=getattr(args, "mo", None))
+        planned = [(order, plan_jobs(order, args.port, args.operator, strings=getattr(args, "strings", None), **options))
+                   for order in orders]
+    except (order_spec.OrderSpecError, batch_cli.JobFileError) as e:
+        logging.error(str(e))
+        print(json.dumps({"command": "order", "status": "usage error", "error": str(e), "exit_code": batch_cli.EXIT_USAGE}), flush=True)
+        return batch_cli.EXIT_USAGE
+
+    exit_code = batch_cli.EXIT_OK
+    for order, jobs in planned:
+        rollup = run_order(order, jobs, args.operator, args.port, interactive=False, wait_for_operator=getattr(args, "wait", False),
+                           stop_on_failure=getattr(args, "stop_on_failure", False), rerun=getattr(args, "rerun", False))
+        print(json.dumps({"command": "order", "mo": order.manufacturing_order, "order": order.id, "status": rollup["status"],
+                          "totals": rollup["totals"], "rollup": rollup["path"], "exit_code": rollup["exit_code"]}), flush=True)
+        exit_code = max(exit_code, rollup["exit_code"])
+        if rollup["status"] == "stopped":
+            break
+    return exit_code
+
+
+def run_order_flow(com_port, baudrate):
+    """ Menu: asks for the order file(s) and operator once, then runs every string of the order with prompts """
+    try:
+        paths = [path.strip().strip('"') for path in input("Order JSON file(s) or folder (comma separated): ").split(",") if path.strip()]
+        orders = order_spec.load_orders(paths)
+    except order_spec.OrderSpecError as e:
+        if "no manufacturing order" not in str(e):
+            logging.error(str(e))
+            return None
+        mo = input("This order has no MO, enter the Manufacturing Order (MO) number: ").strip()
+        try:
+            orders = order_spec.load_orders(paths, mo=mo)
+        except order_spec.OrderSpecError as e:
+            logging.error(str(e))
+            return None
+    except KeyboardInterrupt:
+        raise fh.UserCancelledError("Order run cancelled by user.")
+
+    for order in orders:
+        print(f"\nOrder {order.manufacturing_order} ({order.id}) {order.customer or ''} {order.project or ''}")
+        for string in order.strings:
+            print(f"   {string.string_description:<24} {string.expected_sensors:>3} sensors")
+    try:
+        operator = input("Enter Operator Name/ID: ").strip()
+    except KeyboardInterrupt:
+        raise fh.UserCancelledError("Order run cancelled by user.")
+
+    rollups = []
+    for order in orders:
+        jobs = plan_jobs(order, com_port, operator, baud=baudrate, continue_without_check_sensor=None)
+        rollup = run_order(order, jobs, operator, com_port, interactive=True, wait_for_operator=True)
+        rollups.append(rollup)
+        if rollup["status"] == "stopped":
+            break
+    return rollups
@@ -0,0 +1,200 @@
+# order_spec.py
+# Build sheet orders (the JSON files from form_website / gemini_form_v7) as dataclasses, same shape as the
+# OrderSpecSingleString / StringSpec ones in Sandbox/Build sheet input testing, but an order holds a list of strings.
+#
+# Formats read:
+#   single string  (form_website, MO001.json)          {id, manufacturing_order, customer_order, ..., string: {...}}
+#   multi string   (gemini_form_v7, HS2_order_data.json) {meta: {customer, project, area, ...}, strings: [{name, type, segments}]}
+# The multi string format has no MO, so it comes from meta.manufacturing_order / meta.mo or has to be given.
+# Several single string files of the same MO (one per string from form_website) are merged into one order.
+
+import glob
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional
+
+
+UID_KEYS = ("new_uid", "uid", "UID", "New UID") # optional per segment UID (uid_remap.py)
+
+
+class OrderSpecError(Exception):
+    """ Order file could not be read or is not a valid build sheet order """
+    pass
+
+
+@dataclass
+class SegmentSpec:
+    label: str
+    magnet_no: Optional[int] = None
+    length_m: Optional[float] = None
+    depth_m: Optional[float] = None
+    uid: Optional[str] = None # raw value as written in the file, checked by uid_remap
+
+
+@dataclass
+class BoxItem:
+    item: str
+    qty: int
+
+
+@dataclass
+class StringSpec:
+    id: str
+    string_description: str
+    expected_sensors: int
+    segments: List[SegmentSpec]
+    standard_or_slimline: Literal["Standard", "Slimline"] = "Standard"
+    connector_pairs: int = 0
+    connector_flying_lead: float = 0
+    total_cable_m: Optional[float] = None
+    cable_slack_mm: Optional[float] = None
+    box_contents: List[BoxItem] = field(default_factory=list)
+
+
+@dataclass
+class OrderSpec:
+    id: str
+    manufacturing_order: str
+    strings: List[StringSpec]
+    customer_order: Optional[str] = None
+    project: Optional[str] = None
+    area_section: Optional[str] = None
+    customer: Optional[str] = None
+    notes: Optional[str] = None
+    sources: List[str] = field(default_factory=list)
+
+    def find_string(self, name: str) -> StringSpec | None:
+        """ String by description or id (case insensitive) """
+        for string in self.strings:
+            if str(name).upper() in (string.string_description.upper(), str(string.id).upper()):
+                return string
+        return None
+
+
+def _segment_uid(segment: dict) -> str | None:
+    key = next((key for key in UID_KEYS if key in segment), None)
+    return None if key is None else segment[key]
+
+
+def _single_string_order(data: dict, filepath: str, mo: str = None) -> OrderSpec:
+    string = data["string"]
+    segments = [SegmentSpec(label=segment.get("label", f"segment {index}"), magnet_no=segment.get("magnet_no"),
+                            length_m=segment.get("length_m"), uid=_segment_uid(segment))
+                for index, segment in enumerate(string.get("segments", []), start=1)]
+    string_spec = StringSpec(
+        id=string.get("id", "STR1"),
+        string_description=string["string_description"],
+        expected_sensors=string.get("expected_sensors", len(segments)),
+        segments=segments,
+        standard_or_slimline=string.get("standard_or_slimline", "Standard"),
+        connector_pairs=string.get("connector_pairs", 0),
+        connector_flying_lead=string.get("connector_flying_lead", 0),
+        total_cable_m=string.get("total_cable_m"),
+        cable_slack_mm=string.get("cable_slack_mm"),
+        box_contents=[BoxItem(**item) for item in string.get("box_contents", [])],
+    )
+    return OrderSpec(
+        id=data.get("customer_order") or data.get("id") or os.path.splitext(os.path.basename(filepath))[0],
+        manufacturing_order=data.get("manufacturing_order") or mo,
+        strings=[string_spec],
+        customer_order=data.get("customer_order"),
+        project=data.get("project"),
+        area_section=data.get("area_section"),
+        customer=data.get("customer"),
+        notes=data.get("notes"),
+        sources=[filepath],
+    )
+
+
+def _multi_string_order(data: dict, filepath: str, mo: str = None) -> OrderSpec:
+    meta = data.get("meta", {})
+    strings = []
+    for index, string in enumerate(data["strings"], start=1):
+        segments = [SegmentSpec(label=segment.get("Label") or segment.get("label") or f"segment {number}",
+                                magnet_no=segment.get("Magnet #"), depth_m=segment.get("Depth (m)"), uid=_segment_uid(segment))
+                    for number, segment in enumerate(string.get("segments", []), start=1)]
+        strings.append(StringSpec(
+            id=f"STR{string.get('index', index - 1) + 1}",
+            string_description=string["name"],
+            expected_sensors=string.get("expected_sensors", len(segments)),
+            segments=segments,
+            standard_or_slimline=string.get("type", "Standard"),
+            connector_pairs=string.get("n_pairs", 0),
+            connector_flying_lead=string.get("fly_lead", 0),
+            cable_slack_mm=string.get("slack"),
+        ))
+    return OrderSpec(
+        id=meta.get("id") or os.path.splitext(os.path.basename(filepath))[0],
+        manufacturing_order=meta.get("manufacturing_order") or meta.get("mo") or mo,
+        strings=strings,
+        customer_order=meta.get("customer_order"),
+        project=meta.get("project"),
+        area_section=meta.get("area"),
+        customer=meta.get("customer"),
+        sources=[filepath],
+    )
+
+
+def load_order(filepath: str, mo: str = None, require_mo: bool = True) -> OrderSpec:
+    """ Reads one order JSON (either format)
+
+    Args:
+        mo: manufacturing order, used when the file doesn't have one (multi string files)
+        require_mo: False when only the strings are needed (uid_remap.py)
+    Raises:
+        OrderSpecError: if it can't be read, or has no MO / strings / valid sensor counts
+    """
+    try:
+        with open(filepath, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise OrderSpecError(f"Could not read order {filepath}: {e}")
+    try:
+        if isinstance(data, dict) and "strings" in data:
+            order = _multi_string_order(data, filepath, mo)
+        elif isinstance(data, dict) and "string" in data:
+            order = _single_string_order(data, filepath, mo)
+        else:
+            raise OrderSpecError(f"{filepath} is not a build sheet order (no 'string' or 'strings')")
+    except (KeyError, TypeError, ValueError) as e:
+        raise OrderSpecError(f"{filepath} is missing order fields: {e}")
+    _check_order(order, require_mo)
+    return order
+
+
+def _check_order(order: OrderSpec, require_mo: bool = True):
+    source = ", ".join(order.sources)
+    if require_mo and not order.manufacturing_order:
+        raise OrderSpecError(f"{source} has no manufacturing order, give one (--mo)")
+    if not order.strings:
+        raise OrderSpecError(f"{source} has no strings")
+    names = [string.string_description.upper() for string in order.strings]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise OrderSpecError(f"{source}: strings listed more than once: {', '.join(duplicates)}")
+    for string in order.strings:
+        if not isinstance(string.expected_sensors, int) or string.expected_sensors < 1:
+            raise OrderSpecError(f"{source}: string {string.string_description} has no valid expected_sensors")
+
+
+def load_orders(paths: list[str], mo: str = None, require_mo: bool = True) -> list[OrderSpec]:
+    """ Reads order files and directories of them (*.json), single string files of the same MO become one order """
+    filepaths = []
+    for path in paths:
+        filepaths += sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    if not filepaths:
+        raise OrderSpecError(f"No order files found in {', '.join(paths)}")
+
+    orders = {}
+    for filepath in filepaths:
+        order = load_order(filepath, mo, require_mo)
+        key = (order.manufacturing_order or order.id).upper()
+        if key not in orders:
+            orders[key] = order
+            continue
+        merged = orders[key] # another string of an order already loaded
+        merged.strings += order.strings
+        merged.sources += order.sources
+        _check_order(merged, require_mo)
+    return list(orders.values())
@@ -0,0 +1,463 @@
+# parquet_archive.py
+# Compacts the per-sensor calibration csvs and the per-run datalogger csvs under production_runs into two
+# partitioned Parquet datasets (hive style mo=<MO>/month=<YYYY-MM>), so fleet wide analysis reads a few column files
+# instead of tens of thousands of tiny csvs.
+#
+#   python parquet_archive.py archive                 (incremental, only new runs / csvs are added)
+#   python parquet_archive.py compact                 (rewrite every partition as a single file)
+#   python parquet_archive.py query calibration --uid 12345678 --axis 0
+#   python parquet_archive.py query datalogger --mo MO001 --month 2025-01 --test-type modbus
+#
+# A string's calibration csvs are overwritten by every run, so calibration rows are archived per run: each csv
+# belongs to the newest run report in its folder that calibrated the sensor, the time / run id / MO come from that
+# report, and rows already in the archive for a (run, uid) are never replaced. Run the archive after each day's runs,
+# a csv overwritten before it was archived is only archived for the run that wrote it last.
+#
+# Needs pyarrow (pip install pyarrow), which is only required for this tool.
+
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError: # optional, only this tool needs it
+    pa = None
+
+
+ARCHIVE_DIRNAME = "_archive"
+MANIFEST_FILENAME = "manifest.json"
+
+CALIBRATION_DATASET = "calibration"
+DATALOGGER_DATASET = "datalogger"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet archive, install it with 'pip install pyarrow'")
+
+
+def calibration_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("uid", pa.string()),
+        ("sensor_num", pa.int32()),
+        ("axis", pa.int8()),
+        ("mean", pa.int64()),
+        ("std_dev", pa.int64()),
+        ("run_id", pa.string()),
+        ("timestamp", pa.timestamp("s")),
+        ("string_description", pa.string()),
+        ("source_file", pa.dictionary(pa.int32(), pa.string())),
+        ("mo", pa.string()),
+        ("month", pa.string()),
+    ])
+
+
+def datalogger_schema():
+    """ Modbus and Geosense results normalised into one table, columns not used by a test type are null """
+    _require_pyarrow()
+    return pa.schema([
+        ("uid", pa.string()),
+        ("test_type", pa.dictionary(pa.int8(), pa.string())), # 'modbus' or 'geosense'
+        ("overall_pass", pa.bool_()),
+        ("alias", pa.int32()),
+        ("status_val", pa.float64()),
+        ("dist_mm", pa.float64()),
+        ("temp_c", pa.float64()),
+        ("volt_v", pa.float64()),
+        ("axis_a", pa.float64()),
+        ("axis_a_std", pa.float64()),
+        ("samples", pa.int32()),
+        ("errors", pa.string()),
+        ("run_id", pa.string()),
+        ("timestamp", pa.timestamp("s")),
+        ("string_description", pa.string()),
+        ("source_file", pa.dictionary(pa.int32(), pa.string())),
+        ("mo", pa.string()),
+        ("month", pa.string()),
+    ])
+
+
+PARTITION_COLUMNS = ["mo", "month"]
+
+
+# ---------------------------- reading the production_runs csvs ----------------------------
+
+def _run_id_for(mo: str, string_description: str, report_id: str):
+    return f"{mo}/{string_description}/{report_id}" if report_id else None
+
+
+def _read_run_report(path: str) -> dict:
+    """ What the calibration rows need from a *_config_report.json: run id, start time, MO, string, calibrated UIDs
+
+    Raises:
+        ValueError: if the report has no start time
+    """
+    with open(path, 'r', encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    metadata = report.get("metadata", {})
+    if not metadata.get("Start Time"):
+        raise ValueError("report has no Start Time")
+    start_time = datetime.datetime.fromisoformat(metadata["Start Time"]).replace(microsecond=0)
+    match = re.search(r"_(\d{8}_\d{6})_config_report\.json$", path)
+    report_id = metadata.get("Report ID") or (match.group(1) if match else start_time.strftime("%Y%m%d_%H%M%S"))
+    string_dir = os.path.dirname(path)
+    mo = metadata.get("MO number") or os.path.basename(os.path.dirname(string_dir))
+    string_description = metadata.get("String Description") or os.path.basename(string_dir)
+    sensors = report.get("Sensors", {})
+    # older reports have no calibration_outcome, every sensor in them was calibrated
+    calibrated = [uid for uid, data in sensors.items() if "calibration_outcome" in data] or list(sensors)
+    return {"run_id": _run_id_for(mo, string_description, report_id), "start_time": start_time, "mo": mo,
+            "string_description": string_description, "calibrated_uids": [str(uid) for uid in calibrated]}
+
+
+def _calibration_rows(path: str, run: dict) -> pd.DataFrame:
+    """ sensor_<uid>_calibration_data.csv of the run (from _read_run_report) -> typed rows """
+    uid = os.path.basename(path)[len("sensor_"):-len("_calibration_data.csv")]
+    df = pd.read_csv(path)
+    df["uid"] = uid
+    df["run_id"] = run["run_id"]
+    df["timestamp"] = run["start_time"]
+    df["string_description"] = run["string_description"]
+    df["source_file"] = path
+    df["mo"] = run["mo"]
+    df["month"] = run["start_time"].strftime("%Y-%m")
+    return df
+
+
+def _datalogger_rows(path: str, root: str) -> pd.DataFrame:
+    """ production_runs/<MO>/<STRING>/datalogger_test_results_<ts>.csv -> normalised rows (modbus or geosense layout) """
+    parts = os.path.relpath(path, root).split(os.sep)
+    mo, string_description = parts[0], parts[1]
+    report_id = re.search(r"datalogger_test_results_(\d{8}_\d{6})\.csv$", path).group(1) # same timestamp as the run report
+    run_time = datetime.datetime.strptime(report_id, "%Y%m%d_%H%M%S")
+
+    raw = pd.read_csv(path)
+    df = pd.DataFrame(index=raw.index)
+    if "Overall_Pass" in raw.columns: # modbus layout
+        df["uid"] = raw["UID"].astype(str)
+        df["test_type"] = "modbus"
+        df["overall_pass"] = raw["Overall_Pass"].astype(bool)
+        df["alias"] = pd.to_numeric(raw.get("Alias"), errors="coerce")
+        df["status_val"] = pd.to_numeric(raw.get("Status_Val"), errors="coerce")
+        df["dist_mm"] = pd.to_numeric(raw.get("Dist_mm"), errors="coerce")
+        df["temp_c"] = pd.to_numeric(raw.get("Temp_C"), errors="coerce")
+        df["volt_v"] = pd.to_numeric(raw.get("Volt_V"), errors="coerce")
+        df["errors"] = raw["Errors"].astype(str) if "Errors" in raw.columns else None
+    elif "axis_a" in raw.columns: # geosense layout
+        df["uid"] = raw["uid"].astype(str)
+        df["test_type"] = "geosense"
+        df["overall_pass"] = raw["pass"].astype(bool)
+        df["temp_c"] = pd.to_numeric(raw.get("temperature"), errors="coerce")
+        df["axis_a"] = pd.to_numeric(raw["axis_a"], errors="coerce")
+        if "axis_a_std" in raw.columns:
+            df["axis_a_std"] = pd.to_numeric(raw["axis_a_std"], errors="coerce")
+        if "samples" in raw.columns:
+            df["samples"] = pd.to_numeric(raw["samples"], errors="coerce")
+    else:
+        raise ValueError(f"Unrecognised datalogger csv layout: {list(raw.columns)}")
+
+    df["run_id"] = _run_id_for(mo, string_description, report_id)
+    df["timestamp"] = run_time
+    df["string_description"] = string_description
+    df["source_file"] = path
+    df["mo"] = mo
+    df["month"] = run_time.strftime("%Y-%m")
+    return df
+
+
+def _to_table(df: pd.DataFrame, schema) -> "pa.Table":
+    """ Builds a table with exactly the archive schema (missing columns are null) """
+    columns = []
+    for schema_field in schema:
+        if schema_field.name in df.columns:
+            values = df[schema_field.name]
+            values = values.astype(object).where(values.notna(), None) # NaN -> null for int / string columns
+            columns.append(pa.array(values.tolist(), type=schema_field.type))
+        else:
+            columns.append(pa.nulls(len(df), type=schema_field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# ---------------------------- archive ----------------------------
+
+class ParquetArchive:
+    """ Partitioned Parquet datasets + a manifest of what is already in them: the run reports whose calibration csvs
+    were read, and the datalogger csvs (mtime/size) """
+
+    SOURCES = {
+        CALIBRATION_DATASET: ("sensor_*_calibration_data.csv", _calibration_rows, calibration_schema),
+        DATALOGGER_DATASET: ("datalogger_test_results_*.csv", _datalogger_rows, datalogger_schema),
+    }
+
+    def __init__(self, root: str = "production_runs", archive_dir: str = None):
+        _require_pyarrow()
+        self.root = root
+        self.archive_dir = archive_dir or os.path.join(root, ARCHIVE_DIRNAME)
+        self.manifest_path = os.path.join(self.archive_dir, MANIFEST_FILENAME)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        manifest = {CALIBRATION_DATASET: {}, DATALOGGER_DATASET: {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as manifest_file:
+                manifest.update(json.load(manifest_file))
+        # calibration used to be tracked per csv path, those rows stay and are matched by (run_id, uid) from now on
+        manifest[CALIBRATION_DATASET] = {path: entry for path, entry in manifest[CALIBRATION_DATASET].items()
+                                         if path.endswith("_config_report.json")}
+        return manifest
+
+    def _save_manifest(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=4)
+        os.replace(tmp_path, self.manifest_path) # atomic, manifest always matches a complete set of part files
+
+    def dataset_dir(self, name: str) -> str:
+        return os.path.join(self.archive_dir, name)
+
+    def _partition_dir(self, name: str, mo: str, month: str) -> str:
+        return os.path.join(self.dataset_dir(name), f"mo={mo}", f"month={month}")
+
+    def _source_files(self, pattern: str) -> list[str]:
+        files = glob.glob(os.path.join(self.root, "*", "*", "**", pattern), recursive=True)
+        archive_prefix = os.path.abspath(self.archive_dir) + os.sep
+        return sorted(f for f in files if not os.path.abspath(f).startswith(archive_prefix))
+
+    def _drop_sources(self, name: str, part_files: set, sources: set):
+        """ Rewrites part files without the rows of sources that changed or disappeared (datalogger csvs only,
+        calibration rows are per run and never replaced) """
+        schema = self.SOURCES[name][2]()
+        for part_file in part_files:
+            if not os.path.exists(part_file):
+                continue
+            table = pq.read_table(part_file, schema=schema)
+            keep = pc.invert(pc.is_in(table["source_file"].cast(pa.string()), value_set=pa.array(sorted(sources))))
+            table = table.filter(keep)
+            if table.num_rows:
+                pq.write_table(table, part_file + ".tmp")
+                os.replace(part_file + ".tmp", part_file)
+            else:
+                os.remove(part_file)
+
+    def _write_parts(self, name: str, frames: list[pd.DataFrame]) -> tuple[int, dict]:
+        """ Writes new rows as one new part file per (mo, month) partition
+        Returns:
+            (rows written, {source_file: part file}) """
+        table = _to_table(pd.concat(frames, ignore_index=True), self.SOURCES[name][2]())
+        part_name = f"part-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        part_files = {}
+        for partition in table.select(PARTITION_COLUMNS).group_by(PARTITION_COLUMNS).aggregate([]).to_pylist():
+            mask = pc.and_(pc.equal(table["mo"], partition["mo"]),
+                                   pc.equal(table["month"], partition["month"]))
+            part_table = table.filter(mask)
+            part_dir = self._partition_dir(name, partition["mo"], partition["month"])
+            os.makedirs(part_dir, exist_ok=True)
+            part_file = os.path.join(part_dir, part_name)
+            pq.write_table(part_table.drop_columns(PARTITION_COLUMNS), part_file, compression="zstd")
+            for source in set(part_table["source_file"].cast(pa.string()).to_pylist()):
+                part_files[source] = part_file
+        return table.num_rows, part_files
+
+    def _archived_calibration_runs(self) -> set:
+        """ (run_id, uid) pairs already in the calibration dataset """
+        if not os.path.isdir(self.dataset_dir(CALIBRATION_DATASET)):
+            return set()
+        table = self.dataset(CALIBRATION_DATASET).to_table(columns=["run_id", "uid"])
+        return set(zip(table["run_id"].to_pylist(), table["uid"].to_pylist()))
+
+    def _update_calibration(self) -> dict:
+        """ Appends the calibration csvs of runs not archived yet. Each csv goes with the newest report in its folder
+        that calibrated the sensor, older runs' rows are left as they are """
+        known = self.manifest.setdefault(CALIBRATION_DATASET, {})
+        archived = self._archived_calibration_runs()
+        reports = glob.glob(os.path.join(self.root, "**", "*_config_report.json"), recursive=True)
+        archive_prefix = os.path.abspath(self.archive_dir) + os.sep
+        string_dirs = {}
+        for path in reports:
+            if not os.path.abspath(path).startswith(archive_prefix):
+                string_dirs.setdefault(os.path.dirname(path), []).append(path)
+
+        frames, new_reports, added, failed = [], {}, 0, 0
+        for string_dir, paths in string_dirs.items():
+            runs = []
+            for path in paths:
+                if path in known:
+                    runs.append((known[path]["start_time"], path, known[path]))
+                    continue
+                try:
+                    run = _read_run_report(path)
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Could not read run report {path}: {e}")
+                    failed += 1
+                    continue
+                runs.append((run["start_time"].isoformat(), path, run))
+            claimed = set() # uids whose csv belongs to a newer run
+            for _, path, run in sorted(runs, key=lambda item: item[0], reverse=True):
+                uids = [uid for uid in run["calibrated_uids"] if uid not in claimed]
+                claimed.update(run["calibrated_uids"])
+                if path in known:
+                    continue
+                for uid in uids:
+                    csv_path = os.path.join(string_dir, f"sensor_{uid}", f"sensor_{uid}_calibration_data.csv")
+                    if not os.path.exists(csv_path): # oldest runs wrote them straight into the string folder
+                        csv_path = os.path.join(string_dir, f"sensor_{uid}_calibration_data.csv")
+                    if (run["run_id"], uid) in archived or not os.path.exists(csv_path):
+                        continue
+                    try:
+                        frames.append(_calibration_rows(csv_path, run))
+                        added += 1
+                    except Exception as e:
+                        logging.warning(f"Could not archive {csv_path}: {e}")
+                        failed += 1
+                new_reports[path] = {"run_id": run["run_id"], "start_time": run["start_time"].isoformat(),
+                                     "calibrated_uids": run["calibrated_uids"]}
+
+        rows = self._write_parts(CALIBRATION_DATASET, frames)[0] if frames else 0
+        known.update(new_reports) # only once the rows are written
+        return {"added": added, "removed": 0, "failed": failed, "rows": rows}
+
+    def _update_datalogger(self) -> dict:
+        """ Appends new datalogger csvs, and replaces the rows of ones that changed or were deleted (one csv per run) """
+        pattern, read_rows, _ = self.SOURCES[DATALOGGER_DATASET]
+        known = self.manifest.setdefault(DATALOGGER_DATASET, {})
+        found = {path: os.stat(path) for path in self._source_files(pattern)}
+
+        stale = {path for path, entry in known.items()
+                 if path not in found or (entry["mtime"], entry["size"]) != (found[path].st_mtime, found[path].st_size)}
+        new = [path for path in found if path not in known or path in stale]
+
+        # remove the old rows of changed / deleted csvs first
+        if stale:
+            self._drop_sources(DATALOGGER_DATASET, {known[path]["part_file"] for path in stale}, stale)
+            for path in stale:
+                del known[path]
+
+        frames, failed = [], 0
+        for path in new:
+            try:
+                frames.append(read_rows(path, self.root))
+            except Exception as e:
+                logging.warning(f"Could not archive {path}: {e}")
+                failed += 1
+
+        rows = 0
+        if frames:
+            rows, part_files = self._write_parts(DATALOGGER_DATASET, frames)
+            for source, part_file in part_files.items():
+                stat = found[source]
+                known[source] = {"mtime": stat.st_mtime, "size": stat.st_size, "part_file": part_file}
+        return {"added": len(new) - failed, "removed": len(stale), "failed": failed, "rows": rows}
+
+    def update(self) -> dict:
+        """ Appends new runs' calibration csvs and new/changed datalogger csvs to the datasets
+        (one new part file per partition per update)
+
+        Returns:
+            dict: {dataset: {"added": n, "removed": n, "failed": n, "rows": n}}
+        """
+        summary = {CALIBRATION_DATASET: self._update_calibration(), DATALOGGER_DATASET: self._update_datalogger()}
+        self._save_manifest()
+        logging.info(f"Parquet archive updated: {summary}")
+        return summary
+
+    def compact(self):
+        """ Rewrites every partition as a single part file (incremental updates add one file per partition each time) """
+        for name, (_, _, schema_func) in self.SOURCES.items():
+            schema = schema_func()
+            data_schema = pa.schema([f for f in schema if f.name not in PARTITION_COLUMNS])
+            known = self.manifest.get(name, {})
+            part_dirs = {os.path.dirname(path) for path in
+                         glob.glob(os.path.join(self.dataset_dir(name), "mo=*", "month=*", "*.parquet"))}
+
+            for part_dir in sorted(part_dirs):
+                part_files = sorted(glob.glob(os.path.join(part_dir, "*.parquet")))
+                if len(part_files) <= 1:
+                    continue
+                table = pa.concat_tables([pq.read_table(f, schema=data_schema) for f in part_files])
+                compact_file = os.path.join(part_dir, f"part-compact-{uuid.uuid4().hex[:8]}.parquet")
+                pq.write_table(table, compact_file, compression="zstd")
+                for entry in known.values():
+                    if os.path.dirname(entry.get("part_file", "")) == part_dir:
+                        entry["part_file"] = compact_file
+                self._save_manifest()
+                for f in part_files:
+                    os.remove(f)
+                logging.info(f"Compacted {len(part_files)} files in {part_dir}")
+
+    def dataset(self, name: str) -> "ds.Dataset":
+        """ pyarrow dataset with hive partitioning, so mo/month filters skip whole directories """
+        schema = self.SOURCES[name][2]()
+        return ds.dataset(self.dataset_dir(name), format="parquet", schema=schema, partitioning="hive")
+
+    def query(self, name: str, columns: list[str] = None, uid: str = None, mo: str = None, month: str = None,
+              axis: int = None, test_type: str = None) -> pd.DataFrame:
+        """ Filtered read, filters are pushed down to partitions (mo/month) and parquet row group statistics """
+        if not os.path.isdir(self.dataset_dir(name)):
+            return pd.DataFrame()
+        expression = None
+        for column, value in (("uid", uid), ("mo", mo), ("month", month), ("axis", axis), ("test_type", test_type)):
+            if value is None:
+                continue
+            condition = ds.field(column) == value
+            expression = condition if expression is None else (expression & condition)
+        table = self.dataset(name).to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parquet archive of calibration and datalogger results")
+    parser.add_argument("--root", default="production_runs", help="production_runs directory")
+    parser.add_argument("--archive-dir", help=f"Archive location (default <root>/{ARCHIVE_DIRNAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("archive", help="Add new/changed csvs to the archive")
+    sub.add_parser("compact", help="Merge each partition into a single part file")
+    query = sub.add_parser("query", help="Filtered read of one dataset")
+    query.add_argument("dataset", choices=[CALIBRATION_DATASET, DATALOGGER_DATASET])
+    query.add_argument("--uid")
+    query.add_argument("--mo")
+    query.add_argument("--month", help="YYYY-MM")
+    query.add_argument("--axis", type=int)
+    query.add_argument("--test-type", choices=["modbus", "geosense"])
+    query.add_argument("--output", help="Write the result to this csv instead of printing it")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        archive = ParquetArchive(args.root, args.archive_dir)
+    except ImportError as e:
+        logging.error(str(e))
+        return 2
+
+    if args.command == "archive":
+        summary = archive.update()
+        return 1 if any(s["failed"] for s in summary.values()) else 0
+    if args.command == "compact":
+        archive.compact()
+        return 0
+
+    df = archive.query(args.dataset, uid=args.uid, mo=args.mo.upper() if args.mo else None, month=args.month,
+                       axis=args.axis, test_type=args.test_type)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        logging.info(f"Wrote {len(df)} rows to {args.output}")
+    else:
+        print(df.to_string(index=False) if not df.empty else "No results.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# render_plots.py
+# Renders the calibration plots after the run, from the stored sensor_<uid>_calibration_data.csv files,
+# so configuration runs can skip plotting completely (Report_settings.Plot_mode = 'none').
+# Rendering runs over a process pool, and outputs newer than their csv are skipped (cache).
+# Older runs are found too: csvs directly in the string folder (no sensor_<uid> folder) and CO/MO/STRING trees,
+# their plots are written next to the csv.
+#
+#   python render_plots.py --mo MO001                       (every string in the MO)
+#   python render_plots.py --mo MO001 --string STRING_A --uid 12345678
+#   python render_plots.py --mo MO001 --format png          (static images, needs kaleido)
+#   python render_plots.py --mo MO001 --format consolidated (one html per string, like the run report)
+
+import argparse
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+FORMATS = ["html", "png", "svg", "consolidated"]
+
+
+def _uid_of(csv_path: str) -> str:
+    return os.path.basename(csv_path)[len("sensor_"):-len("_calibration_data.csv")]
+
+
+def _string_dir_of(csv_path: str) -> str:
+    """ <STRING> folder of a csv, in sensor_<uid>/ or directly in it (older runs) """
+    folder = os.path.dirname(csv_path)
+    return os.path.dirname(folder) if os.path.basename(folder).startswith("sensor_") else folder
+
+
+def find_calibration_csvs(root: str = "production_runs", mo: str = None, string_description: str = None, uid: str = None) -> list[str]:
+    """ sensor_<uid>_calibration_data.csv files under root matching the filters, in any of the layouts:
+    <MO>/<STRING>/sensor_<uid>/, <MO>/<STRING>/ (older runs) or <CO>/<MO>/<STRING>/... """
+    csv_paths = []
+    for path in glob.glob(os.path.join(root, "**", f"sensor_{uid or '*'}_calibration_data.csv"), recursive=True):
+        string_dir = _string_dir_of(path)
+        if string_description and os.path.basename(string_dir) != string_description.upper():
+            continue
+        if mo and os.path.basename(os.path.dirname(string_dir)) != mo.upper():
+            continue
+        csv_paths.append(path)
+    return sorted(csv_paths)
+
+
+def _is_cached(outputs: list[str], sources: list[str]) -> bool:
+    """ True if every output exists and is newer than every source """
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    newest_source = max(os.path.getmtime(path) for path in sources)
+    return min(os.path.getmtime(path) for path in outputs) >= newest_source
+
+
+def _sensor_outputs(csv_path: str, fmt: str) -> list[str]:
+    folder = os.path.dirname(csv_path)
+    uid = _uid_of(csv_path)
+    return [os.path.join(folder, f"sensor_{uid}_calibration_means.{fmt}"),
+            os.path.join(folder, f"sensor_{uid}_calibration_stddevs.{fmt}")]
+
+
+def render_sensor(csv_path: str, fmt: str = "html", force: bool = False) -> tuple[str, str]:
+    """ Renders the mean + std dev figures for one sensor (runs in a worker process)
+
+    Returns:
+        tuple: (csv_path, 'rendered' | 'cached' | 'failed: <reason>')
+    """
+    outputs = _sensor_outputs(csv_path, fmt)
+    if not force and _is_cached(outputs, [csv_path]):
+        return csv_path, "cached"
+
+    try:
+        import pandas as pd
+        from report_generator import PlotManager
+
+        cal_df = pd.read_csv(csv_path)
+        uid = _uid_of(csv_path)
+        fig_mean, fig_std = PlotManager().create_calibration_plots(cal_df, uid)
+        for fig, output in zip((fig_mean, fig_std), outputs):
+            if fmt == "html":
+                fig.write_html(output)
+            else:
+                fig.write_image(output, format=fmt) # needs kaleido
+        return csv_path, "rendered"
+    except Exception as e:
+        return csv_path, f"failed: {e}"
+
+
+def render_string_report(string_dir: str, csv_paths: list[str], force: bool = False) -> tuple[str, str]:
+    """ One consolidated calibration html for all sensors in a production_runs/<MO>/<STRING> folder """
+    output = os.path.join(string_dir, f"{os.path.basename(string_dir)}_calibration_report.html")
+    if not force and _is_cached([output], csv_paths):
+        return string_dir, "cached"
+    try:
+        import pandas as pd
+        from report_generator import PlotManager
+
+        calibration_data = {
+            _uid_of(path): pd.read_csv(path) for path in csv_paths
+        }
+        parts = os.path.normpath(string_dir).split(os.sep)
+        title = f"{parts[-2]} / {parts[-1]} - Calibration Report" if len(parts) >= 2 else "Calibration Report"
+        PlotManager().save_consolidated_report(calibration_data, output, report_title=title)
+        return string_dir, "rendered" if os.path.exists(output) else "failed: not written (see log)"
+    except Exception as e:
+        return string_dir, f"failed: {e}"
+
+
+def render(csv_paths: list[str], fmt: str = "html", workers: int = None, force: bool = False) -> dict:
+    """ Renders all the csvs over a process pool
+
+    Returns:
+        dict: {'rendered': n, 'cached': n, 'failed': n}
+    """
+    counts = {"rendered": 0, "cached": 0, "failed": 0}
+    if fmt == "consolidated":
+        by_string = {}
+        for path in csv_paths:
+            by_string.setdefault(_string_dir_of(path), []).append(path)
+        jobs = [(render_string_report, (string_dir, paths, force)) for string_dir, paths in by_string.items()]
+    else:
+        jobs = [(render_sensor, (path, fmt, force)) for path in csv_paths]
+
+    if not jobs:
+        logging.warning("No calibration data found to render")
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *args) for func, args in jobs]
+        for future in as_completed(futures):
+            target, result = future.result()
+            if result.startswith("failed"):
+                counts["failed"] += 1
+                logging.error(f"Could not render {target}: {result}")
+            else:
+                counts[result] += 1
+                logging.debug(f"{target}: {result}")
+
+    logging.info(f"Plot rendering ({fmt}): {counts}")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render calibration plots from stored calibration data")
+    parser.add_argument("--root", default="production_runs", help="production_runs directory")
+    parser.add_argument("--mo", help="Manufacturing order")
+    parser.add_argument("--string", help="String description")
+    parser.add_argument("--uid", help="Single sensor UID")
+    parser.add_argument("--format", choices=FORMATS, default="html",
+                        help="html / png / svg per sensor (png/svg need kaleido), or one consolidated html per string")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: cpu count)")
+    parser.add_argument("--force", action="store_true", help="Re-render even if the output is newer than the data")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    csv_paths = find_calibration_csvs(args.root, args.mo, args.string, args.uid)
+    counts = render(csv_paths, fmt=args.format, workers=args.workers, force=args.force)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import cProfile
 import json
 import datetime
 import logging
@@ -5,10 +6,18 @@ import pandas as pd
 import numpy as np
 import os # for path and directory operations
 import re # for cleaning filename
+import platform
+from html import escape as html_escape
 
-# graph stuff
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from IPX_Config import IPXCommands
+from report_writer import BackgroundFileWriter, write_text_file, write_csv_file, append_binary_file
+from run_journal import RunJournal, journal_path_for
+from stage_timer import StageTimer
+
+# graph stuff, plotly is imported where the figures are made (only when plotting)
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 """ This file is for generating a json file to keep track of 
 IPX device configurations and settings during production"""
@@ -27,6 +36,10 @@ class CustomJSONEncoder(json.JSONEncoder):
         if isinstance(obj, np.ndarray):
             # convert numpy array to list
             return obj.tolist()
+
+        if isinstance(obj, np.generic):
+            # numpy scalars (np.int64, np.float64, np.bool_) to plain python values
+            return obj.item()
         return super().default(obj)
     
 
@@ -38,7 +51,7 @@ class PlotManager:
     """ Manages plotting of cal_df graphs using plotly
     Means and std dev graph combined"""
 
-    def create_calibration_plots(self, cal_df: pd.DataFrame, uid: int) -> tuple[go.Figure, go.Figure]:
+    def create_calibration_plots(self, cal_df: pd.DataFrame, uid: int) -> tuple["go.Figure", "go.Figure"]:
         """ Creates and saves calibration plots for a given sensor's calibration dataframe
         Creates two plots: one for mean and one for std dev
         Args:
@@ -47,6 +60,8 @@ class PlotManager:
         Returns:
         fig: Plotly figure object
         """
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
         try:
             # Create two separate figures, each with 3 subplots (one for each axis)
             fig_mean = make_subplots(
@@ -105,7 +120,54 @@ class PlotManager:
             return None, None
         
 
-    def save_plot(self, fig: go.Figure, filename: str, target_dir: str = None):
+    def _empty_subplot_figure_json(self, subplot_titles: tuple, title: str) -> dict:
+        """ Layout-only version of the calibration figures (same subplots/styling as create_calibration_plots)
+        Used by the consolidated report, which adds the data traces in the browser"""
+        from plotly.subplots import make_subplots
+        fig = make_subplots(rows=3, cols=1, subplot_titles=subplot_titles, vertical_spacing=0.1)
+        fig.update_layout(title=title, height=900, showlegend=True, template="plotly_white")
+        return json.loads(fig.to_json())["layout"]
+
+    def save_consolidated_report(self, calibration_data: dict, filepath: str, report_title: str = "Calibration Report"):
+        """ Saves one offline HTML for the whole run, instead of two full plotly HTML files per sensor
+        The plotly.js runtime is embedded once, each sensor's cal_df is stored as compact column arrays,
+        and the mean/std dev figures are only built in the browser when a sensor is selected.
+
+        Args:
+            calibration_data (dict): {uid: cal_df} for every calibrated sensor
+            filepath (str): Path of the HTML file to write
+            report_title (str): Heading shown at the top of the page
+        """
+        try:
+            from plotly.offline import get_plotlyjs # only needed here, full plotly.js bundle as a string
+
+            # column arrays per sensor, much smaller than full figure json
+            sensors = {
+                str(uid): {column: cal_df[column].tolist() for column in ("sensor_num", "mean", "std_dev", "axis")}
+                for uid, cal_df in calibration_data.items()
+            }
+            layouts = {
+                "mean": self._empty_subplot_figure_json(("X-Axis Mean", "Y-Axis Mean", "Z-Axis Mean"), "Calibration Means"),
+                "std_dev": self._empty_subplot_figure_json(("X-Axis Std Dev", "Y-Axis Std Dev", "Z-Axis Std Dev"), "Calibration Standard Deviations"),
+            }
+            payload = json.dumps({"sensors": sensors, "layouts": layouts}, separators=(",", ":"), cls=CustomJSONEncoder)
+            payload = payload.replace("</", "<\\/") # so the data can never close the script tag early
+
+            html = CONSOLIDATED_REPORT_TEMPLATE.format(
+                title=html_escape(report_title),
+                plotly_js=get_plotlyjs(),
+                payload=payload,
+            )
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(filepath, "w", encoding="utf-8") as html_file:
+                html_file.write(html)
+            logging.debug(f"Saved consolidated calibration report for {len(sensors)} sensors to {filepath}")
+        except Exception as e:
+            logging.error(f"Error saving consolidated calibration report {filepath}: {e}", exc_info=True)
+
+    def save_plot(self, fig: "go.Figure", filename: str, target_dir: str = None):
         """Saves a Plotly figure to an HTML file."""
 
         try:
@@ -119,6 +181,67 @@ class PlotManager:
 
 
 
+# Page for the consolidated calibration report, {payload} holds the per-sensor arrays + the empty subplot layouts
+# (double braces are literal braces for str.format)
+CONSOLIDATED_REPORT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Arial, Helvetica, sans-serif; margin: 20px; }}
+#sensor-select {{ font-size: 16px; padding: 4px; }}
+.plots {{ display: flex; flex-wrap: wrap; }}
+.plots > div {{ flex: 1 1 600px; }}
+</style>
+<script type="text/javascript">{plotly_js}</script>
+</head>
+<body>
+<h2>{title}</h2>
+<label for="sensor-select">Sensor UID: </label>
+<select id="sensor-select"></select>
+<div class="plots"><div id="plot-mean"></div><div id="plot-std"></div></div>
+<script type="text/javascript">
+var REPORT = {payload};
+
+function buildFigure(sensor, column, layoutKey, uid) {{
+    var traces = [];
+    for (var axis = 0; axis < 3; axis++) {{
+        var x = [], y = [];
+        for (var i = 0; i < sensor.axis.length; i++) {{
+            if (sensor.axis[i] === axis) {{ x.push(sensor.sensor_num[i]); y.push(sensor[column][i]); }}
+        }}
+        var suffix = axis === 0 ? "" : String(axis + 1);
+        traces.push({{type: "scatter", mode: "lines+markers", name: "Axis " + axis, x: x, y: y,
+                      xaxis: "x" + suffix, yaxis: "y" + suffix}});
+    }}
+    var layout = JSON.parse(JSON.stringify(REPORT.layouts[layoutKey]));
+    layout.title = {{text: "Sensor " + uid + " - " + (layout.title && layout.title.text ? layout.title.text : "")}};
+    return {{data: traces, layout: layout}};
+}}
+
+function showSensor(uid) {{
+    var sensor = REPORT.sensors[uid];
+    var mean = buildFigure(sensor, "mean", "mean", uid);
+    var std = buildFigure(sensor, "std_dev", "std_dev", uid);
+    Plotly.react("plot-mean", mean.data, mean.layout, {{responsive: true}});
+    Plotly.react("plot-std", std.data, std.layout, {{responsive: true}});
+}}
+
+var select = document.getElementById("sensor-select");
+Object.keys(REPORT.sensors).forEach(function (uid) {{
+    var option = document.createElement("option");
+    option.value = uid;
+    option.text = uid;
+    select.appendChild(option);
+}});
+select.addEventListener("change", function () {{ showSensor(select.value); }});
+if (select.options.length) {{ showSensor(select.options[0].value); }}
+</script>
+</body>
+</html>
+"""
+
 #--------------------------------- END OF PLOTTING CLASS ---------------------------------
 
 
@@ -129,8 +252,30 @@ class ReportGenerator:
     def __init__(self, port:str,
                  manufacturing_order: str,
                  string_description: str,
-                 operator:str):
-        self.start_time = datetime.datetime.now()
+                 operator:str,
+                 plot_mode: str = None,
+                 profile: bool = False,
+                 resume_journal: str = None):
+        """ Args:
+            plot_mode (str): 'consolidated' for one calibration HTML per run (default from Report_settings),
+                             'per_sensor' for the mean + std dev HTML files in every sensor folder,
+                             or 'none' to skip plotting during the run (render later with render_plots.py)
+            profile (bool): Run cProfile for the session, dumped as <report>_profile.pstats next to the report
+            resume_journal (str): journal of an interrupted run to carry on (session_checkpoint.py), the report
+                                  continues from it with the same files and timestamp
+        """
+        resumed_report = None
+        if resume_journal:
+            resumed_report, _, _ = RunJournal.replay(resume_journal)
+            self.start_time = datetime.datetime.fromisoformat(resumed_report["metadata"]["Start Time"])
+        else:
+            self.start_time = datetime.datetime.now()
+        self.stage_timer = StageTimer() # nested stage timings, saved in the report metadata
+        self.plot_mode = plot_mode or IPXCommands.Report_settings.Plot_mode
+        allowed_modes = ['consolidated', 'per_sensor', 'none']
+        if self.plot_mode not in allowed_modes:
+            raise ValueError(f"Invalid plot_mode '{self.plot_mode}'. Allowed modes are: {allowed_modes}")
+        self.calibration_data = {} # latest cal_df for each uid, used for the consolidated report
 
         # ------------------------------------
         self.port = port.upper()
@@ -167,12 +312,21 @@ class ReportGenerator:
         #5. create full final filepath for saving full report:
         self.json_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_config_report.json")
         self.txt_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_alias_uid_list.txt")
+        self.calibration_report_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_calibration_report.html")
+        self.profile_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_profile.pstats")
+        self.raw_samples_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_raw_samples.bin")
+        self._raw_samples_offset = 0 # bytes appended to raw_samples_filepath so far
+        self.log_filepath = os.path.join(self.target_dir, f"{sane_filename}_{timestamp_str}_run_log.jsonl") # ipx_logging.start_run_log()
         #-------- END FILESAVING LOGIC --------
 
 
         # Create an instance of PlotManager for saving plots
         self.plot_manager = PlotManager()
 
+        # All report files are written by a background thread, so disk I/O does not hold up the serial bus
+        # save_report() flushes (fsync) and closes it
+        self.writer = BackgroundFileWriter(max_pending=IPXCommands.Report_settings.Writer_queue_size)
+
 
 
 
@@ -186,18 +340,106 @@ class ReportGenerator:
                 "Start Time": self.start_time.isoformat(),
                 "Operator": self.operator,
                 "COM Port": self.port,
+                "Station": platform.node() or "unknown", # bench / pc the run was done on
+                "Run Log": os.path.basename(self.log_filepath),
                 "Status": "In Progress",
         },
         "Sensors" : {} # All sensor specific data will go in here, keyed by UID
         }
 
+        lost_raw_samples = []
+        if resumed_report is not None:
+            self.report_data = resumed_report
+            lost_raw_samples = self._load_resumed_files()
+
         # Need unique filename based on the metadata
         self.filename = f"{self.string_description}_config_report.json"
+
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        # Every change to report_data is also appended to a journal next to the report, so a crash mid-run
+        # can be recovered with run_journal.py. save_report() compacts it into the json and removes it.
+        self.journal_filepath = journal_path_for(self.json_filepath)
+        try:
+            self.journal = RunJournal(self.journal_filepath,
+                                      encoder=CustomJSONEncoder,
+                                      fsync_every=IPXCommands.Report_settings.Journal_fsync_every,
+                                      fsync_interval_s=IPXCommands.Report_settings.Journal_fsync_interval_s)
+            if resumed_report is None:
+                self.journal.append("init", report_path=self.json_filepath, report=self.report_data)
+        except Exception as e:
+            logging.error(f"Could not start run journal {self.journal_filepath}, report will only be saved at the end: {e}")
+            self.journal = None
+        for uid_str, data_key in lost_raw_samples: # journaled, so the references are gone from the report too
+            self.add_sensor_data(uid=uid_str, data_key=data_key, data_value=None)
+        if resumed_report is not None:
+            self.add_metadata("Resumed", self.report_data["metadata"].get("Resumed", []) + [datetime.datetime.now().isoformat()])
+
+    def _load_resumed_files(self) -> list[tuple[str, str]]:
+        """ Picks up what an interrupted run already wrote: where the raw samples file ends, and the calibration
+        data of the sensors done so far (for the consolidated report)
+
+        Raw sample references in the journal can point past the end of the file (appends still queued when the
+        run stopped). Those samples are lost, new appends carry on from the end of the file.
+
+        Returns:
+            list: (uid, data_key) of the raw sample references that point past the end of the file
+        """
+        raw_file = os.path.basename(self.raw_samples_filepath)
+        file_size = os.path.getsize(self.raw_samples_filepath) if os.path.exists(self.raw_samples_filepath) else 0
+        lost = []
+        for uid_str, sensor in self.report_data["Sensors"].items():
+            for data_key, value in sensor.items():
+                if not (isinstance(value, dict) and value.get("file") == raw_file):
+                    continue
+                end = value["offset"] + value["count"] * np.dtype(value["dtype"]).itemsize
+                if end > file_size:
+                    lost.append((uid_str, data_key))
+        if lost:
+            logging.warning(f"Raw samples of UID(s) {', '.join(uid for uid, _ in lost)} were not written before the run stopped, "
+                            f"their references are removed")
+        self._raw_samples_offset = file_size
+        for uid_str in self.report_data["Sensors"]:
+            csv_filepath = os.path.join(self.target_dir, f"sensor_{uid_str}", f"sensor_{uid_str}_calibration_data.csv")
+            if not os.path.exists(csv_filepath):
+                continue
+            try:
+                self.calibration_data[uid_str] = pd.read_csv(csv_filepath)
+            except Exception as e:
+                logging.warning(f"Could not reload calibration data for UID {uid_str}, it will be missing from the calibration report: {e}")
+        return lost
+
+    def _journal(self, event: str, **fields):
+        """ Appends an event to the run journal, a failed append is logged but never stops the run """
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(event, **fields)
+        except TypeError as e:
+            logging.error(f"Could not journal {event} {fields.get('key')}, check data types: {e}")
+        except Exception as e:
+            logging.error(f"Run journal write failed: {e}")
     
     def set_detected_sensors(self, uids: list[str]):
         """ Adds list of detected UIDs to metadata section of report
         These will be the initial UIDs detected at start of configuration session"""
         self.report_data["metadata"]["Detected UIDs"] = uids
+        self._journal("metadata", key="Detected UIDs", value=uids)
+
+    def add_metadata(self, data_key: str, data_value):
+        """ Adds a run level piece of data (like bus metrics) to the metadata section of the report
+
+        Args:
+        data_key (str): Key/name of the data to add (e.g. 'Modbus Bus Metrics')
+        data_value: The actual data value to store
+        """
+        self.report_data["metadata"][data_key] = data_value
+        self._journal("metadata", key=data_key, value=data_value)
+        logging.debug(f"Added metadata: {data_key} = {data_value}")
+        return True
 
     def add_sensor_data(self, uid: int, data_key: str, data_value):
         """ Adds specific piece of data (like 'final status' or 'calibration data'
@@ -216,6 +458,7 @@ class ReportGenerator:
             self.report_data["Sensors"][uid_str] = {}
 
         self.report_data["Sensors"][uid_str][data_key] = data_value
+        self._journal("sensor", uid=uid_str, key=data_key, value=data_value)
         logging.debug(f"Added data for UID {uid_str}: {data_key} = {data_value}")
         
         # If this is status data, also save it as a separate text file in sensor folder
@@ -224,6 +467,57 @@ class ReportGenerator:
         
         return True # for use in retry loops, if exception occurs, we wont get to here and it will not return ture
     
+    def stop_profiling(self) -> bool:
+        """ Stops the cProfile run (if profiling) and dumps the stats next to the report
+        Open with: python -m pstats <file>, or snakeviz
+
+        Returns:
+            bool: True if a profile was written
+        """
+        if self.profiler is None:
+            return False
+        self.profiler.disable()
+        try:
+            self.profiler.dump_stats(self.profile_filepath)
+            logging.info(f"Profile saved to {self.profile_filepath}")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to save profile {self.profile_filepath}: {e}")
+            return False
+        finally:
+            self.profiler = None
+
+    def add_raw_sample(self, uid: int, raw_values, data_key: str = 'raw_data_sample'):
+        """ Appends a raw data array to the run's binary raw samples file, and stores a reference to it
+        in the sensor's section of the report (instead of the stringified list)
+
+        Reference format: {"file": <bin filename>, "dtype": "<i4", "offset": <bytes>, "count": <values>, "shape": [...]}
+        Load it back with load_raw_sample()
+
+        Args:
+        uid (int): UID of the sensor
+        raw_values (array like): Raw data from ipx.get_raw(), ints
+        data_key (str): Key to store the reference under
+        """
+        values = np.asarray(raw_values)
+        # int32 covers the raw readings, only go to int64 if something does not fit
+        if values.size and (values.min() < np.iinfo(np.int32).min or values.max() > np.iinfo(np.int32).max):
+            values = values.astype('<i8')
+        else:
+            values = values.astype('<i4')
+
+        reference = {
+            "file": os.path.basename(self.raw_samples_filepath),
+            "dtype": values.dtype.str,
+            "offset": self._raw_samples_offset,
+            "count": int(values.size),
+            "shape": list(values.shape),
+        }
+        # offset is worked out here, the single writer thread keeps the appends in the same order
+        self._raw_samples_offset += values.nbytes
+        self.writer.submit(self.raw_samples_filepath, append_binary_file, self.raw_samples_filepath, values.tobytes())
+        return self.add_sensor_data(uid=uid, data_key=data_key, data_value=reference)
+
     def _save_status_txt_file(self, uid: int, status_dict: dict):
         """Saves sensor status as a text file in the sensor-specific folder."""
         uid_str = str(uid)
@@ -232,16 +526,14 @@ class ReportGenerator:
         try:
             os.makedirs(sensor_folder, exist_ok=True)
             status_filepath = os.path.join(sensor_folder, f"sensor_{uid_str}_status.txt")
-            
-            with open(status_filepath, 'w') as f:
-                f.write(f"Sensor UID: {uid_str}\n")
-                f.write(f"Status Report\n")
-                f.write("=" * 50 + "\n\n")
-                
-                for key, value in status_dict.items():
-                    f.write(f"{key}: {value}\n")
-            
-            logging.debug(f"Saved status text file for UID {uid_str} to {status_filepath}")
+
+            # build the content now (snapshot of status_dict), write it in the background
+            lines = [f"Sensor UID: {uid_str}\n", f"Status Report\n", "=" * 50 + "\n\n"]
+            for key, value in status_dict.items():
+                lines.append(f"{key}: {value}\n")
+
+            self.writer.submit(status_filepath, write_text_file, status_filepath, "".join(lines))
+            logging.debug(f"Queued status text file for UID {uid_str} to {status_filepath}")
         except Exception as e:
             logging.error(f"Error saving status text file for UID {uid_str}: {e}", exc_info=True)
 
@@ -253,22 +545,73 @@ class ReportGenerator:
         final_status (str): Overall status of the configuration session ('Success', 'Partial Success', 'Failure')
         """
 
-        self.report_data["metadata"]["status"] = final_status # set final status
         end_time = datetime.datetime.now() # final time
         duration = (end_time - self.start_time).total_seconds() # get duration of configuration
 
-        self.report_data["metadata"]["End Time"] = end_time.isoformat()
-        self.report_data["metadata"]["Duration (seconds)"] = duration # save parameters
+        # save parameters
+        final_metadata = {"status": final_status, "End Time": end_time.isoformat(), "Duration (seconds)": duration}
+        final_metadata["Stage Timings"] = self.stage_timer.to_dict()
+        self.stage_timer.log_summary()
+        if self.stop_profiling():
+            final_metadata["Profile"] = os.path.basename(self.profile_filepath)
+
+        # one calibration html for the whole run
+        if self.plot_mode == 'consolidated' and self.calibration_data:
+            self.writer.submit(
+                self.calibration_report_filepath,
+                self.plot_manager.save_consolidated_report,
+                dict(self.calibration_data),
+                self.calibration_report_filepath,
+                report_title=f"{self.manufacturing_order} / {self.string_description} - Calibration Report",
+            )
+            final_metadata["Calibration Report"] = os.path.basename(self.calibration_report_filepath)
+
+        for key, value in final_metadata.items():
+            self.report_data["metadata"][key] = value
+            self._journal("metadata", key=key, value=value)
+
+        # Compact the journal into the normal report layout (falls back to the in memory copy without a journal)
+        report_data = self.report_data
+        if self.journal is not None:
+            try:
+                self.journal.sync()
+                report_data, _, _ = RunJournal.replay(self.journal_filepath)
+            except Exception as e:
+                logging.error(f"Could not compact run journal, saving in memory report instead: {e}")
+                report_data = self.report_data
+
         # Save to JSON file using the full filepath (includes CO/MO directory structure)
         try:
-            with open(self.json_filepath, 'w') as json_file:
-                json.dump(self.report_data, json_file, indent=4, cls=CustomJSONEncoder)# json.dump basically writes the data to file
-            logging.info(f"Configuration report saved to {self.json_filepath}")
-        except IOError as e:
-            logging.error(f"Failed to save configuration report: {e}")
+            json_content = json.dumps(report_data, indent=4, cls=CustomJSONEncoder) # serialise now, so the report is a snapshot
+            self.writer.submit(self.json_filepath, write_text_file, self.json_filepath, json_content)
         except TypeError as e:
             logging.error(f"Failed to serialize report data to JSON. Check Data types: {e}")
 
+        # block until every queued report file is written and fsynced, then stop the writer thread
+        errors_before = len(self.writer.errors)
+        self.writer.close()
+        failed_files = [path for paths, _ in self.writer.errors[errors_before:] for path in paths]
+        if self.json_filepath in failed_files:
+            logging.error(f"Failed to save configuration report: {self.json_filepath}")
+        elif os.path.exists(self.json_filepath):
+            logging.info(f"Configuration report saved to {self.json_filepath}")
+            if self.journal is not None:
+                self.journal.remove() # report is on disk, journal no longer needed
+                self.journal = None
+            return
+
+        # report not saved, keep the journal so the run can be recovered
+        if self.journal is not None:
+            self.journal.close()
+            logging.warning(f"Run journal kept for recovery: {self.journal_filepath}")
+
+    def close(self):
+        """ Writes whatever is still queued, stops the writer thread and closes the journal file. The journal stays
+        on disk so an unfinished run can be resumed / recovered. Nothing to do after save_report() """
+        self.writer.close()
+        if self.journal is not None:
+            self.journal.close()
+
 
     # create a function to get the txt file ready, and then another function to save
     def create_txt_content(self, aliases_and_uids_list: list[tuple[str, str]], inserts:bool = False):
@@ -308,9 +651,8 @@ class ReportGenerator:
         logging.debug(" Saving txt file with aliases and UIDs")
         content_to_save = txt_content # get the content to save
         try:
-            with open(self.txt_filepath, 'w') as txt_file:
-                txt_file.write(content_to_save)
-                logging.debug(f"Alias and UID list saved to {self.txt_filepath}")
+            self.writer.submit(self.txt_filepath, write_text_file, self.txt_filepath, content_to_save)
+            logging.debug(f"Alias and UID list queued for {self.txt_filepath}")
         except Exception as e:
             logging.error(f"Error saving txt file: {e}")
 
@@ -338,12 +680,21 @@ class ReportGenerator:
         try:
             csv_filename = f"sensor_{uid_str}_calibration_data.csv"
             csv_filepath = os.path.join(sensor_folder, csv_filename)
-            cal_df.to_csv(csv_filepath, index=False)
-            logging.debug(f"Saved calibration data for UID {uid_str} to {csv_filepath}")
+            self.writer.submit(csv_filepath, write_csv_file, csv_filepath, cal_df.copy())
+            logging.debug(f"Queued calibration data for UID {uid_str} to {csv_filepath}")
         except Exception as e:
             logging.error(f"Error saving calibration CSV for UID {uid_str}: {e}", exc_info=True)
 
-        #3. Generate and save plots using plotmanager class in sensor folder
+        #3. Keep the data for the consolidated report (written once in save_report),
+        # or generate and save plots using plotmanager class in sensor folder
+        self.calibration_data[uid_str] = cal_df.copy()
+        if self.plot_mode == 'per_sensor':
+            plot_files = (os.path.join(sensor_folder, f"sensor_{uid_str}_calibration_means.html"),
+                          os.path.join(sensor_folder, f"sensor_{uid_str}_calibration_stddevs.html"))
+            self.writer.submit(plot_files, self._write_calibration_plots, self.calibration_data[uid_str], uid_str, sensor_folder)
+
+    def _write_calibration_plots(self, cal_df: pd.DataFrame, uid_str: str, sensor_folder: str):
+        """ Builds and saves the per sensor mean / std dev plots (runs on the writer thread)"""
         fig_mean, fig_std = self.plot_manager.create_calibration_plots(cal_df, uid_str)
 
         self.plot_manager.save_plot(fig_mean, f"sensor_{uid_str}_calibration_means.html", sensor_folder)
@@ -368,8 +719,8 @@ class ReportGenerator:
             # Save datalogger_df to CSV in main report directory
             csv_filename = f"datalogger_test_results_{timestamp_str}.csv"
             csv_filepath = os.path.join(self.target_dir, csv_filename)
-            datalogger_df.to_csv(csv_filepath, index=False)
-            logging.info(f"Saved datalogger test results to {csv_filepath}")
+            self.writer.submit(csv_filepath, write_csv_file, csv_filepath, datalogger_df.copy())
+            logging.info(f"Saving datalogger test results to {csv_filepath}")
         except Exception as e:
             logging.error(f"Error saving datalogger results CSV: {e}", exc_info=True)
 
@@ -378,6 +729,26 @@ class ReportGenerator:
 
 
 #--------------------------------- END OF REPORT GENERATOR CLASS ---------------------------------
+
+
+def load_raw_sample(reference, report_dir: str, mmap: bool = False) -> np.ndarray:
+    """ Loads a raw data array saved with ReportGenerator.add_raw_sample()
+
+    Args:
+        reference (dict | str): The reference stored in the report, older reports have the stringified list instead,
+                                which is still parsed so both can be compared
+        report_dir (str): Folder the report json is in (the .bin file is next to it)
+        mmap (bool): Memory map instead of reading, for going through lots of runs without copying
+    """
+    if isinstance(reference, str): # old style "[1, 2, 3]"
+        return np.array(json.loads(reference))
+
+    filepath = os.path.join(report_dir, reference["file"])
+    dtype = np.dtype(reference["dtype"])
+    shape = tuple(reference.get("shape") or (reference["count"],))
+    if mmap:
+        return np.memmap(filepath, dtype=dtype, mode='r', offset=reference["offset"], shape=shape)
+    return np.fromfile(filepath, dtype=dtype, count=reference["count"], offset=reference["offset"]).reshape(shape)
         
 
 
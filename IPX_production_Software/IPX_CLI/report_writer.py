@@ -0,0 +1,117 @@
+# report_writer.py
+# Background file writer for the report generator, so report files (csv, html, txt, json) are written
+# off the thread that is driving the serial bus.
+
+import logging
+import os
+import queue
+import threading
+
+
+# sentinel put on the queue to stop the worker thread
+_STOP = object()
+
+
+class BackgroundFileWriter:
+    """ Single worker thread that performs queued file writes in submission order
+
+    - One worker means writes are done in the exact order they were submitted (so per file order is kept)
+    - The queue is bounded, submit() blocks when it is full (back-pressure instead of unbounded memory)
+    - flush() blocks until everything submitted so far is on disk (optionally fsynced)
+    - After close() writes are done inline on the calling thread
+    """
+
+    def __init__(self, max_pending: int = 32, name: str = "report-writer"):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._written_paths = set() # paths written since last flush, for fsync
+        self._paths_lock = threading.Lock()
+        self.errors = [] # (filepaths, exception) for writes that failed
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, filepaths, write_func, *args, **kwargs):
+        """ Queue write_func(*args, **kwargs) to run on the writer thread
+
+        Args:
+            filepaths (str | tuple): File(s) the write produces, these are fsynced on flush()
+            write_func (callable): Function that does the actual write, args must not be changed by the caller afterwards
+                                   (pass copies of dataframes / dicts)
+        """
+        if isinstance(filepaths, str):
+            filepaths = (filepaths,)
+        job = (tuple(filepaths), write_func, args, kwargs)
+
+        if self._closed:
+            self._run_job(job) # no worker anymore, just do it here
+            return
+        self._queue.put(job) # blocks if the queue is full
+
+    def flush(self, fsync: bool = True):
+        """ Blocks until all submitted writes are done, then fsyncs the files they produced """
+        if not self._closed:
+            self._queue.join()
+
+        with self._paths_lock:
+            paths = sorted(self._written_paths)
+            self._written_paths.clear()
+
+        if fsync:
+            for path in paths:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError as e:
+                    logging.warning(f"Could not fsync {path}: {e}")
+        logging.debug(f"Report writer flushed {len(paths)} files")
+
+    def close(self):
+        """ Flushes everything and stops the worker thread, later submits are written inline """
+        if self._closed:
+            return
+        self.flush()
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._closed = True
+
+    def _run_job(self, job):
+        filepaths, write_func, args, kwargs = job
+        try:
+            write_func(*args, **kwargs)
+            with self._paths_lock:
+                self._written_paths.update(path for path in filepaths if os.path.exists(path))
+        except Exception as e:
+            self.errors.append((filepaths, e))
+            logging.error(f"Background write failed for {', '.join(filepaths)}: {e}", exc_info=True)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+
+# ---- write functions used with submit() ----
+
+def write_text_file(filepath: str, content: str):
+    """ Writes a string to a file (overwrites) """
+    with open(filepath, 'w') as text_file:
+        text_file.write(content)
+
+
+def append_binary_file(filepath: str, data: bytes):
+    """ Appends raw bytes to a file (creates it if needed) """
+    with open(filepath, 'ab') as binary_file:
+        binary_file.write(data)
+
+
+def write_csv_file(filepath: str, df):
+    """ Writes a dataframe to csv without the index, as the reports always have """
+    df.to_csv(filepath, index=False)
@@ -0,0 +1,458 @@
+# run_catalogue.py
+# SQLite catalogue of everything under production_runs, so "when/where was UID X configured and what did it measure"
+# is one indexed query instead of grepping thousands of report files.
+# Calibration csvs are linked to the run report that wrote them (newest report in the same string folder that
+# calibrated that UID) and dated by its Start Time, so the date filters cover them too.
+#
+#   python run_catalogue.py index                       (incremental, only new/changed files are read)
+#   python run_catalogue.py query --uid 12345678
+#   python run_catalogue.py query --mo MO001 --operator HS --since 2025-01-01 --until 2025-01-31
+
+import argparse
+import csv
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from IPX_Config import IPXCommands
+
+
+# bump when the schema changes, the catalogue is derived data so an older one is simply rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    report_path TEXT UNIQUE NOT NULL,
+    mo TEXT,
+    string_description TEXT,
+    report_id TEXT,
+    operator TEXT,
+    com_port TEXT,
+    status TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    duration_s REAL,
+    detected_uids INTEGER
+);
+CREATE TABLE IF NOT EXISTS sensors (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    uid TEXT NOT NULL,
+    final_status TEXT,
+    raw_data_sample TEXT,
+    calibrated INTEGER,
+    PRIMARY KEY (run_id, uid)
+);
+CREATE TABLE IF NOT EXISTS modbus_results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    uid TEXT NOT NULL,
+    overall_pass INTEGER,
+    status_val REAL,
+    dist_mm REAL,
+    temp_c REAL,
+    volt_v REAL,
+    PRIMARY KEY (run_id, uid)
+);
+CREATE TABLE IF NOT EXISTS geosense_results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    uid TEXT NOT NULL,
+    pass INTEGER,
+    axis_a REAL,
+    temperature REAL,
+    samples INTEGER,
+    axis_a_mean REAL,
+    axis_a_std REAL,
+    PRIMARY KEY (run_id, uid)
+);
+CREATE TABLE IF NOT EXISTS calibration_summaries (
+    csv_path TEXT NOT NULL,
+    run_id INTEGER REFERENCES runs(run_id) ON DELETE SET NULL,
+    string_dir TEXT,
+    mo TEXT,
+    string_description TEXT,
+    uid TEXT NOT NULL,
+    axis INTEGER NOT NULL,
+    calibrated_at TEXT,
+    n_sensors INTEGER,
+    mean_min REAL,
+    mean_max REAL,
+    mean_avg REAL,
+    std_dev_avg REAL,
+    std_dev_max REAL,
+    PRIMARY KEY (csv_path, axis)
+);
+CREATE INDEX IF NOT EXISTS idx_sensors_uid ON sensors(uid);
+CREATE INDEX IF NOT EXISTS idx_runs_mo ON runs(mo);
+CREATE INDEX IF NOT EXISTS idx_runs_operator ON runs(operator);
+CREATE INDEX IF NOT EXISTS idx_runs_start ON runs(start_time);
+CREATE INDEX IF NOT EXISTS idx_cal_uid ON calibration_summaries(uid);
+CREATE INDEX IF NOT EXISTS idx_cal_run ON calibration_summaries(run_id);
+"""
+
+TABLES = ("calibration_summaries", "geosense_results", "modbus_results", "sensors", "runs", "indexed_files")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """ Opens (and creates if needed) the catalogue database """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            for table in TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _file_sha1(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool_int(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in ("true", "1", "pass", "yes") else 0
+    return 1 if value else 0
+
+
+# ---------------------------- indexing ----------------------------
+
+def _index_report(conn: sqlite3.Connection, path: str):
+    """ Reads one *_config_report.json into runs / sensors / modbus_results / geosense_results """
+    with open(path, 'r') as json_file:
+        report = json.load(json_file)
+
+    meta = report.get("metadata", {})
+    conn.execute("DELETE FROM runs WHERE report_path = ?", (path,)) # cascades to the per-sensor tables
+    cursor = conn.execute(
+        "INSERT INTO runs (report_path, mo, string_description, report_id, operator, com_port, status, "
+        "start_time, end_time, duration_s, detected_uids) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        (path, meta.get("MO number"), meta.get("String Description"), meta.get("Report ID"), meta.get("Operator"),
+         meta.get("COM Port"), meta.get("status", meta.get("Status")), meta.get("Start Time"), meta.get("End Time"),
+         _to_float(meta.get("Duration (seconds)")), len(meta.get("Detected UIDs") or [])),
+    )
+    run_id = cursor.lastrowid
+
+    sensors = report.get("Sensors") or {}
+    # older reports have no calibration_outcome, every sensor in them was calibrated
+    has_outcomes = any("calibration_outcome" in sensor for sensor in sensors.values())
+    for uid, sensor in sensors.items():
+        final_status = sensor.get("final_status")
+        raw_sample = sensor.get("raw_data_sample")
+        if raw_sample is not None and not isinstance(raw_sample, str):
+            raw_sample = json.dumps(raw_sample) # binary raw sample reference (file/dtype/offset/count)
+        conn.execute(
+            "INSERT INTO sensors (run_id, uid, final_status, raw_data_sample, calibrated) VALUES (?,?,?,?,?)",
+            (run_id, str(uid), json.dumps(final_status) if final_status is not None else None, raw_sample,
+             1 if "calibration_outcome" in sensor or not has_outcomes else 0),
+        )
+
+        modbus = sensor.get("modbus_test_result")
+        if isinstance(modbus, dict):
+            conn.execute(
+                "INSERT INTO modbus_results (run_id, uid, overall_pass, status_val, dist_mm, temp_c, volt_v) VALUES (?,?,?,?,?,?,?)",
+                (run_id, str(uid), _to_bool_int(modbus.get("Overall_Pass")), _to_float(modbus.get("Status_Val")),
+                 _to_float(modbus.get("Dist_mm")), _to_float(modbus.get("Temp_C")), _to_float(modbus.get("Volt_V"))),
+            )
+
+        geosense = sensor.get("geosense_measurement")
+        if isinstance(geosense, dict):
+            conn.execute(
+                "INSERT INTO geosense_results (run_id, uid, pass, axis_a, temperature, samples, axis_a_mean, axis_a_std) VALUES (?,?,?,?,?,?,?,?)",
+                (run_id, str(uid), _to_bool_int(geosense.get("pass")), _to_float(geosense.get("axis_a")),
+                 _to_float(geosense.get("temperature")), geosense.get("samples"),
+                 _to_float(geosense.get("axis_a_mean")), _to_float(geosense.get("axis_a_std"))),
+            )
+
+
+def _index_calibration_csv(conn: sqlite3.Connection, path: str, root: str):
+    """ Summarises one sensor_<uid>_calibration_data.csv per axis into calibration_summaries
+
+    run_id / calibrated_at are filled in by _link_calibration once all reports are indexed.
+    """
+    per_axis = {}
+    with open(path, 'r', newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            try:
+                axis = int(row["axis"])
+                mean = float(row["mean"])
+                std_dev = float(row["std_dev"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            per_axis.setdefault(axis, []).append((mean, std_dev))
+
+    # production_runs/<MO>/<STRING>/sensor_<uid>/sensor_<uid>_calibration_data.csv (older runs: directly in <STRING>/)
+    string_dir = os.path.dirname(path)
+    if os.path.basename(string_dir).startswith("sensor_"):
+        string_dir = os.path.dirname(string_dir)
+    parts = os.path.relpath(string_dir, root).split(os.sep)
+    mo = parts[0] if len(parts) >= 2 else None
+    string_description = parts[1] if len(parts) >= 2 else None
+    uid = os.path.basename(path)[len("sensor_"):-len("_calibration_data.csv")]
+
+    conn.execute("DELETE FROM calibration_summaries WHERE csv_path = ?", (path,))
+    for axis, values in sorted(per_axis.items()):
+        means = [m for m, _ in values]
+        std_devs = [s for _, s in values]
+        conn.execute(
+            "INSERT INTO calibration_summaries (csv_path, string_dir, mo, string_description, uid, axis, n_sensors, "
+            "mean_min, mean_max, mean_avg, std_dev_avg, std_dev_max) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            (path, string_dir, mo, string_description, uid, axis, len(values), min(means), max(means),
+             sum(means) / len(means), sum(std_devs) / len(std_devs), max(std_devs)),
+        )
+
+
+def _link_calibration(conn: sqlite3.Connection) -> int:
+    """ Points every calibration summary at the run that wrote its csv and dates it by that run's start time
+
+    The csv is overwritten on every calibration, so it belongs to the newest report in the same string folder
+    that calibrated the UID. Summaries without such a report keep run_id / calibrated_at NULL.
+
+    Returns:
+        int: number of summaries without a run
+    """
+    newest = {}
+    rows = conn.execute(
+        "SELECT r.run_id, r.report_path, r.start_time, r.mo, r.string_description, s.uid FROM runs r JOIN sensors s ON s.run_id = r.run_id "
+        "WHERE s.calibrated = 1 AND r.start_time IS NOT NULL ORDER BY r.start_time"
+    )
+    for row in rows:
+        newest[(os.path.dirname(row["report_path"]), row["uid"])] = row
+
+    unlinked = 0
+    for row in conn.execute("SELECT DISTINCT csv_path, string_dir, uid FROM calibration_summaries").fetchall():
+        run = newest.get((row["string_dir"], row["uid"]))
+        if run is None:
+            unlinked += 1
+            conn.execute("UPDATE calibration_summaries SET run_id = NULL, calibrated_at = NULL WHERE csv_path = ?", (row["csv_path"],))
+            continue
+        # the report's MO / string win over the folder names (CO/MO/STRING layouts)
+        conn.execute(
+            "UPDATE calibration_summaries SET run_id = ?, calibrated_at = ?, mo = COALESCE(?, mo), "
+            "string_description = COALESCE(?, string_description) WHERE csv_path = ?",
+            (run["run_id"], run["start_time"], run["mo"], run["string_description"], row["csv_path"]),
+        )
+    return unlinked
+
+
+def _forget_file(conn: sqlite3.Connection, path: str, kind: str):
+    if kind == "report":
+        conn.execute("DELETE FROM runs WHERE report_path = ?", (path,))
+    else:
+        conn.execute("DELETE FROM calibration_summaries WHERE csv_path = ?", (path,))
+    conn.execute("DELETE FROM indexed_files WHERE path = ?", (path,))
+
+
+def index_production_runs(conn: sqlite3.Connection, root: str = "production_runs") -> dict:
+    """ Incrementally indexes reports and calibration csvs under root
+
+    A file is only re-read when its mtime/size changed AND its sha1 differs, files that disappeared are removed.
+
+    Returns:
+        dict: counts of indexed / unchanged / removed / failed files
+    """
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    found = {}
+    for path in glob.glob(os.path.join(root, "**", "*_config_report.json"), recursive=True):
+        found[path] = "report"
+    for path in glob.glob(os.path.join(root, "**", "sensor_*_calibration_data.csv"), recursive=True):
+        found[path] = "calibration"
+
+    known = {row["path"]: row for row in conn.execute("SELECT path, kind, mtime, size, sha1 FROM indexed_files")}
+
+    with conn:
+        for path in set(known) - set(found):
+            _forget_file(conn, path, known[path]["kind"])
+            counts["removed"] += 1
+
+        for path, kind in sorted(found.items()):
+            try:
+                stat = os.stat(path)
+                previous = known.get(path)
+                if previous is not None and previous["mtime"] == stat.st_mtime and previous["size"] == stat.st_size:
+                    counts["unchanged"] += 1
+                    continue
+
+                sha1 = _file_sha1(path)
+                if previous is not None and previous["sha1"] == sha1:
+                    # touched but not changed, just remember the new mtime
+                    conn.execute("UPDATE indexed_files SET mtime = ?, size = ? WHERE path = ?", (stat.st_mtime, stat.st_size, path))
+                    counts["unchanged"] += 1
+                    continue
+
+                if kind == "report":
+                    _index_report(conn, path)
+                else:
+                    _index_calibration_csv(conn, path, root)
+                conn.execute(
+                    "INSERT OR REPLACE INTO indexed_files (path, kind, mtime, size, sha1) VALUES (?,?,?,?,?)",
+                    (path, kind, stat.st_mtime, stat.st_size, sha1),
+                )
+                counts["indexed"] += 1
+            except Exception as e:
+                logging.warning(f"Could not index {path}: {e}")
+                counts["failed"] += 1
+
+        if counts["indexed"] or counts["removed"]:
+            unlinked = _link_calibration(conn)
+            if unlinked:
+                logging.warning(f"{unlinked} calibration csvs have no run report that calibrated them")
+
+    logging.info(f"Catalogue index: {counts}")
+    return counts
+
+
+# ---------------------------- queries ----------------------------
+
+def query_sensors(conn: sqlite3.Connection, uid: str = None, mo: str = None, operator: str = None,
+                  since: str = None, until: str = None) -> list[dict]:
+    """ Sensor level results joined with their run, newest first
+
+    Args:
+        uid, mo, operator (str): exact matches (mo/operator are stored uppercase, like the reports)
+        since, until (str): ISO dates (YYYY-MM-DD), inclusive, on the run start time
+    """
+    where, params = [], []
+    if uid is not None:
+        where.append("s.uid = ?")
+        params.append(str(uid))
+    if mo is not None:
+        where.append("r.mo = ?")
+        params.append(mo.upper())
+    if operator is not None:
+        where.append("r.operator = ?")
+        params.append(operator.upper())
+    if since is not None:
+        where.append("r.start_time >= ?")
+        params.append(datetime.date.fromisoformat(since).isoformat())
+    if until is not None:
+        where.append("r.start_time < ?")
+        params.append((datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat())
+
+    sql = (
+        "SELECT s.uid, r.start_time, r.mo, r.string_description, r.operator, r.com_port, r.status, r.report_path, "
+        "m.overall_pass AS modbus_pass, m.dist_mm, m.temp_c, m.volt_v, "
+        "g.pass AS geosense_pass, g.axis_a, g.temperature AS geosense_temperature "
+        "FROM sensors s JOIN runs r ON r.run_id = s.run_id "
+        "LEFT JOIN modbus_results m ON m.run_id = s.run_id AND m.uid = s.uid "
+        "LEFT JOIN geosense_results g ON g.run_id = s.run_id AND g.uid = s.uid"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY r.start_time DESC, s.uid"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def query_calibration(conn: sqlite3.Connection, uid: str, since: str = None, until: str = None) -> list[dict]:
+    """ Per axis calibration summaries for a UID with the run that wrote them, newest first
+
+    Args:
+        since, until (str): ISO dates (YYYY-MM-DD), inclusive, on the start time of that run
+    """
+    where, params = ["c.uid = ?"], [str(uid)]
+    if since is not None:
+        where.append("c.calibrated_at >= ?")
+        params.append(datetime.date.fromisoformat(since).isoformat())
+    if until is not None:
+        where.append("c.calibrated_at < ?")
+        params.append((datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat())
+    rows = conn.execute(
+        "SELECT c.uid, c.mo, c.string_description, c.calibrated_at, c.run_id, r.report_id, r.operator, c.axis, c.n_sensors, "
+        "c.mean_min, c.mean_max, c.mean_avg, c.std_dev_avg, c.std_dev_max "
+        "FROM calibration_summaries c LEFT JOIN runs r ON r.run_id = c.run_id "
+        "WHERE " + " AND ".join(where) + " ORDER BY c.calibrated_at DESC, c.axis",
+        params,
+    )
+    return [dict(row) for row in rows]
+
+
+def _print_rows(rows: list[dict], columns: list[str]):
+    if not rows:
+        print("No results.")
+        return
+    widths = {c: max(len(c), *(len("" if r.get(c) is None else str(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(("" if row.get(c) is None else str(row.get(c))).ljust(widths[c]) for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and query the production_runs catalogue")
+    parser.add_argument("--db", default=IPXCommands.Report_settings.Catalogue_db_path, help="SQLite catalogue path")
+    parser.add_argument("--root", default="production_runs", help="production_runs directory to index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("index", help="Incrementally index new/changed reports")
+
+    query = sub.add_parser("query", help="Look up sensors by UID, MO, operator and/or date range")
+    query.add_argument("--uid")
+    query.add_argument("--mo")
+    query.add_argument("--operator")
+    query.add_argument("--since", help="YYYY-MM-DD (inclusive)")
+    query.add_argument("--until", help="YYYY-MM-DD (inclusive)")
+    query.add_argument("--no-index", action="store_true", help="Skip the incremental index before querying")
+    query.add_argument("--json", action="store_true", help="Print results as json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    conn = connect(args.db)
+    try:
+        if args.command == "index" or not args.no_index:
+            index_production_runs(conn, args.root)
+        if args.command == "index":
+            return 0
+
+        start = time.perf_counter()
+        rows = query_sensors(conn, uid=args.uid, mo=args.mo, operator=args.operator, since=args.since, until=args.until)
+        calibration = query_calibration(conn, args.uid, since=args.since, until=args.until) if args.uid else []
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if args.json:
+            print(json.dumps({"sensors": rows, "calibration": calibration}, indent=4))
+        else:
+            _print_rows(rows, ["uid", "start_time", "mo", "string_description", "operator", "status",
+                               "modbus_pass", "dist_mm", "temp_c", "volt_v", "geosense_pass", "axis_a"])
+            if calibration:
+                print()
+                _print_rows(calibration, ["calibrated_at", "report_id", "mo", "string_description", "axis", "n_sensors",
+                                          "mean_min", "mean_max", "std_dev_avg", "std_dev_max"])
+        logging.info(f"{len(rows)} sensor results in {elapsed_ms:.1f} ms")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# run_journal.py
+# Append-only JSONL journal of a configuration run, so a crash / unplugged port mid-run does not lose the report.
+# ReportGenerator appends one line per update, save_report() compacts it into the normal *_config_report.json,
+# and the recover command below rebuilds the json from a journal that was left behind.
+
+import argparse
+import copy
+import datetime
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+class RunJournal:
+    """ Append-only JSONL event log for one ReportGenerator
+
+    Each event is one json line, appends are O(1) (one write to an open file).
+    fsync is batched: after every `fsync_every` events or `fsync_interval_s` seconds, whichever comes first.
+
+    Events:
+        {"event": "init", "report_path": ..., "report": {...}}   - the initial report layout
+        {"event": "metadata", "key": ..., "value": ...}          - report_data["metadata"][key] = value
+        {"event": "sensor", "uid": ..., "key": ..., "value": ...} - report_data["Sensors"][uid][key] = value
+    """
+
+    def __init__(self, filepath: str, encoder=None, fsync_every: int = 10, fsync_interval_s: float = 1.0):
+        self.filepath = filepath
+        self.encoder = encoder # json encoder class, e.g. CustomJSONEncoder for dataframes / numpy
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self._seq = 0
+        self._pending = 0 # events written since last fsync
+        self._last_sync = time.monotonic()
+        self._file = open(filepath, 'a', encoding='utf-8')
+
+    def append(self, event: str, **fields):
+        """ Writes one event line, value is serialised now so later changes to it are not picked up """
+        self._seq += 1
+        record = {"seq": self._seq, "time": datetime.datetime.now().isoformat(), "event": event, **fields}
+        line = json.dumps(record, cls=self.encoder, separators=(",", ":"))
+        self._file.write(line + "\n")
+        self._pending += 1
+        if self._pending >= self.fsync_every or (time.monotonic() - self._last_sync) >= self.fsync_interval_s:
+            self.sync()
+
+    def sync(self):
+        """ Flushes python's buffer and fsyncs the journal to disk """
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def remove(self):
+        """ Closes and deletes the journal (once the compacted json report is safely on disk) """
+        self.close()
+        try:
+            os.remove(self.filepath)
+        except OSError as e:
+            logging.warning(f"Could not remove run journal {self.filepath}: {e}")
+
+    @staticmethod
+    def replay(filepath: str):
+        """ Rebuilds the report from a journal
+
+        A torn last line (crash during a write) is skipped.
+
+        Returns:
+            tuple: (report_data dict, report_path str or None, number of events applied)
+        """
+        report_data = {"metadata": {}, "Sensors": {}}
+        report_path = None
+        applied = 0
+
+        with open(filepath, 'r', encoding='utf-8') as journal_file:
+            for line_num, line in enumerate(journal_file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping unreadable journal line {line_num} in {filepath} (partial write?)")
+                    continue
+
+                event = record.get("event")
+                if event == "init":
+                    report_data = copy.deepcopy(record["report"])
+                    report_data.setdefault("metadata", {})
+                    report_data.setdefault("Sensors", {})
+                    report_path = record.get("report_path")
+                elif event == "metadata":
+                    report_data["metadata"][record["key"]] = record["value"]
+                elif event == "sensor":
+                    report_data["Sensors"].setdefault(str(record["uid"]), {})[record["key"]] = record["value"]
+                else:
+                    logging.warning(f"Unknown journal event '{event}' on line {line_num} in {filepath}")
+                    continue
+                applied += 1
+
+        return report_data, report_path, applied
+
+
+def journal_path_for(report_path: str) -> str:
+    """ *_config_report.json -> *_config_report.journal.jsonl """
+    base, _ = os.path.splitext(report_path)
+    return base + JOURNAL_SUFFIX
+
+
+def recover_report(journal_path: str, output_path: str = None, overwrite: bool = False):
+    """ Rebuilds a *_config_report.json from a journal left behind by a crashed run
+
+    Returns:
+        str: path of the written report, or None if nothing was written
+    """
+    report_data, report_path, applied = RunJournal.replay(journal_path)
+    if applied == 0:
+        logging.error(f"No events could be read from {journal_path}")
+        return None
+
+    if output_path is None:
+        output_path = report_path or journal_path[:-len(JOURNAL_SUFFIX)] + ".json"
+        # report_path is relative to where the run was started, fall back to next to the journal
+        if not os.path.isdir(os.path.dirname(output_path) or "."):
+            output_path = os.path.join(os.path.dirname(journal_path), os.path.basename(output_path))
+
+    if os.path.exists(output_path) and not overwrite:
+        logging.error(f"{output_path} already exists, use --overwrite to replace it")
+        return None
+
+    metadata = report_data["metadata"]
+    if "status" not in metadata:
+        metadata["status"] = "Recovered (incomplete run)"
+    metadata["Recovered From Journal"] = os.path.basename(journal_path)
+    metadata["Recovered Events"] = applied
+
+    with open(output_path, 'w') as json_file:
+        json.dump(report_data, json_file, indent=4)
+    logging.info(f"Recovered report with {applied} events written to {output_path}")
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recover IPX configuration reports from run journals")
+    parser.add_argument("journals", nargs="*", help="Journal file(s) to recover")
+    parser.add_argument("--scan", metavar="DIR", help="Recover every journal found under DIR (e.g. production_runs)")
+    parser.add_argument("--output", help="Output json path (only with a single journal)")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing report")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    journals = list(args.journals)
+    if args.scan:
+        journals += sorted(glob.glob(os.path.join(args.scan, "**", "*" + JOURNAL_SUFFIX), recursive=True))
+    if not journals:
+        parser.error("no journals given (pass files or --scan DIR)")
+    if args.output and len(journals) != 1:
+        parser.error("--output can only be used with a single journal")
+
+    failed = 0
+    for journal in journals:
+        try:
+            if recover_report(journal, output_path=args.output, overwrite=args.overwrite) is None:
+                failed += 1
+        except Exception as e:
+            logging.error(f"Failed to recover {journal}: {e}", exc_info=True)
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# session_checkpoint.py
+# Per sensor progress of a configuration run (parameters applied, calibrated, baud switched, final status read,
+# verified), rewritten atomically after every step, so an interrupted run (error, unplugged port, Ctrl+C) can carry
+# on where it stopped instead of redoing the whole string. The report data itself is in the run journal
+# (run_journal.py), the checkpoint only records which work is done and how the run was started. The report writer
+# is flushed and the journal fsynced before every checkpoint write, so the checkpoint never claims work whose files
+# (calibration csv, raw samples, status txt) or report data aren't on disk yet.
+#
+#   <report>_checkpoint.json next to the report, removed once the run finishes
+#   main.py resume --checkpoint latest         (or a checkpoint path, menu option 11)
+#
+# Resuming is IPX_workflows.resume_configuration_flow: get_status sweep to confirm the sensors, then
+# run_configuration_flow skips everything the checkpoint says is done.
+
+import datetime
+import glob
+import json
+import logging
+import os
+
+
+STAGES = ("parameters", "calibration", "baud_switch", "final_status", "verification") # in run order
+CHECKPOINT_SUFFIX = "_checkpoint.json"
+REPORT_SUFFIX = "_config_report.json"
+
+
+class CheckpointError(Exception):
+    """ Checkpoint missing, unreadable or for a run that can't be resumed """
+    pass
+
+
+def checkpoint_path_for(report_path: str) -> str:
+    """ *_config_report.json -> *_checkpoint.json """
+    if report_path.endswith(REPORT_SUFFIX):
+        return report_path[:-len(REPORT_SUFFIX)] + CHECKPOINT_SUFFIX
+    return os.path.splitext(report_path)[0] + CHECKPOINT_SUFFIX
+
+
+class SessionCheckpoint:
+    """ Which stages each sensor of a run has finished, saved on every change """
+
+    def __init__(self, filepath: str, data: dict, journal=None, writer=None):
+        self.filepath = filepath
+        self.data = data
+        self.journal = journal # RunJournal of the run (None if it couldn't be started), synced before every save
+        self.writer = writer # the report's BackgroundFileWriter, flushed before every save
+        self.finished = False
+
+    @classmethod
+    def create(cls, report_path: str, journal_path: str, run: dict, uids: list, check_sensor_present: bool,
+               journal=None, writer=None) -> "SessionCheckpoint":
+        """ New checkpoint once the sensors are detected
+
+        Args:
+            journal (RunJournal): the run's open journal, fsynced before each checkpoint write
+            writer (BackgroundFileWriter): the report's file writer, flushed before each checkpoint write
+            run: how the run was started (com_port, baudrate, num_sensors, mo, string_description, operator)
+            uids: detected UIDs in string order
+        """
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        checkpoint = cls(checkpoint_path_for(report_path), {
+            "version": 1,
+            "created": now,
+            "updated": now,
+            "report_path": report_path,
+            "journal_path": journal_path,
+            "run": run,
+            "uids": list(uids),
+            "check_sensor_present": check_sensor_present,
+            "sensors": {str(uid): {} for uid in uids},
+            "resumed": [],
+        }, journal=journal, writer=writer)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, filepath: str) -> "SessionCheckpoint":
+        try:
+            with open(filepath, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Could not read checkpoint {filepath}: {e}")
+        missing = [key for key in ("report_path", "journal_path", "run", "uids", "sensors") if key not in data]
+        if missing:
+            raise CheckpointError(f"{filepath} is not a run checkpoint (missing {', '.join(missing)})")
+        return cls(filepath, data)
+
+    # ------------------------------ state ------------------------------
+    @property
+    def run(self) -> dict:
+        return self.data["run"]
+
+    @property
+    def uids(self) -> list:
+        return self.data["uids"]
+
+    @property
+    def journal_path(self) -> str:
+        return self.data["journal_path"]
+
+    def is_done(self, uid, stage: str) -> bool:
+        return stage in self.data["sensors"].get(str(uid), {})
+
+    def done(self, stage: str) -> set:
+        return {uid for uid in self.uids if self.is_done(uid, stage)}
+
+    def pending(self, stage: str) -> list:
+        """ UIDs (in string order) that still need the stage """
+        return [uid for uid in self.uids if not self.is_done(uid, stage)]
+
+    def mark(self, uid, stage: str, value=True):
+        """ Records a finished stage for a sensor (value e.g. the calibration outcome) and saves """
+        self.data["sensors"].setdefault(str(uid), {})[stage] = value
+        self.save()
+
+    def unmark(self, uid, stage: str):
+        """ Stage has to be done again (the sensor state did not match the checkpoint) """
+        if self.data["sensors"].get(str(uid), {}).pop(stage, None) is not None:
+            self.save()
+
+    def mark_all(self, stage: str, value=True):
+        for uid in self.uids:
+            self.data["sensors"].setdefault(str(uid), {})[stage] = value
+        self.save()
+
+    def add_resume(self, com_port: str):
+        self.data["resumed"].append({"time": datetime.datetime.now().isoformat(timespec="seconds"), "com_port": com_port})
+        self.save()
+
+    def summary(self) -> str:
+        """ e.g. 'parameters 12/12, calibration 7/12, ...' """
+        return ", ".join(f"{stage.replace('_', ' ')} {len(self.done(stage))}/{len(self.uids)}" for stage in STAGES)
+
+    # ------------------------------ files ------------------------------
+    def save(self):
+        """ Atomic rewrite: temp file, fsync, rename over the old checkpoint
+
+        Queued report files are written and the run journal synced first, if the sync fails the old checkpoint is
+        kept (resume redoes the step)
+        """
+        if self.writer is not None:
+            self.writer.flush() # blocks until queued files are written and fsynced, failures are logged by the writer
+        if self.journal is not None:
+            try:
+                self.journal.sync()
+            except OSError as e:
+                logging.error(f"Could not sync run journal, checkpoint not updated: {e}")
+                return
+        self.data["updated"] = datetime.datetime.now().isoformat(timespec="seconds")
+        temp_path = self.filepath + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.data, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.filepath)
+
+    def finish(self):
+        """ Run finished (report saved), nothing left to resume """
+        self.finished = True
+        try:
+            os.remove(self.filepath)
+        except OSError as e:
+            logging.warning(f"Could not remove run checkpoint {self.filepath}: {e}")
+
+
+def find_checkpoints(root: str = "production_runs") -> list[SessionCheckpoint]:
+    """ Checkpoints of interrupted runs under root, newest first """
+    paths = glob.glob(os.path.join(root, "**", "*" + CHECKPOINT_SUFFIX), recursive=True)
+    checkpoints = []
+    for path in sorted(paths, key=os.path.getmtime, reverse=True):
+        try:
+            checkpoints.append(SessionCheckpoint.load(path))
+        except CheckpointError as e:
+            logging.warning(str(e))
+    return checkpoints
@@ -0,0 +1,363 @@
+# session_estimator.py
+# How long will a string / an order take on this bench, and how many benches does a daily target need?
+# Fitted from the newest run reports in production_runs: each top level stage of the "Stage Timings" tree
+# (stage_timer.py) is modelled as fixed + per sensor time, the time outside the stages (operator prompts, setup)
+# as one more stage, and the spread of the session times around that as variance = fixed + per sensor.
+# Older reports without stage timings are modelled on their total duration only.
+#
+#   python session_estimator.py --sensors 60
+#   python session_estimator.py --sensors 60 --stages --commands          (where the time goes)
+#   python session_estimator.py --order HS2_order_data.json               (every string of an order)
+#   python session_estimator.py --sensors 12 --per-day 40                 (benches needed for 40 strings a day)
+#   python session_estimator.py --order orders/ --days 5 --station BENCH2
+#
+# Configuration runs also log an estimate before they start (and order_runner.py one for the whole order).
+
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+from IPX_Config import IPXCommands
+
+
+OTHER_STAGE = "other" # session time not inside any timed stage
+COMPLETED_PREFIXES = ("SUCCESS", "CONFIGURATION COMPLETED") # runs that got through to the end, aborted ones would skew it
+
+
+class EstimatorError(Exception):
+    """ Not enough run history to estimate from """
+    pass
+
+
+# ---------------------------- history ----------------------------
+
+def _walk_stages(node: dict, path: str, commands: dict):
+    """ Durations of every nested stage, keyed by path below the top level stage (e.g. 'calibration/uid/calibrate') """
+    for child in node.get("children", []):
+        child_path = f"{path}/{child.get('name')}"
+        if child.get("duration_s") is not None:
+            commands.setdefault(child_path, []).append(child["duration_s"])
+        _walk_stages(child, child_path, commands)
+
+
+def _read_sample(path: str) -> dict | None:
+    """ The timings of one completed configuration run, None for runs the model should not use """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            report = json.load(file)
+    except (OSError, ValueError) as e:
+        logging.debug("Skipping unreadable report %s: %s", path, e)
+        return None
+    meta = report.get("metadata", {})
+    sensors = report.get("Sensors") or {}
+    status = str(meta.get("status") or meta.get("Status") or "").upper()
+    duration = meta.get("Duration (seconds)")
+    sensor_count = len(meta.get("Detected UIDs") or sensors)
+    if meta.get("Run Type") or meta.get("Resumed") or not status.startswith(COMPLETED_PREFIXES) or not duration or not sensor_count:
+        return None # verification only, resumed (duration includes the downtime), aborted or empty runs
+
+    tree = meta.get("Stage Timings") or {}
+    stages, commands = {}, {}
+    for child in tree.get("children", []):
+        stages[child["name"]] = stages.get(child["name"], 0) + (child.get("duration_s") or 0)
+        _walk_stages(child, child["name"], commands)
+    return {
+        "path": path,
+        "station": meta.get("Station", "unknown"),
+        "sensors": sensor_count,
+        "duration_s": float(duration),
+        "stages": stages,
+        "commands": commands,
+        "attempts": [outcome["attempts"] for outcome in (sensor.get("calibration_outcome") for sensor in sensors.values())
+                     if outcome and outcome.get("attempts")],
+    }
+
+
+def load_history(root: str = "production_runs", station: str = None, limit: int = None) -> list[dict]:
+    """ Timings of the newest completed configuration runs (optionally of one station), newest first """
+    limit = limit or IPXCommands.Estimator_settings.History_runs
+    paths = glob.glob(os.path.join(root, "**", "*_config_report.json"), recursive=True)
+    samples = []
+    for path in sorted(paths, key=os.path.getmtime, reverse=True):
+        sample = _read_sample(path)
+        if sample and (station is None or sample["station"].upper() == station.upper()):
+            samples.append(sample)
+            if len(samples) >= limit:
+                break
+    return samples
+
+
+# ---------------------------- model ----------------------------
+
+def _fit_linear(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    """ Least squares y = a + b x. If every run had the same sensor count there is no slope to fit,
+    so it falls back to all time per sensor (a = 0) """
+    if len(set(xs)) < 2:
+        return 0.0, sum(ys) / sum(xs)
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+    return mean_y - slope * mean_x, slope
+
+
+class SessionModel:
+    """ Session time = sum over the stages of (fixed + per sensor), variance = fixed + per sensor """
+
+    def __init__(self, samples: list[dict]):
+        if len(samples) < 2:
+            raise EstimatorError(f"Only {len(samples)} completed run(s) in the history, need at least 2")
+        self.runs = len(samples)
+        self.stations = sorted({sample["station"] for sample in samples})
+        self.sensor_range = (min(sample["sensors"] for sample in samples), max(sample["sensors"] for sample in samples))
+
+        staged = [sample for sample in samples if sample["stages"]]
+        if len(staged) >= 2:
+            self.staged_runs = len(staged)
+            names = list(dict.fromkeys(name for sample in staged for name in sample["stages"]))
+            rows = [{**{name: sample["stages"].get(name, 0) for name in names},
+                     OTHER_STAGE: max(sample["duration_s"] - sum(sample["stages"].values()), 0)} for sample in staged]
+            fitted = staged
+        else:
+            self.staged_runs = 0
+            names = []
+            rows = [{OTHER_STAGE: sample["duration_s"]} for sample in samples]
+            fitted = samples
+        counts = [sample["sensors"] for sample in fitted]
+        self.stages = {name: _fit_linear(counts, [row[name] for row in rows]) for name in names + [OTHER_STAGE]}
+
+        # spread of whole sessions around the fit, per sensor part grows with the string (retries, slow sensors)
+        squared = [(sum(row.values()) - self.mean(count)) ** 2 for row, count in zip(rows, counts)]
+        if len(fitted) > 2:
+            squared = [value * len(fitted) / (len(fitted) - 2) for value in squared] # two fitted parameters
+        fixed, per_sensor = _fit_linear(counts, squared)
+        if per_sensor < 0:
+            fixed, per_sensor = statistics.fmean(squared), 0.0
+        elif fixed < 0:
+            fixed, per_sensor = 0.0, sum(squared) / sum(counts)
+        self.variance = (fixed, per_sensor)
+
+        self.commands = {}
+        for sample in fitted:
+            for name, durations in sample["commands"].items():
+                entry = self.commands.setdefault(name, {"durations": [], "sensors": 0})
+                entry["durations"] += durations
+                entry["sensors"] += sample["sensors"]
+        self.attempts = [attempts for sample in fitted for attempts in sample["attempts"]]
+
+    def stage_times(self, sensors: int) -> dict:
+        return {name: max(fixed + per_sensor * sensors, 0.0) for name, (fixed, per_sensor) in self.stages.items()}
+
+    def mean(self, sensors: int) -> float:
+        return sum(self.stage_times(sensors).values())
+
+    def sd(self, sensors: int) -> float:
+        fixed, per_sensor = self.variance
+        return math.sqrt(max(fixed + per_sensor * sensors, 0.0))
+
+    def command_table(self) -> list[dict]:
+        """ Per nested stage / command: calls per sensor, mean and p90 time per call """
+        table = []
+        for name, entry in sorted(self.commands.items()):
+            durations = sorted(entry["durations"])
+            table.append({"stage": name, "calls_per_sensor": len(durations) / entry["sensors"],
+                          "mean_s": statistics.fmean(durations), "p90_s": durations[int(0.9 * (len(durations) - 1))]})
+        return table
+
+    def describe(self) -> str:
+        source = f"{self.runs} runs on {', '.join(self.stations)}, {self.sensor_range[0]}-{self.sensor_range[1]} sensors"
+        if not self.staged_runs:
+            source += ", no stage timings (totals only)"
+        return source
+
+
+def _z(confidence: float) -> float:
+    return statistics.NormalDist().inv_cdf(confidence)
+
+
+def estimate(model: SessionModel, sensor_counts: list[int], changeover_s: float = None, confidence: float = None) -> dict:
+    """ Expected time for strings run back to back on one bench (sessions independent, so variances add)
+
+    Returns:
+        dict: strings, sensors, mean_s, sd_s, low_s / high_s (the central range with the confidence), per_string [mean_s]
+    """
+    changeover_s = IPXCommands.Estimator_settings.Changeover_s if changeover_s is None else changeover_s
+    confidence = confidence or IPXCommands.Estimator_settings.Confidence
+    per_string = [model.mean(count) for count in sensor_counts]
+    mean = sum(per_string) + changeover_s * (len(sensor_counts) - 1)
+    sd = math.sqrt(sum(model.sd(count) ** 2 for count in sensor_counts))
+    z = _z(confidence)
+    return {"strings": len(sensor_counts), "sensors": sum(sensor_counts), "mean_s": mean, "sd_s": sd,
+            "low_s": max(mean - z * sd, 0.0), "high_s": mean + z * sd, "per_string": per_string}
+
+
+def benches_needed(model: SessionModel, sensor_counts: list[int], shift_hours: float = None, changeover_s: float = None,
+                   confidence: float = None) -> dict:
+    """ Fewest benches that get a day's strings done within the shift, with the confidence
+
+    Strings go to the least loaded bench, longest first. Every bench has to finish, so each one gets
+    confidence ** (1 / benches) of the margin.
+
+    Returns:
+        dict: benches, shift_s, loads [{strings, mean_s, high_s}], or benches None if one string alone does not fit
+    """
+    settings = IPXCommands.Estimator_settings
+    shift_s = (shift_hours or settings.Shift_hours) * 3600
+    changeover_s = settings.Changeover_s if changeover_s is None else changeover_s
+    confidence = confidence or settings.Confidence
+    strings = sorted(((model.mean(count) + changeover_s, model.sd(count) ** 2) for count in sensor_counts), reverse=True)
+
+    for benches in range(1, len(strings) + 1):
+        loads = [{"strings": 0, "mean_s": 0.0, "variance": 0.0} for _ in range(benches)]
+        for mean, variance in strings:
+            bench = min(loads, key=lambda load: load["mean_s"])
+            bench["strings"] += 1
+            bench["mean_s"] += mean
+            bench["variance"] += variance
+        z = _z(confidence ** (1 / benches))
+        for load in loads:
+            load["high_s"] = load["mean_s"] + z * math.sqrt(load.pop("variance"))
+        if all(load["high_s"] <= shift_s for load in loads):
+            return {"benches": benches, "shift_s": shift_s, "loads": loads}
+    return {"benches": None, "shift_s": shift_s, "loads": []}
+
+
+# ---------------------------- before a run ----------------------------
+
+_models = {} # (root, station) -> (loaded at, SessionModel or None), so a queue of runs reads the history once
+MODEL_MAX_AGE_S = 3600
+
+
+def bench_model(root: str = "production_runs") -> SessionModel:
+    """ Model for this bench, or for every station while this one has too few runs """
+    station = platform.node() or "unknown"
+    for key in ((root, station), (root, None)):
+        if key not in _models or time.time() - _models[key][0] > MODEL_MAX_AGE_S:
+            samples = load_history(root, station=key[1])
+            enough = key[1] is None or len(samples) >= IPXCommands.Estimator_settings.Min_runs
+            _models[key] = (time.time(), SessionModel(samples) if enough else None)
+        if _models[key][1] is not None:
+            return _models[key][1]
+
+
+def _minutes(seconds: float) -> str:
+    if seconds < 120:
+        return f"{seconds:.0f} s"
+    return f"{seconds / 60:.0f} min" if seconds < 5400 else f"{seconds / 3600:.1f} h"
+
+
+def log_estimate(sensor_counts: list[int], label: str = None):
+    """ Logs the expected session time before a run starts, never stops the run """
+    try:
+        model = bench_model()
+        result = estimate(model, sensor_counts)
+    except (EstimatorError, OSError) as e:
+        logging.info(f"No session time estimate yet: {e}")
+        return None
+    confidence = IPXCommands.Estimator_settings.Confidence
+    what = label or (f"{sensor_counts[0]} sensors" if len(sensor_counts) == 1 else
+                     f"{len(sensor_counts)} strings, {sum(sensor_counts)} sensors")
+    logging.info(f"Estimated time for {what}: {_minutes(result['mean_s'])} "
+                 f"({_minutes(result['low_s'])} - {_minutes(result['high_s'])}, {2 * confidence - 1:.0%} range), "
+                 f"from {model.describe()}")
+    return result
+
+
+# ---------------------------- planning command ----------------------------
+
+def _print_plan(model: SessionModel, sensor_counts: list[int], args):
+    confidence = args.confidence or IPXCommands.Estimator_settings.Confidence
+    changeover_s = None if args.changeover_min is None else args.changeover_min * 60
+    print(f"Model: {model.describe()}")
+    if not (model.sensor_range[0] <= max(sensor_counts) <= model.sensor_range[1]):
+        print(f"  (strings of {max(sensor_counts)} sensors are outside the history, the estimate is extrapolated)")
+
+    result = estimate(model, sensor_counts, changeover_s, confidence)
+    print(f"\n{result['strings']} string(s), {result['sensors']} sensors on one bench: {_minutes(result['mean_s'])} "
+          f"+/- {_minutes(result['sd_s'])}  ({2 * confidence - 1:.0%} range {_minutes(result['low_s'])} - {_minutes(result['high_s'])})")
+    if result["strings"] > 1:
+        for count in sorted(set(sensor_counts)):
+            print(f"   {sensor_counts.count(count):>3} x {count:>3} sensors: {_minutes(model.mean(count))} each")
+
+    if args.stages:
+        count = round(statistics.fmean(sensor_counts))
+        print(f"\nStages for {count} sensors:            fixed   per sensor   total")
+        for name, seconds in model.stage_times(count).items():
+            fixed, per_sensor = model.stages[name]
+            print(f"   {name:<28} {fixed:>8.1f} s {per_sensor:>8.2f} s {seconds:>8.1f} s")
+    if args.commands:
+        print(f"\n{'Stage / command':<52} {'per sensor':>10} {'mean':>8} {'p90':>8}")
+        for row in model.command_table():
+            print(f"   {row['stage']:<49} {row['calls_per_sensor']:>10.2f} {row['mean_s']:>7.2f}s {row['p90_s']:>7.2f}s")
+        if model.attempts:
+            retried = sum(1 for attempts in model.attempts if attempts > 1) / len(model.attempts)
+            print(f"   calibration attempts per sensor: {statistics.fmean(model.attempts):.2f} ({retried:.0%} retried)")
+
+    daily = None
+    if args.per_day:
+        daily = [round(statistics.fmean(sensor_counts))] * args.per_day
+    elif args.days:
+        days = [sorted(sensor_counts, reverse=True)[day::args.days] for day in range(args.days)]
+        daily = max(days, key=lambda day: sum(model.mean(count) for count in day))
+    if daily:
+        plan = benches_needed(model, daily, args.shift_hours, changeover_s, confidence)
+        print(f"\nDaily target: {len(daily)} strings, {sum(daily)} sensors in a {plan['shift_s'] / 3600:g} h shift")
+        if plan["benches"] is None:
+            print("   a single string does not fit in the shift")
+        else:
+            print(f"   benches needed: {plan['benches']} (all finish with {confidence:.0%} confidence)")
+            for number, load in enumerate(plan["loads"], start=1):
+                print(f"   bench {number}: {load['strings']} strings, {_minutes(load['mean_s'])} expected, "
+                      f"{_minutes(load['high_s'])} at worst")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Session time estimates and bench capacity from past run reports")
+    planned = parser.add_mutually_exclusive_group(required=True)
+    planned.add_argument("--sensors", type=int, help="Sensors on the string")
+    planned.add_argument("--order", nargs="+", help="Order JSON file(s) or folder, estimates every string")
+    parser.add_argument("--strings", type=int, default=1, help="Number of strings of --sensors (default 1)")
+    parser.add_argument("--per-day", dest="per_day", type=int, help="Strings to finish per day, gives the benches needed")
+    parser.add_argument("--days", type=int, help="Days to finish the strings in, gives the benches needed")
+    parser.add_argument("--station", help="Only this station's runs (the Station in the reports), default all")
+    parser.add_argument("--root", default="production_runs", help="Run reports folder (default production_runs)")
+    parser.add_argument("--history", type=int, help=f"Newest runs used (default {IPXCommands.Estimator_settings.History_runs})")
+    parser.add_argument("--changeover-min", dest="changeover_min", type=float,
+                        help=f"Minutes between strings (default {IPXCommands.Estimator_settings.Changeover_s / 60:g})")
+    parser.add_argument("--shift-hours", dest="shift_hours", type=float,
+                        help=f"Bench hours per day (default {IPXCommands.Estimator_settings.Shift_hours:g})")
+    parser.add_argument("--confidence", type=float, help=f"default {IPXCommands.Estimator_settings.Confidence:g}")
+    parser.add_argument("--stages", action="store_true", help="Show the per stage breakdown")
+    parser.add_argument("--commands", action="store_true", help="Show the per command / nested stage timings")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    if args.confidence is not None and not 0.5 <= args.confidence < 1:
+        parser.error("--confidence must be between 0.5 and 1")
+
+    if args.order:
+        import order_spec
+        try:
+            orders = order_spec.load_orders(args.order, require_mo=False)
+        except order_spec.OrderSpecError as e:
+            logging.error(str(e))
+            return 2
+        sensor_counts = [string.expected_sensors for order in orders for string in order.strings]
+    else:
+        sensor_counts = [args.sensors] * args.strings
+
+    try:
+        model = SessionModel(load_history(args.root, station=args.station, limit=args.history))
+    except EstimatorError as e:
+        logging.error(f"{e} ({args.root}{', station ' + args.station if args.station else ''})")
+        return 1
+    _print_plan(model, sensor_counts, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# stage_timer.py
+# Nested timing of the stages of a configuration run (detection, parameter setup, each UID's calibration, ...)
+# The tree is saved into the report metadata, so slow stages / stations can be found from the reports.
+
+import logging
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """ Records a tree of timed stages
+
+    Use either the context manager:
+        with timer.stage("calibration"):
+            with timer.stage("uid", uid=uid): ...
+    or begin()/end() where a with block does not fit. end() also closes any stages still open inside it,
+    so an exception that skips an end() call does not leave the tree broken.
+
+    Each node is {"name", "duration_s", "status", "children", **attributes}
+    """
+
+    def __init__(self, name: str = "run"):
+        self.root = self._new_node(name, {})
+        self._stack = [self.root]
+
+    @staticmethod
+    def _new_node(name: str, attributes: dict) -> dict:
+        node = {"name": name, **attributes, "status": "running", "duration_s": None, "children": []}
+        node["_start"] = time.perf_counter()
+        return node
+
+    def begin(self, name: str, **attributes) -> dict:
+        """ Starts a stage as a child of the current stage, returns the node (pass it to end()) """
+        node = self._new_node(name, attributes)
+        self._stack[-1]["children"].append(node)
+        self._stack.append(node)
+        return node
+
+    def end(self, node: dict, status: str = "ok"):
+        """ Ends a stage (and anything still open inside it) """
+        if node not in self._stack:
+            return # already ended
+        while self._stack:
+            current = self._stack.pop()
+            self._close(current, status if current is node else "unfinished")
+            if current is node:
+                break
+
+    @staticmethod
+    def _close(node: dict, status: str):
+        node["duration_s"] = round(time.perf_counter() - node.pop("_start"), 4)
+        node["status"] = status
+
+    @contextmanager
+    def stage(self, name: str, **attributes):
+        """ Times the with block as a stage, status is 'error' if it raised """
+        node = self.begin(name, **attributes)
+        try:
+            yield node
+        except BaseException:
+            self.end(node, status="error")
+            raise
+        else:
+            self.end(node)
+
+    def to_dict(self) -> dict:
+        """ Json friendly copy of the tree, stages still running report their elapsed time so far """
+        now = time.perf_counter()
+
+        def copy_node(node):
+            result = {key: value for key, value in node.items() if key not in ("_start", "children")}
+            if "_start" in node:
+                result["duration_s"] = round(now - node["_start"], 4)
+            result["children"] = [copy_node(child) for child in node["children"]]
+            return result
+
+        return copy_node(self.root)
+
+    def flatten(self) -> list[dict]:
+        """ One row per stage with its path (e.g. 'run/calibration/uid'), for tables / estimates """
+        rows = []
+
+        def walk(node, path):
+            path = f"{path}/{node['name']}" if path else node["name"]
+            row = {key: value for key, value in node.items() if key != "children"}
+            row["path"] = path
+            rows.append(row)
+            for child in node["children"]:
+                walk(child, path)
+
+        walk(self.to_dict(), "")
+        return rows
+
+    def log_summary(self, level: int = logging.INFO):
+        """ Logs the top level stages of the run and how long they took """
+        tree = self.to_dict()
+        logging.log(level, f"Stage timings ({tree['duration_s']:.1f} s total):")
+        for child in tree["children"]:
+            logging.log(level, f"   {child['name']:<28} {child['duration_s']:>8.2f} s  ({child['status']})")
@@ -0,0 +1,104 @@
+# startup_benchmark.py
+# Measures how long the CLI takes to get to the menu (fresh interpreter each time, so nothing is cached in memory)
+# and fails if it is over budget, or if one of the heavy libraries got imported at startup again.
+#
+#   python startup_benchmark.py
+#   python startup_benchmark.py --budget 0.5 --runs 10
+#   python startup_benchmark.py --importtime           (per module import breakdown, slowest first)
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# what runs before the menu is shown: main itself (its __main__ guard keeps the menu from starting) last, so the
+# breakdown still lists the big modules separately and main is charged for its own imports and module level setup
+STARTUP_MODULES = ["IPX_Config", "Failure_handlers", "IPX_workflows", "batch_cli", "main"]
+
+# must not be imported until a workflow actually needs them
+LAZY_MODULES = ["pandas", "plotly", "pymodbus", "report_generator", "IPX_datalogger_tester"]
+
+DEFAULT_BUDGET_S = 0.8
+
+
+def _startup_script() -> str:
+    return (
+        "import sys\n"
+        + "".join(f"import {module}\n" for module in STARTUP_MODULES)
+        + f"loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]\n"
+        + "print(','.join(loaded))\n"
+    )
+
+
+def time_startup(runs: int = 5) -> tuple[list[float], list[str]]:
+    """ Times `runs` fresh interpreters importing the startup modules
+
+    Returns:
+        tuple: (list of wall times in seconds, heavy modules that were loaded eagerly)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times, eager = [], set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", _startup_script()], cwd=here, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"Startup import failed:\n{result.stderr}")
+        eager.update(filter(None, result.stdout.strip().split(",")))
+    return times, sorted(eager)
+
+
+def import_breakdown(top: int = 15) -> list[tuple[float, str]]:
+    """ Cumulative import time per top level module (python -X importtime), slowest first """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "".join(f"import {m}\n" for m in STARTUP_MODULES)],
+                            cwd=here, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].startswith("import time:"):
+            continue
+        try:
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2].rstrip()
+        if not name.startswith("  "): # top level entries only (nested ones are indented)
+            rows.append((cumulative_us / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup time benchmark for the IPX CLI")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="Max median startup time in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="Show the slowest imports")
+    args = parser.parse_args(argv)
+
+    times, eager = time_startup(args.runs)
+    median = statistics.median(times)
+    print(f"Startup to menu: median {median * 1000:.0f} ms, min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms "
+          f"over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+
+    if args.importtime:
+        for seconds, name in import_breakdown():
+            print(f"   {seconds * 1000:8.1f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget:
+        print("FAIL: startup is over budget")
+        failed = True
+    if not failed:
+        print("PASS")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
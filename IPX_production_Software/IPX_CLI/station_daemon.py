@@ -0,0 +1,553 @@
+# station_daemon.py
+# Long running station service, so the front ends (Streamlit form, build wizard, Qt interface) can start jobs
+# without each one spawning a process that re-imports pandas / plotly / pymodbus and re-reads the config.
+#
+# Jobs are queued per port: one worker thread per port runs that port's jobs one after another (a port is
+# never opened by two jobs at once), different ports run in parallel. The workflows still open the port
+# themselves for each job, as they reopen it at different baud rates during a run.
+#
+# API (local only, no authentication), JSON-RPC 2.0 over HTTP:
+#   POST /rpc   {"jsonrpc": "2.0", "id": 1, "method": "submit_job", "params": {"command": "configure", "params": {...}}}
+#       ping, submit_job, get_job, list_jobs, cancel_job, get_events (long poll), get_report, shutdown
+#   GET /jobs/<job_id>/events?since=0   progress events as a text/event-stream, until the job finishes
+#   GET /health
+#
+# Job commands are the batch_cli ones (configure, list-uids, update-uids, switch-baud, verify), with the same
+# job keys, plus modbus-check (datalogger test of a list of aliases, no configuration).
+#
+#   python station_daemon.py serve
+#   python station_daemon.py submit configure --params '{"port": "COM5", "sensors": 12, "mo": "MO1", ...}' --follow
+#   python station_daemon.py status [job_id]
+#   python station_daemon.py report <job_id>
+#   python station_daemon.py demo --sensors 8     (modbus-check against an emulated bus on a virtual serial port)
+
+import argparse
+import collections
+import itertools
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import batch_cli
+import ipx_logging
+import order_runner
+from IPX_Config import IPXCommands
+
+
+JOB_COMMANDS = batch_cli.COMMANDS + ["modbus-check"]
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RPCError(Exception):
+    """ Error returned to the client as a JSON-RPC error object """
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Job:
+    """ One queued / running / finished job, with its progress events """
+
+    def __init__(self, job_id: str, command: str, params: dict, max_events: int):
+        self.id = job_id
+        self.command = command
+        self.params = params
+        self.state = "queued" # queued -> running -> finished, or cancelled
+        self.result = None
+        self.report_path = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._events = collections.deque(maxlen=max_events)
+        self._next_seq = 1
+        self._changed = threading.Condition()
+        self._state_lock = threading.Lock() # queued -> running / cancelled is checked and changed under it
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("finished", "cancelled")
+
+    def add_event(self, event_type: str, **fields):
+        with self._changed:
+            self._events.append({"seq": self._next_seq, "time": time.time(), "type": event_type, **fields})
+            self._next_seq += 1
+            self._changed.notify_all()
+
+    def set_state(self, state: str, **fields):
+        self.state = state
+        self.add_event("state", state=state, **fields)
+
+    def change_state(self, expected: str, state: str, **fields) -> bool:
+        """ set_state only if the job is still in the expected state, False if something else changed it first """
+        with self._state_lock:
+            if self.state != expected:
+                return False
+            self.set_state(state, **fields)
+            return True
+
+    def events_since(self, since: int = 0, timeout: float = 0) -> dict:
+        """ Events with seq > since, waiting up to timeout seconds for new ones (long poll) """
+        with self._changed:
+            self._changed.wait_for(lambda: self._next_seq - 1 > since or self.done, timeout=timeout)
+            events = [event for event in self._events if event["seq"] > since]
+            return {"events": events, "next": self._next_seq - 1, "done": self.done}
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id, "command": self.command, "params": self.params, "state": self.state,
+            "submitted_at": self.submitted_at, "started_at": self.started_at, "finished_at": self.finished_at,
+            "result": self.result, "report_path": self.report_path,
+        }
+
+
+class JobLogHandler(logging.Handler):
+    """ Turns log records from a job's worker thread into progress events of that job """
+
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self._jobs_by_thread = {}
+
+    def bind(self, job: Job):
+        self._jobs_by_thread[threading.get_ident()] = job
+
+    def unbind(self):
+        self._jobs_by_thread.pop(threading.get_ident(), None)
+
+    def emit(self, record: logging.LogRecord):
+        job = self._jobs_by_thread.get(record.thread)
+        if job is None:
+            return
+        try:
+            job.add_event("log", level=record.levelname, message=record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+class PortWorker(threading.Thread):
+    """ Runs the jobs queued for one port, in order """
+
+    def __init__(self, daemon: "StationDaemon", port: str):
+        super().__init__(name=f"port-worker-{port}", daemon=True)
+        self.station = daemon
+        self.port = port
+        self.jobs = collections.deque()
+        self._wakeup = threading.Condition()
+
+    def enqueue(self, job: Job):
+        with self._wakeup:
+            self.jobs.append(job)
+            self._wakeup.notify()
+
+    def run(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: self.jobs)
+                job = self.jobs.popleft()
+            self.station.run_job(job) # skips it if it was cancelled while queued
+
+
+class StationDaemon:
+    """ Job queues per port, job history and the RPC methods """
+
+    def __init__(self, max_events: int = None, finished_jobs_kept: int = None):
+        settings = IPXCommands.Daemon_settings
+        self.max_events = max_events or settings.Max_events_per_job
+        self.finished_jobs_kept = finished_jobs_kept or settings.Finished_jobs_kept
+        self.jobs = collections.OrderedDict()
+        self.workers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.started_at = time.time()
+        self.warm = threading.Event()
+        self.log_handler = JobLogHandler()
+        logging.getLogger().addHandler(self.log_handler)
+
+    def warm_up(self):
+        """ Imports the heavy modules in the background, so the first job does not pay for them """
+        def load():
+            start = time.perf_counter()
+            try:
+                import pandas # noqa: F401
+                import report_generator # noqa: F401 (plotly, numpy)
+                import IPX_datalogger_tester # noqa: F401 (pymodbus)
+                logging.info(f"Warm imports loaded in {time.perf_counter() - start:.2f} s")
+            except ImportError as e:
+                logging.warning(f"Warm up import failed, jobs will import on first use: {e}")
+            self.warm.set()
+        threading.Thread(target=load, name="warm-up", daemon=True).start()
+
+    # ------------------------------ jobs ------------------------------
+    def submit(self, command: str, params: dict) -> Job:
+        if command not in JOB_COMMANDS:
+            raise RPCError(INVALID_PARAMS, f"Unknown command '{command}', must be one of {JOB_COMMANDS}")
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params must be an object")
+        try:
+            params = _prepare_modbus_check(params) if command == "modbus-check" else batch_cli.prepare_job(command, params)
+        except batch_cli.JobFileError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+
+        job = Job(f"job-{next(self._ids):05d}", command, params, self.max_events)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+            worker = self.workers.get(params["port"])
+            if worker is None:
+                worker = self.workers[params["port"]] = PortWorker(self, params["port"])
+                worker.start()
+        job.set_state("queued", position=len(worker.jobs) + 1)
+        worker.enqueue(job)
+        logging.info(f"Queued {job.id}: {command} on {params['port']}")
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.finished_jobs_kept)]:
+            del self.jobs[job_id]
+
+    def run_job(self, job: Job):
+        """ Runs a job in the calling (port worker) thread, unless it was cancelled while queued """
+        if not job.change_state("queued", "running"):
+            return
+        job.started_at = time.time()
+        self.log_handler.bind(job)
+        try:
+            if job.command == "modbus-check":
+                result = _run_modbus_check(job.params)
+            else:
+                result = batch_cli.run_job(job.command, job.params) # sets the non-interactive policy for this thread
+        except Exception as e: # run_job handles workflow errors, this is for anything else
+            logging.critical(f"{job.id} failed: {e}", exc_info=True)
+            result = {"status": "failed", "error": str(e), "exit_code": batch_cli.EXIT_FAILED}
+        finally:
+            self.log_handler.unbind()
+        job.result = result
+        job.report_path = _find_report(job)
+        job.finished_at = time.time()
+        job.set_state("finished", status=result.get("status"), exit_code=result.get("exit_code"))
+
+    def get_job(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise RPCError(INVALID_PARAMS, f"Unknown job '{job_id}'")
+        return job
+
+    # ------------------------------ rpc methods ------------------------------
+    def rpc_ping(self):
+        return {"uptime_s": round(time.time() - self.started_at, 1), "warm": self.warm.is_set(),
+                "ports": {port: len(worker.jobs) for port, worker in self.workers.items()}}
+
+    def rpc_submit_job(self, command: str, params: dict = None):
+        return self.submit(command, params or {}).to_dict()
+
+    def rpc_get_job(self, job_id: str):
+        return self.get_job(job_id).to_dict()
+
+    def rpc_list_jobs(self, state: str = None):
+        return [job.to_dict() for job in list(self.jobs.values()) if state is None or job.state == state]
+
+    def rpc_cancel_job(self, job_id: str):
+        """ Cancels a queued job (a running job can't be stopped safely mid configuration) """
+        job = self.get_job(job_id)
+        if not job.change_state("queued", "cancelled"): # the port worker may be starting it right now
+            raise RPCError(SERVER_ERROR, f"{job_id} is {job.state}, only queued jobs can be cancelled")
+        job.finished_at = time.time()
+        return job.to_dict()
+
+    def rpc_get_events(self, job_id: str, since: int = 0, timeout: float = 0):
+        return self.get_job(job_id).events_since(since, timeout=min(float(timeout), 60.0))
+
+    def rpc_get_report(self, job_id: str):
+        job = self.get_job(job_id)
+        if not job.report_path:
+            raise RPCError(SERVER_ERROR, f"No report found for {job_id}")
+        with open(job.report_path, "r", encoding="utf-8") as file:
+            return {"path": job.report_path, "report": json.load(file)}
+
+    def call(self, method: str, params):
+        func = getattr(self, f"rpc_{method}", None)
+        if func is None or method == "shutdown":
+            raise RPCError(METHOD_NOT_FOUND, f"Method '{method}' not found")
+        try:
+            return func(**params) if isinstance(params, dict) else func(*(params or []))
+        except TypeError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+
+
+def _prepare_modbus_check(params: dict) -> dict:
+    """ modbus-check job: port, and either aliases (list) or sensors (aliases 1..n) """
+    params = {key.replace("-", "_"): value for key, value in params.items()}
+    unknown = set(params) - {"port", "aliases", "sensors", "baud"}
+    if unknown:
+        raise batch_cli.JobFileError(f"Unknown keys for 'modbus-check': {', '.join(sorted(unknown))}")
+    if not params.get("port"):
+        raise batch_cli.JobFileError("modbus-check needs a port")
+    try:
+        aliases = params.get("aliases") or list(range(1, int(params["sensors"]) + 1))
+        aliases = [int(alias) for alias in aliases]
+    except (KeyError, TypeError, ValueError):
+        raise batch_cli.JobFileError("modbus-check needs aliases (list of ints) or sensors (int)")
+    return {"port": params["port"], "aliases": aliases, "baud": int(params.get("baud") or 9600)}
+
+
+def _run_modbus_check(params: dict) -> dict:
+    """ Datalogger test of each alias on the bus (what _run_modbus_verification does, without a report) """
+    from IPX_datalogger_tester import IPXModbusTester
+
+    results = []
+    with IPXModbusTester(port=params["port"], baudrate=params["baud"]) as modbus_tester:
+        for alias in params["aliases"]:
+            test_result = modbus_tester.run_full_test(uid=alias, alias=alias)
+            logging.info(f"Alias {alias}: {'PASS' if test_result['Overall_Pass'] else 'FAIL'}")
+            results.append(test_result)
+    failed = [result["Alias"] for result in results if not result["Overall_Pass"]]
+    return {"status": "SUCCESS" if not failed else f"{len(failed)} sensors failed", "failed_aliases": failed,
+            "results": results, "exit_code": batch_cli.EXIT_OK if not failed else batch_cli.EXIT_TEST_FAILURES}
+
+
+def _find_report(job: Job) -> str | None:
+    """ The config report a job wrote (newest in its production_runs folder since the job started) """
+    if "mo" not in job.params or "string" not in job.params:
+        return None
+    return order_runner.find_config_report(job.params["mo"], job.params["string"], since=job.started_at)
+
+
+# ------------------------------ HTTP ------------------------------
+class StationRequestHandler(BaseHTTPRequestHandler):
+    station: StationDaemon = None # set by serve()
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, body, status: int = 200):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/rpc":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._send_json(_rpc_error(None, PARSE_ERROR, "Parse error"))
+            return
+        if isinstance(request, list): # batch
+            self._send_json([self._handle_rpc(item) for item in request] or _rpc_error(None, INVALID_REQUEST, "Empty batch"))
+        else:
+            self._send_json(self._handle_rpc(request))
+
+    def _handle_rpc(self, request) -> dict:
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _rpc_error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        if request["method"] == "shutdown":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"jsonrpc": "2.0", "id": request_id, "result": "shutting down"}
+        try:
+            result = self.station.call(request["method"], request.get("params") or {})
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as e:
+            return _rpc_error(request_id, e.code, e.message)
+        except Exception as e:
+            logging.error(f"RPC {request['method']} failed: {e}", exc_info=True)
+            return _rpc_error(request_id, SERVER_ERROR, str(e))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(self.station.rpc_ping())
+            return
+        match = re.fullmatch(r"/jobs/([\w\-]+)/events", url.path)
+        if not match or match.group(1) not in self.station.jobs:
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        # server sent events, until the job is done or the client goes away
+        job = self.station.jobs[match.group(1)]
+        since = int(parse_qs(url.query).get("since", ["0"])[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                batch = job.events_since(since, timeout=15)
+                for event in batch["events"]:
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                if not batch["events"]:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                since = batch["next"]
+                if batch["done"] and not batch["events"]:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _rpc_error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def serve(host: str = None, port: int = None, warm: bool = True):
+    """ Runs the daemon until shutdown (rpc) or Ctrl+C """
+    host = host or IPXCommands.Daemon_settings.Host
+    port = port or IPXCommands.Daemon_settings.Port
+    station = StationDaemon()
+    if warm:
+        station.warm_up()
+    handler = type("BoundStationRequestHandler", (StationRequestHandler,), {"station": station})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logging.info(f"Station daemon listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Station daemon stopped (Ctrl+C)")
+    finally:
+        server.server_close()
+
+
+# ------------------------------ client ------------------------------
+class StationClient:
+    """ Small JSON-RPC client for the daemon (what the front ends need) """
+
+    def __init__(self, url: str = None, timeout: float = 90):
+        self.url = (url or f"http://{IPXCommands.Daemon_settings.Host}:{IPXCommands.Daemon_settings.Port}").rstrip("/")
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def call(self, method: str, **params):
+        body = json.dumps({"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/rpc", data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = json.load(response)
+        if "error" in reply:
+            raise RPCError(reply["error"]["code"], reply["error"]["message"])
+        return reply["result"]
+
+    def submit(self, command: str, **params) -> dict:
+        return self.call("submit_job", command=command, params=params)
+
+    def follow(self, job_id: str, on_event=None, poll_timeout: float = 30) -> dict:
+        """ Long polls the job's events (on_event(event) for each) until it finishes, returns the job """
+        since = 0
+        while True:
+            batch = self.call("get_events", job_id=job_id, since=since, timeout=poll_timeout)
+            for event in batch["events"]:
+                if on_event:
+                    on_event(event)
+            since = batch["next"]
+            if batch["done"]:
+                return self.call("get_job", job_id=job_id)
+
+
+def _print_event(event: dict):
+    stamp = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+    if event["type"] == "log":
+        print(f"{stamp} {event['level']:<8} {event['message']}")
+    else:
+        details = {key: value for key, value in event.items() if key not in ("seq", "time", "type")}
+        print(f"{stamp} [{event['type']}] {details}")
+
+
+def _run_demo(client: StationClient, sensors: int) -> int:
+    """ Starts an emulated modbus bus on a virtual serial port and runs a modbus-check job on it through the daemon """
+    from IPX_modbus_emulator import IPXModbusEmulator
+
+    with IPXModbusEmulator(aliases=range(1, sensors + 1)) as emulator:
+        logging.info(f"Emulated bus of {sensors} sensors on {emulator.port}")
+        job = client.submit("modbus-check", port=emulator.port, sensors=sensors)
+        job = client.follow(job["id"], on_event=_print_event)
+    print(json.dumps(job["result"], indent=2, default=str))
+    return job["result"]["exit_code"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPX station daemon and client")
+    parser.add_argument("--url", help="Daemon url for the client commands (default from Daemon_settings)")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the daemon")
+    serve_parser.add_argument("--host")
+    serve_parser.add_argument("--port", type=int)
+    serve_parser.add_argument("--no-warm", action="store_true", help="Don't pre-import pandas / plotly / pymodbus")
+    serve_parser.add_argument("--verbose", action="store_true")
+
+    submit_parser = subparsers.add_parser("submit", help="Submit a job")
+    submit_parser.add_argument("command", choices=JOB_COMMANDS)
+    submit_parser.add_argument("--params", help="Job params as json")
+    submit_parser.add_argument("--job", dest="job_file", help="JSON / YAML job file (every job in it is submitted)")
+    submit_parser.add_argument("--follow", action="store_true", help="Stream the progress events until done")
+
+    status_parser = subparsers.add_parser("status", help="Show one job, or all jobs")
+    status_parser.add_argument("job_id", nargs="?")
+
+    report_parser = subparsers.add_parser("report", help="Print a finished job's report")
+    report_parser.add_argument("job_id")
+
+    subparsers.add_parser("shutdown", help="Stop the daemon")
+
+    demo_parser = subparsers.add_parser("demo", help="modbus-check against an emulated bus on a virtual serial port")
+    demo_parser.add_argument("--sensors", type=int, default=8)
+
+    args = parser.parse_args(argv)
+    ipx_logging.setup_logging(logging.DEBUG if getattr(args, "verbose", False) else logging.INFO)
+
+    if args.action == "serve":
+        serve(args.host, args.port, warm=not args.no_warm)
+        return 0
+
+    client = StationClient(args.url)
+    try:
+        if args.action == "submit":
+            jobs = batch_cli.load_job_file(args.job_file) if args.job_file else [json.loads(args.params or "{}")]
+            exit_code = 0
+            for params in jobs:
+                job = client.submit(args.command, **params)
+                print(json.dumps(job, default=str))
+                if args.follow:
+                    job = client.follow(job["id"], on_event=_print_event)
+                    result = job["result"] or {"status": job["state"], "exit_code": batch_cli.EXIT_ABORTED} # cancelled
+                    print(json.dumps(result, default=str))
+                    exit_code = max(exit_code, result["exit_code"])
+            return exit_code
+        if args.action == "status":
+            result = client.call("get_job", job_id=args.job_id) if args.job_id else client.call("list_jobs")
+        elif args.action == "report":
+            result = client.call("get_report", job_id=args.job_id)
+        elif args.action == "shutdown":
+            result = client.call("shutdown")
+        elif args.action == "demo":
+            return _run_demo(client, args.sensors)
+        print(json.dumps(result, indent=2, default=str))
+        return 0
+    except (urllib.error.URLError, ConnectionError) as e:
+        logging.error(f"Could not reach the station daemon at {client.url}: {e}")
+        return batch_cli.EXIT_FAILED
+    except (RPCError, batch_cli.JobFileError, ValueError) as e:
+        logging.error(str(e))
+        return batch_cli.EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
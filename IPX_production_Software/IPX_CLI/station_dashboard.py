@@ -0,0 +1,260 @@
+# station_dashboard.py
+# Throughput dashboard for the configuration benches, built from the run reports in production_runs.
+# Writes one self-contained offline HTML page (no plotly / internet needed) plus the tables as csvs.
+#
+#   python station_dashboard.py
+#   python station_dashboard.py --since 2025-01-01 --output production_runs/dashboard
+
+import argparse
+import datetime
+import glob
+import html
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------- loading ----------------------------
+
+def load_reports(root: str = "production_runs", since: str = None, until: str = None):
+    """ Reads every *_config_report.json into three flat tables
+
+    Returns:
+        tuple: (runs_df, sensors_df, stages_df)
+            runs_df: one row per run (station, operator, mo, string, start, duration, sensors, status)
+            sensors_df: one row per sensor per run (calibration result / attempts, modbus / geosense pass)
+            stages_df: one row per top level stage per run, from the "Stage Timings" tree
+    """
+    runs, sensors, stages = [], [], []
+    for path in sorted(glob.glob(os.path.join(root, "**", "*_config_report.json"), recursive=True)):
+        try:
+            with open(path, 'r') as json_file:
+                report = json.load(json_file)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Skipping unreadable report {path}: {e}")
+            continue
+
+        meta = report.get("metadata", {})
+        sensor_data = report.get("Sensors") or {}
+        run_key = path
+        runs.append({
+            "run": run_key,
+            "station": meta.get("Station", "unknown"),
+            "operator": meta.get("Operator"),
+            "mo": meta.get("MO number"),
+            "string": meta.get("String Description"),
+            "start": meta.get("Start Time"),
+            "duration_s": meta.get("Duration (seconds)"),
+            "sensors": len(meta.get("Detected UIDs") or sensor_data),
+            "status": meta.get("status", meta.get("Status")),
+        })
+
+        for uid, data in sensor_data.items():
+            outcome = data.get("calibration_outcome") or {}
+            modbus = data.get("modbus_test_result") or {}
+            geosense = data.get("geosense_measurement") or {}
+            sensors.append({
+                "run": run_key,
+                "uid": str(uid),
+                "cal_result": outcome.get("result"),
+                "cal_attempts": outcome.get("attempts"),
+                "cal_duration_s": outcome.get("duration_s"),
+                "modbus_pass": modbus.get("Overall_Pass"),
+                "geosense_pass": geosense.get("pass"),
+            })
+
+        for child in (meta.get("Stage Timings") or {}).get("children", []):
+            stages.append({"run": run_key, "stage": child.get("name"), "duration_s": child.get("duration_s"),
+                           "status": child.get("status")})
+
+    runs_df = pd.DataFrame(runs, columns=["run", "station", "operator", "mo", "string", "start", "duration_s", "sensors", "status"])
+    sensors_df = pd.DataFrame(sensors, columns=["run", "uid", "cal_result", "cal_attempts", "cal_duration_s", "modbus_pass", "geosense_pass"])
+    stages_df = pd.DataFrame(stages, columns=["run", "stage", "duration_s", "status"])
+
+    runs_df["start"] = pd.to_datetime(runs_df["start"], errors="coerce")
+    runs_df["duration_s"] = pd.to_numeric(runs_df["duration_s"], errors="coerce")
+    if since:
+        runs_df = runs_df[runs_df["start"] >= pd.Timestamp(since)]
+    if until:
+        runs_df = runs_df[runs_df["start"] < pd.Timestamp(until) + pd.Timedelta(days=1)]
+    keep = set(runs_df["run"])
+    sensors_df = sensors_df[sensors_df["run"].isin(keep)]
+    stages_df = stages_df[stages_df["run"].isin(keep)]
+    return runs_df.reset_index(drop=True), sensors_df.reset_index(drop=True), stages_df.reset_index(drop=True)
+
+
+# ---------------------------- metrics (all vectorised over the whole archive) ----------------------------
+
+def throughput(runs_df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """ Sensors per hour of session time, per station or operator """
+    completed = runs_df.dropna(subset=["duration_s"])
+    grouped = completed.groupby(by).agg(runs=("run", "count"), sensors=("sensors", "sum"), hours=("duration_s", "sum"))
+    grouped["hours"] = grouped["hours"] / 3600
+    grouped["sensors_per_hour"] = grouped["sensors"] / grouped["hours"].replace(0, np.nan)
+    grouped["median_session_min"] = completed.groupby(by)["duration_s"].median() / 60
+    return grouped.sort_values("sensors_per_hour", ascending=False).round(2)
+
+
+def session_time_by_string_length(runs_df: pd.DataFrame) -> pd.DataFrame:
+    """ Median / p90 session time by the number of sensors on the string """
+    completed = runs_df.dropna(subset=["duration_s"])
+    grouped = completed.groupby("sensors")["duration_s"]
+    result = pd.DataFrame({
+        "runs": grouped.count(),
+        "median_min": grouped.median() / 60,
+        "p90_min": grouped.quantile(0.9) / 60,
+    })
+    result["median_min_per_sensor"] = result["median_min"] / result.index.to_series().replace(0, np.nan)
+    return result.round(2)
+
+
+def retry_skip_rates(runs_df: pd.DataFrame, sensors_df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """ Share of sensors needing more than one calibration attempt / skipped, per station or operator """
+    calibrated = sensors_df.dropna(subset=["cal_result"]).merge(runs_df[["run", by]], on="run")
+    if calibrated.empty:
+        return pd.DataFrame(columns=["sensors", "retry_rate", "skip_rate", "mean_attempts"])
+    calibrated["retried"] = pd.to_numeric(calibrated["cal_attempts"], errors="coerce") > 1
+    calibrated["skipped"] = calibrated["cal_result"] == "skipped"
+    grouped = calibrated.groupby(by)
+    return pd.DataFrame({
+        "sensors": grouped["uid"].count(),
+        "retry_rate": grouped["retried"].mean(),
+        "skip_rate": grouped["skipped"].mean(),
+        "mean_attempts": grouped["cal_attempts"].mean(),
+    }).round(3)
+
+
+def slowest_stages(runs_df: pd.DataFrame, stages_df: pd.DataFrame) -> pd.DataFrame:
+    """ Median / p90 / share of session time for each top level stage, per station """
+    timed = stages_df.merge(runs_df[["run", "station", "sensors"]], on="run")
+    if timed.empty:
+        return pd.DataFrame(columns=["station", "stage", "runs", "median_s", "p90_s", "median_s_per_sensor", "share_of_session"])
+    timed["per_sensor_s"] = timed["duration_s"] / timed["sensors"].replace(0, np.nan)
+    grouped = timed.groupby(["station", "stage"])
+    result = pd.DataFrame({
+        "runs": grouped["run"].count(),
+        "median_s": grouped["duration_s"].median(),
+        "p90_s": grouped["duration_s"].quantile(0.9),
+        "median_s_per_sensor": grouped["per_sensor_s"].median(),
+        "total_s": grouped["duration_s"].sum(),
+    })
+    result["share_of_session"] = result["total_s"] / result.groupby(level="station")["total_s"].transform("sum")
+    result = result.drop(columns="total_s").reset_index()
+    return result.sort_values(["station", "median_s"], ascending=[True, False]).reset_index(drop=True).round(3)
+
+
+def daily_output(runs_df: pd.DataFrame) -> pd.DataFrame:
+    """ Sensors configured per day per station """
+    dated = runs_df.dropna(subset=["start"])
+    table = dated.pivot_table(index=dated["start"].dt.date, columns="station", values="sensors", aggfunc="sum", fill_value=0)
+    table.index.name = "date"
+    return table
+
+
+# ---------------------------- html ----------------------------
+
+PAGE_STYLE = """
+body { font-family: Arial, Helvetica, sans-serif; margin: 24px; color: #222; }
+h1 { margin-bottom: 4px; } h2 { margin-top: 32px; border-bottom: 1px solid #ccc; padding-bottom: 4px; }
+table { border-collapse: collapse; font-size: 13px; }
+th, td { padding: 4px 10px; border-bottom: 1px solid #eee; text-align: right; }
+th { background: #f4f4f4; }
+td:first-child, th:first-child { text-align: left; }
+.bar { background: #4a90d9; height: 12px; display: inline-block; vertical-align: middle; }
+.cards { display: flex; gap: 16px; flex-wrap: wrap; }
+.card { border: 1px solid #ddd; border-radius: 6px; padding: 10px 16px; min-width: 140px; }
+.card .value { font-size: 22px; font-weight: bold; }
+"""
+
+
+def _table_html(df: pd.DataFrame, bar_column: str = None) -> str:
+    """ Table with an inline bar for one column (plain html, no javascript) """
+    if df is None or df.empty:
+        return "<p>No data.</p>"
+    df = df.reset_index() if not isinstance(df.index, pd.RangeIndex) else df
+    max_value = df[bar_column].max() if bar_column and bar_column in df else None
+    header = "".join(f"<th>{html.escape(str(c))}</th>" for c in df.columns)
+    if bar_column and max_value:
+        header += "<th></th>"
+    rows = []
+    for record in df.itertuples(index=False):
+        cells = "".join(f"<td>{html.escape('' if pd.isna(v) else str(v))}</td>" for v in record)
+        if bar_column and max_value:
+            value = getattr(record, bar_column) if bar_column.isidentifier() else None
+            width = 0 if value is None or pd.isna(value) else int(200 * value / max_value)
+            cells += f'<td><span class="bar" style="width:{width}px"></span></td>'
+        rows.append(f"<tr>{cells}</tr>")
+    return f"<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+
+
+def build_dashboard(root: str, output_dir: str, since: str = None, until: str = None) -> str:
+    """ Builds the dashboard html + csvs, returns the html path """
+    runs_df, sensors_df, stages_df = load_reports(root, since, until)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tables = {
+        "throughput_by_station": (throughput(runs_df, "station"), "sensors_per_hour"),
+        "throughput_by_operator": (throughput(runs_df, "operator"), "sensors_per_hour"),
+        "session_time_by_string_length": (session_time_by_string_length(runs_df), "median_min"),
+        "retry_skip_by_station": (retry_skip_rates(runs_df, sensors_df, "station"), "retry_rate"),
+        "retry_skip_by_operator": (retry_skip_rates(runs_df, sensors_df, "operator"), "retry_rate"),
+        "slowest_stages_by_station": (slowest_stages(runs_df, stages_df), "median_s"),
+        "daily_output": (daily_output(runs_df), None),
+    }
+    for name, (df, _) in tables.items():
+        df.to_csv(os.path.join(output_dir, f"{name}.csv"), index=not isinstance(df.index, pd.RangeIndex))
+
+    total_hours = runs_df["duration_s"].sum() / 3600
+    cards = {
+        "Runs": len(runs_df),
+        "Sensors": int(runs_df["sensors"].sum()),
+        "Stations": runs_df["station"].nunique(),
+        "Sensors / hour": round(runs_df["sensors"].sum() / total_hours, 1) if total_hours else "-",
+        "Median session (min)": round(runs_df["duration_s"].median() / 60, 1) if len(runs_df) else "-",
+    }
+    period = f"{runs_df['start'].min():%Y-%m-%d} to {runs_df['start'].max():%Y-%m-%d}" if runs_df["start"].notna().any() else "no runs"
+
+    sections = [
+        ("Throughput by station", "throughput_by_station"),
+        ("Throughput by operator", "throughput_by_operator"),
+        ("Session time by string length", "session_time_by_string_length"),
+        ("Calibration retries / skips by station", "retry_skip_by_station"),
+        ("Calibration retries / skips by operator", "retry_skip_by_operator"),
+        ("Slowest stages by station", "slowest_stages_by_station"),
+        ("Sensors per day", "daily_output"),
+    ]
+    body = [f"<h1>IPX Station Dashboard</h1><p>{html.escape(period)} &middot; generated {datetime.datetime.now():%Y-%m-%d %H:%M}</p>"]
+    body.append('<div class="cards">' + "".join(
+        f'<div class="card"><div>{html.escape(k)}</div><div class="value">{html.escape(str(v))}</div></div>' for k, v in cards.items()
+    ) + "</div>")
+    for title, name in sections:
+        df, bar = tables[name]
+        body.append(f"<h2>{html.escape(title)}</h2>{_table_html(df, bar)}")
+
+    page = f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>IPX Station Dashboard</title><style>{PAGE_STYLE}</style></head><body>{''.join(body)}</body></html>"
+    html_path = os.path.join(output_dir, "station_dashboard.html")
+    with open(html_path, 'w', encoding='utf-8') as html_file:
+        html_file.write(page)
+    logging.info(f"Dashboard for {len(runs_df)} runs saved to {html_path}")
+    return html_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Station throughput dashboard from the run reports")
+    parser.add_argument("--root", default="production_runs", help="production_runs directory")
+    parser.add_argument("--output", default=os.path.join("production_runs", "dashboard"), help="Output folder")
+    parser.add_argument("--since", help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--until", help="YYYY-MM-DD (inclusive)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_dashboard(args.root, args.output, args.since, args.until)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# uid_remap.py
+# Loading and checking bulk UID remaps (old UID -> new UID for a whole string), used by
+# IPX_workflows.run_bulk_uid_remap_flow instead of scanning one barcode per sensor.
+#
+# Mapping files:
+#   CSV with old_uid,new_uid columns          explicit mapping, any order
+#   CSV with just a new_uid column            new UIDs top to bottom, matched to the sensors in detection order
+#   build sheet order JSON                    new UIDs top to bottom from the string's segments ("uid" / "new_uid" key),
+#                                             single string (MO001.json) or multi string (HS2_order_data.json, pick with string_name)
+# A label / Label column or segment label is kept for the logs.
+
+import csv
+import os
+
+from IPX_Config import IPXCommands
+import order_spec
+
+
+MAX_UID_DIGITS = 10
+
+
+class UIDMappingError(Exception):
+    """ The mapping file can't be used (all problems are listed in .problems) """
+    def __init__(self, message: str, problems: list[str] = None):
+        super().__init__(message if not problems else f"{message}:\n   - " + "\n   - ".join(problems))
+        self.problems = problems or []
+
+
+def _to_uid(value, where: str, problems: list) -> int | None:
+    text = str(value).strip() if value is not None else ""
+    if not text.isdigit() or len(text) > MAX_UID_DIGITS or int(text) == 0:
+        problems.append(f"{where}: '{text}' is not a valid UID")
+        return None
+    return int(text)
+
+
+def load_mapping_csv(filepath: str) -> list[dict]:
+    """ Reads a mapping CSV into [{'old': int | None, 'new': int, 'label': str | None}] (old is None for positional files) """
+    with open(filepath, "r", encoding="utf-8-sig", newline="") as file:
+        reader = csv.DictReader(file)
+        columns = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+        new_column = columns.get("new_uid") or columns.get("new uid")
+        old_column = columns.get("old_uid") or columns.get("old uid")
+        label_column = columns.get("label")
+        if new_column is None:
+            raise UIDMappingError(f"{filepath} needs a new_uid column (and optionally old_uid)")
+
+        entries, problems = [], []
+        for row_number, row in enumerate(reader, start=2): # row 1 is the header
+            if not any((value or "").strip() for value in row.values()):
+                continue # blank line
+            where = f"row {row_number}"
+            entries.append({
+                "old": _to_uid(row.get(old_column), where, problems) if old_column else None,
+                "new": _to_uid(row.get(new_column), where, problems),
+                "label": (row.get(label_column) or "").strip() or None if label_column else None,
+            })
+    if problems:
+        raise UIDMappingError(f"Invalid UIDs in {filepath}", problems)
+    return entries
+
+
+def load_mapping_order(filepath: str, string_name: str = None) -> list[dict]:
+    """ New UIDs (top to bottom) from a build sheet order JSON, single or multi string format (order_spec.py) """
+    try:
+        order = order_spec.load_order(filepath, require_mo=False)
+    except order_spec.OrderSpecError as e:
+        raise UIDMappingError(str(e))
+
+    if string_name is None and len(order.strings) == 1:
+        string = order.strings[0]
+    else:
+        string = order.find_string(string_name) if string_name is not None else None
+        if string is None:
+            raise UIDMappingError(f"{filepath} has strings {[string.string_description for string in order.strings]}, "
+                                  f"choose one with string_name")
+
+    entries, problems = [], []
+    for segment in string.segments:
+        if segment.uid is None:
+            problems.append(f"{segment.label}: no UID recorded (expected one of {', '.join(order_spec.UID_KEYS)})")
+            continue
+        entries.append({"old": None, "new": _to_uid(segment.uid, segment.label, problems), "label": segment.label})
+    if len(string.segments) != string.expected_sensors:
+        problems.append(f"order expects {string.expected_sensors} sensors but has {len(string.segments)} segments")
+    if problems:
+        raise UIDMappingError(f"Can't use the UIDs in {filepath}", problems)
+    return entries
+
+
+def load_mapping_file(filepath: str, string_name: str = None) -> list[dict]:
+    """ CSV or order JSON, by extension """
+    if not os.path.exists(filepath):
+        raise UIDMappingError(f"Mapping file {filepath} not found")
+    try:
+        if os.path.splitext(filepath)[1].lower() == ".json":
+            return load_mapping_order(filepath, string_name)
+        return load_mapping_csv(filepath)
+    except (OSError, ValueError, csv.Error) as e:
+        raise UIDMappingError(f"Could not read mapping file {filepath}: {e}")
+
+
+def resolve_mappings(entries: list[dict], bus_uids: list[int]) -> list[dict]:
+    """ Checks the mapping against the UIDs on the bus and returns the remaps to apply, in a safe order
+
+    Args:
+        entries: from load_mapping_file
+        bus_uids: every UID that answered list_uids (check sensor included), in detection order (top to bottom)
+    Returns:
+        [{'old', 'new', 'label'}], sensors that already have their new UID are left out
+    Raises:
+        UIDMappingError: listing every problem found
+    """
+    check_uid = int(IPXCommands.Default_settings.Check_sensor_uid)
+    sensors = [uid for uid in bus_uids if uid != check_uid]
+    problems = []
+
+    if all(entry["old"] is None for entry in entries): # positional, top to bottom
+        if len(entries) != len(sensors):
+            problems.append(f"{len(entries)} new UIDs for {len(sensors)} detected sensors")
+        mappings = [{**entry, "old": old_uid} for entry, old_uid in zip(entries, sensors)]
+    elif any(entry["old"] is None for entry in entries):
+        raise UIDMappingError("Mix of rows with and without old_uid")
+    else:
+        mappings = [dict(entry) for entry in entries]
+        for entry in mappings:
+            if entry["old"] not in sensors:
+                problems.append(f"old UID {entry['old']} is not on the bus")
+
+    olds = [mapping["old"] for mapping in mappings]
+    news = [mapping["new"] for mapping in mappings]
+    for uid in sorted({uid for uid in olds if olds.count(uid) > 1}):
+        problems.append(f"old UID {uid} is mapped more than once")
+    for uid in sorted({uid for uid in news if news.count(uid) > 1}):
+        problems.append(f"new UID {uid} is given to more than one sensor")
+    if check_uid in news:
+        problems.append(f"new UID {check_uid} is the check sensor UID")
+
+    # a new UID already used by a sensor that keeps it would leave two sensors with the same UID
+    keeping = set(bus_uids) - set(olds)
+    for mapping in mappings:
+        if mapping["new"] in keeping:
+            problems.append(f"new UID {mapping['new']} (for {mapping['old']}) is already used by another sensor on the bus")
+    if problems:
+        raise UIDMappingError("UID mapping is not valid", problems)
+
+    pending = [mapping for mapping in mappings if mapping["old"] != mapping["new"]]
+    return _order_remaps(pending)
+
+
+def _order_remaps(pending: list[dict]) -> list[dict]:
+    """ Orders the remaps so a sensor's new UID is always free when it is set (A->B after B->C) """
+    ordered = []
+    while pending:
+        in_use = {mapping["old"] for mapping in pending}
+        ready = [mapping for mapping in pending if mapping["new"] not in in_use]
+        if not ready:
+            cycle = ", ".join(f"{mapping['old']}->{mapping['new']}" for mapping in pending)
+            raise UIDMappingError("UID mapping swaps UIDs in a cycle, do it in two steps via unused UIDs", [cycle])
+        ordered += ready
+        pending = [mapping for mapping in pending if mapping not in ready]
+    return ordered
+
+
+def expected_uids_after(bus_uids: list[int], remaps: list[dict]) -> set[int]:
+    """ The UIDs list_uids should report once the remaps are applied """
+    return (set(bus_uids) - {mapping["old"] for mapping in remaps}) | {mapping["new"] for mapping in remaps}